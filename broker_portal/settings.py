@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'core.middleware.RequestLoggingMiddleware',
+    'core.middleware.ApiGZipMiddleware',  # Opt-in, see GZIP_API_RESPONSES
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -160,6 +161,16 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ],
+    # orjson-backed JSON (core.renderers); same output as DRF's JSON classes
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # Authentication settings
@@ -181,7 +192,44 @@ if not DEBUG:
     SECURE_HSTS_PRELOAD = True
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
+# Cache Configuration
+# CACHE_BACKEND: locmem (per-process, default), redis, file or db - or a full backend path.
+# Rate limiting, sessions, report caches and API ETags need a backend shared by all workers in production:
+#   CACHE_BACKEND=redis CACHE_LOCATION=redis://127.0.0.1:6379/1  (requires the `redis` package)
+#   CACHE_BACKEND=db  (run `python manage.py createcachetable` first)
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+}
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'broker-portal',
+    'redis': 'redis://127.0.0.1:6379/1',
+    'file': str(BASE_DIR / '.cache'),
+    'db': 'core_cache',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_DEFAULT_LOCATIONS.get(CACHE_BACKEND, '')),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='broker_portal'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+CACHE_IS_SHARED = CACHE_BACKEND != 'locmem'
+
+# Report caches (see core/metrics.py), only used when CACHE_IS_SHARED
+DASHBOARD_METRICS_CACHE_TIMEOUT = config('DASHBOARD_METRICS_CACHE_TIMEOUT', default=3600, cast=int)
+
 # SECURITY: Session Security
+# With a shared cache, sessions live in the cache so SESSION_SAVE_EVERY_REQUEST
+# does not write the session table on every request.
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cache' if CACHE_IS_SHARED else 'django.contrib.sessions.backends.db',
+)
 SESSION_COOKIE_HTTPONLY = True  # Prevent JavaScript access to session cookies
 SESSION_COOKIE_SAMESITE = 'Lax'  # CSRF protection
 SESSION_COOKIE_AGE = 3600  # 1 hour session timeout
@@ -209,6 +257,23 @@ RATE_LIMIT_WINDOW = config('RATE_LIMIT_WINDOW', default=60, cast=int)  # Window
 LOGIN_RATE_LIMIT_REQUESTS = config('LOGIN_RATE_LIMIT_REQUESTS', default=5, cast=int)  # Login attempts
 LOGIN_RATE_LIMIT_WINDOW = config('LOGIN_RATE_LIMIT_WINDOW', default=300, cast=int)  # 5 minutes
 
+# Request instrumentation (core.middleware.RequestLoggingMiddleware)
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=500, cast=int)  # Log slower requests with their top queries
+SERVER_TIMING_ENABLED = config('SERVER_TIMING_ENABLED', default=True, cast=bool)  # Send the Server-Timing header
+
+# Most operations in one /api/batch/ request
+BATCH_MAX_OPERATIONS = config('BATCH_MAX_OPERATIONS', default=100, cast=int)
+
+# Gzip of JSON API responses (core.middleware.ApiGZipMiddleware); off when a proxy compresses already
+GZIP_API_RESPONSES = config('GZIP_API_RESPONSES', default=False, cast=bool)
+GZIP_MIN_SIZE = config('GZIP_MIN_SIZE', default=1024, cast=int)  # Smaller responses are sent as is
+
+# Prometheus /metrics. With several workers (gunicorn), point METRICS_DIR at a
+# directory shared by all of them so every scrape reports the whole deployment.
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=int)  # Seconds between worker file writes
+METRICS_DOMAIN_CACHE_TIMEOUT = config('METRICS_DOMAIN_CACHE_TIMEOUT', default=60, cast=int)  # Accounts/pending/row gauges
+
 # SECURITY: Database Security
 # Use connection pooling and SSL in production
 if not DEBUG:
@@ -234,7 +299,37 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@example.com')
 
+# Mobile delta sync (/api/sync/, core.sync)
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)  # Rows per kind per call
+SYNC_CURSOR_LAG = config('SYNC_CURSOR_LAG', default=30, cast=int)  # Seconds re-read for late commits
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=90, cast=int)  # Older cursors get a full sync
+
 # SECURITY: Logging Configuration
+# Logging: loggers write to a bounded in-memory queue ('queue' handler) and a
+# background thread writes to the file and console, so a slow disk never
+# blocks a request. The file gets one JSON object per line with the request
+# id, user id and view name, and is rotated by size (or by time with
+# LOG_ROTATE_WHEN, e.g. 'midnight'). With several workers, give each its own
+# LOG_FILE or use time-based rotation, as workers cannot rotate one file safely.
+LOG_FILE = config('LOG_FILE', default=str(BASE_DIR / 'security.log'))
+LOG_ROTATE_WHEN = config('LOG_ROTATE_WHEN', default='')
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=5, cast=int)
+LOG_QUEUE_SIZE = config('LOG_QUEUE_SIZE', default=10000, cast=int)  # Records beyond this are dropped
+
+if LOG_ROTATE_WHEN:
+    LOG_FILE_HANDLER = {
+        'class': 'logging.handlers.TimedRotatingFileHandler',
+        'when': LOG_ROTATE_WHEN,
+        'backupCount': LOG_BACKUP_COUNT,
+    }
+else:
+    LOG_FILE_HANDLER = {
+        'class': 'logging.handlers.RotatingFileHandler',
+        'maxBytes': LOG_MAX_BYTES,
+        'backupCount': LOG_BACKUP_COUNT,
+    }
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -243,28 +338,51 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.log.JsonFormatter',
+        },
     },
     'handlers': {
         'file': {
+            **LOG_FILE_HANDLER,
             'level': 'WARNING',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'security.log',
-            'formatter': 'verbose',
+            'filename': LOG_FILE,
+            'formatter': 'json',
         },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'queue': {
+            'class': 'core.log.BoundedQueueHandler',
+            'handlers': ['cfg://handlers.file', 'cfg://handlers.console'],
+            'queue_size': LOG_QUEUE_SIZE,
+        },
     },
     'loggers': {
         'django.security': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'WARNING',
             'propagate': True,
         },
         'core.security': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'core.requests': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'core.views': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'core.api_views': {
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
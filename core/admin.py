@@ -107,7 +107,7 @@ class ClientExchangeAccountAdmin(admin.ModelAdmin):
     
     def remaining_settlement(self, obj):
         """Display remaining settlement amount"""
-        remaining = obj.get_remaining_settlement_amount()
+        remaining = obj.get_remaining_settlement_amount()['remaining']
         final_share = obj.compute_my_share()
         if final_share == 0:
             return "N.A (Zero Share)"
@@ -2,19 +2,31 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import transaction
 from django.db.models import Sum, Q
-from django.utils import timezone
 from django.http import HttpResponse
+from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
-import csv
+import logging
 from .models import Client, Exchange, ClientExchangeAccount, Transaction, ClientExchangeReportConfig
 from .serializers import (
     ClientSerializer, ExchangeSerializer,
     ClientExchangeAccountSerializer, TransactionSerializer
 )
-from .views import calculate_display_remaining
+from .etags import ConditionalGetMixin, conditional_get
+from .exports import stream_csv_response
+from .filters import filter_transactions
+from .metrics import get_dashboard_metrics
+from .pagination import InvalidCursor, TransactionCursorPagination
+from .pending import PENDING_CSV_HEADER, build_pending_lists, pending_accounts, pending_csv_rows
+from .prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE, render_metrics
+from .reports import account_share_split
+from .sync import sync_changes
+
+logger = logging.getLogger(__name__)
 
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -70,131 +82,61 @@ def api_login(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get
 def mobile_dashboard_summary(request):
-    accounts = ClientExchangeAccount.objects.filter(client__user=request.user)
-    
-    total_funding = accounts.aggregate(Sum('funding'))['funding__sum'] or 0
-    total_balance = accounts.aggregate(Sum('exchange_balance'))['exchange_balance__sum'] or 0
-    
-    # Calculate PnL and share
-    total_pnl = 0
-    total_my_share = 0
-    for account in accounts:
-        total_pnl += account.compute_client_pnl()
-        total_my_share += account.compute_my_share()
+    # Totals are cached per user and invalidated on every account write
+    metrics = get_dashboard_metrics(request.user)
     
     return Response({
-        "total_clients": Client.objects.filter(user=request.user).count(),
+        "total_clients": metrics['total_clients'],
         "total_exchanges": Exchange.objects.count(),
-        "total_accounts": accounts.count(),
-        "total_funding": total_funding,
-        "total_balance": total_balance,
-        "total_pnl": total_pnl,
-        "total_my_share": total_my_share,
+        "total_accounts": metrics['total_accounts'],
+        "total_funding": metrics['total_funding'],
+        "total_balance": metrics['total_exchange_balance'],
+        "total_pnl": metrics['total_client_pnl'],
+        "total_my_share": metrics['total_share_amount'],
         "currency": "INR"
     })
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get
 def api_pending_payments(request):
     """API endpoint for pending payments - must match website logic exactly"""
-    accounts = ClientExchangeAccount.objects.filter(client__user=request.user).select_related('client', 'exchange')
+    clients_owe_list, you_owe_list = build_pending_lists(pending_accounts(request.user))
 
-    clients_owe_list = []
-    you_owe_list = []
+    pending_list = []
     total_to_receive = 0
     total_to_pay = 0
 
-    for client_exchange in accounts:
-        # Compute PnL BEFORE any updates
-        client_pnl = client_exchange.compute_client_pnl()
-
-        # Skip accounts with zero PnL
-        if client_pnl == 0:
-            continue
-
-        # Determine case
-        is_loss_case = client_pnl < 0  # Client owes you (loss)
-        is_profit_case = client_pnl > 0  # You owe client (profit)
-
-        # Lock share and get settlement info (CRITICAL for MASKED SHARE SETTLEMENT SYSTEM)
-        client_exchange.lock_initial_share_if_needed()
-        settlement_info = client_exchange.get_remaining_settlement_amount()
-        initial_final_share = settlement_info['initial_final_share']
-        remaining_amount = settlement_info['remaining']
-
-        # Use initial locked share for display
-        final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-
-        # Get share percentage using helper method
-        share_pct = client_exchange.get_share_percentage(client_pnl)
+    for payment_type, rows in (('RECEIVE', clients_owe_list), ('PAY', you_owe_list)):
+        for row in rows:
+            # Zero PnL and N.A items are not pending
+            if row['show_na']:
+                continue
 
-        # Calculate opening and available points for display
-        funding = Decimal(client_exchange.funding)
-        exchange_balance = Decimal(client_exchange.exchange_balance)
-
-        if is_loss_case:
-            # Client owes you (loss case)
-            total_loss = abs(client_pnl)
-            opening_points = total_loss
-            available_points = total_loss
-
-            # Calculate display remaining using website logic
-            display_remaining = calculate_display_remaining(client_pnl, remaining_amount)
-            remaining_display = abs(display_remaining) if display_remaining else 0
-
-            item = {
-                'account_id': client_exchange.id,
-                'client_name': client_exchange.client.name,
-                'client_code': client_exchange.client.code,
-                'exchange_name': client_exchange.exchange.name,
-                'funding': client_exchange.funding,
-                'exchange_balance': client_exchange.exchange_balance,
-                'pnl': client_pnl,
-                'my_share': final_share,
-                'type': 'RECEIVE',
-                'opening_points': opening_points,
-                'available_points': available_points,
-                'share_percentage': float(share_pct),
-                'remaining_amount': remaining_display,
-                'show_na': (final_share == 0)
-            }
-
-            clients_owe_list.append(item)
-            total_to_receive += remaining_display
-
-        elif is_profit_case:
-            # You owe client (profit case)
-            unpaid_profit = client_pnl
-            opening_points = unpaid_profit
-            available_points = unpaid_profit
-
-            # Calculate display remaining using website logic
-            display_remaining = calculate_display_remaining(client_pnl, remaining_amount)
-            remaining_display = abs(display_remaining) if display_remaining else 0
-
-            item = {
+            client_exchange = row['account']
+            pending_list.append({
                 'account_id': client_exchange.id,
                 'client_name': client_exchange.client.name,
                 'client_code': client_exchange.client.code,
                 'exchange_name': client_exchange.exchange.name,
                 'funding': client_exchange.funding,
                 'exchange_balance': client_exchange.exchange_balance,
-                'pnl': client_pnl,
-                'my_share': final_share,
-                'type': 'PAY',
-                'opening_points': opening_points,
-                'available_points': available_points,
-                'share_percentage': float(share_pct),
-                'remaining_amount': remaining_display,
-                'show_na': (final_share == 0)
-            }
-
-            you_owe_list.append(item)
-            total_to_pay += remaining_display
-
-    # Combine lists for API response (filter out N.A items)
-    pending_list = [item for item in clients_owe_list + you_owe_list if not item.get('show_na', False)]
+                'pnl': row['client_pnl'],
+                'my_share': row['my_share_amount'],
+                'type': payment_type,
+                'opening_points': row['amount_owed'],
+                'available_points': row['amount_owed'],
+                'share_percentage': float(row['share_percentage']),
+                'remaining_amount': row['remaining_amount'],
+                'show_na': False
+            })
+
+            if payment_type == 'RECEIVE':
+                total_to_receive += row['remaining_amount']
+            else:
+                total_to_pay += row['remaining_amount']
 
     return Response({
         'pending_payments': pending_list,
@@ -210,120 +152,25 @@ def api_export_pending_csv(request):
     Export pending payments report as CSV for mobile app.
     Mirrors the website's export_pending_csv exactly.
     """
-    # Get all client exchanges for the user
-    client_exchanges = ClientExchangeAccount.objects.filter(
-        client__user=request.user
-    ).select_related("client", "exchange")
-    
-    clients_owe_list = []
-    you_owe_list = []
-    
-    for client_exchange in client_exchanges:
-        client_pnl = client_exchange.compute_client_pnl()
-        
-        # Determine cases
-        is_neutral_case = client_pnl == 0
-        is_loss_case = client_pnl < 0
-        is_profit_case = client_pnl > 0
-        
-        # Lock share if needed
-        client_exchange.lock_initial_share_if_needed()
-        settlement_info = client_exchange.get_remaining_settlement_amount()
-        initial_final_share = settlement_info['initial_final_share']
-        remaining_amount = settlement_info['remaining']
-        
-        # Use initial locked share for display
-        final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-        share_pct = client_exchange.get_share_percentage(client_pnl)
-        
-        if is_neutral_case:
-            clients_owe_list.append({
-                "client": client_exchange.client,
-                "exchange": client_exchange.exchange,
-                "account": client_exchange,
-                "client_pnl": client_pnl,
-                "remaining_amount": 0,
-                "share_percentage": share_pct,
-                "show_na": True,
-            })
-            continue
-            
-        # Calculate display remaining using website logic
-        display_remaining = calculate_display_remaining(client_pnl, remaining_amount)
-        remaining_display = abs(display_remaining) if display_remaining else 0
-        
-        item_data = {
-            "client": client_exchange.client,
-            "exchange": client_exchange.exchange,
-            "account": client_exchange,
-            "client_pnl": client_pnl,
-            "remaining_amount": remaining_display,
-            "final_share": final_share,
-            "share_percentage": share_pct,
-            "show_na": (final_share == 0),
-        }
-        
-        if is_loss_case:
-            clients_owe_list.append(item_data)
-        elif is_profit_case:
-            you_owe_list.append(item_data)
-
-    # Sort lists by amount (descending) - Matching website logic
-    def get_csv_sort_key(item):
-        if item.get("show_na", False): return 0
-        return abs(item.get("final_share", 0))
-
-    clients_owe_list.sort(key=get_csv_sort_key, reverse=True)
-    you_owe_list.sort(key=get_csv_sort_key, reverse=True)
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
     filename = f"pending_payments_{date.today().strftime('%Y%m%d')}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    writer = csv.writer(response)
-    
-    # Write header row - Same as website
-    headers = [
-        'Client',
-        'U_CODE',
-        'Master',
-        'OPENING POINTS',
-        'AVL.POINTS(CLOSING POINTS)',
-        'PROFIT(+)/LOSS(-)',
-        'MY SHARE',
-        'MY%'
-    ]
-    writer.writerow(headers)
-    
-    # Write rows
-    for item in clients_owe_list + you_owe_list:
-        row_data = [
-            item["client"].name or '',
-            item["client"].code or '',
-            item["exchange"].name or '',
-            int(item["account"].funding),
-            int(item["account"].exchange_balance),
-            'N.A' if item.get("show_na", False) else int(item["client_pnl"]),
-            'N.A' if item.get("show_na", False) else int(item["remaining_amount"]),
-            item.get("share_percentage", item["account"].my_percentage)
-        ]
-        writer.writerow(row_data)
-        
-    return response
+    return stream_csv_response(filename, PENDING_CSV_HEADER, pending_csv_rows(pending_accounts(request.user)))
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def api_add_funding(request, account_id):
+    return _add_funding(request.user, account_id, request.data)
+
+def _add_funding(user, account_id, data):
     try:
-        account = ClientExchangeAccount.objects.get(id=account_id, client__user=request.user)
-        amount_raw = str(request.data.get('amount', '0'))
+        account = ClientExchangeAccount.objects.get(id=account_id, client__user=user)
+        amount_raw = str(data.get('amount', '0'))
         amount = int(Decimal(amount_raw.replace(',', '')))
-        notes = request.data.get('notes', '')
+        notes = data.get('notes', '')
         
         account.funding += amount
         account.exchange_balance += amount
         account.save()
+        account.lock_initial_share_if_needed()
         
         Transaction.objects.create(
             client_exchange=account,
@@ -336,20 +183,24 @@ def api_add_funding(request, account_id):
         )
         return Response({'status': 'success', 'new_balance': account.exchange_balance})
     except Exception as e:
-        print(f"DEBUG API FUNDING ERROR: {str(e)}")
+        logger.warning(f"Funding failed for account {account_id}: {e}")
         return Response({'error': str(e)}, status=400)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def api_update_balance(request, account_id):
+    return _update_balance(request.user, account_id, request.data)
+
+def _update_balance(user, account_id, data):
     try:
-        account = ClientExchangeAccount.objects.get(id=account_id, client__user=request.user)
-        amount_raw = str(request.data.get('amount', '0'))
+        account = ClientExchangeAccount.objects.get(id=account_id, client__user=user)
+        amount_raw = str(data.get('amount', '0'))
         new_balance = int(Decimal(amount_raw.replace(',', '')))
-        notes = request.data.get('notes', '')
+        notes = data.get('notes', '')
         
         account.exchange_balance = new_balance
         account.save()
+        account.lock_initial_share_if_needed()
         
         Transaction.objects.create(
             client_exchange=account,
@@ -362,7 +213,7 @@ def api_update_balance(request, account_id):
         )
         return Response({'status': 'success'})
     except Exception as e:
-        print(f"DEBUG API BALANCE ERROR: {str(e)}")
+        logger.warning(f"Balance update failed for account {account_id}: {e}")
         return Response({'error': str(e)}, status=400)
 
 @api_view(['POST'])
@@ -372,37 +223,36 @@ def api_record_payment(request, account_id):
     API version of record_payment view - MUST follow EXACT same rules as website
     Implements the complete MASKED SHARE SETTLEMENT SYSTEM
     """
+    return _record_payment(request.user, account_id, request.data)
+
+def _record_payment(user, account_id, data):
     try:
         from django.db import transaction
         from django.core.exceptions import ValidationError
         from core.models import Settlement
 
-        # Debug logging
-        print(f"DEBUG API RECORD PAYMENT: account_id={account_id}")
-        print(f"DEBUG API RECORD PAYMENT DATA: {dict(request.data)}")
-
         # Parse request data - handle both snake_case and camelCase
-        paid_amount_str = str(request.data.get('amount', '0')).strip()
+        paid_amount_str = str(data.get('amount', '0')).strip()
         paid_amount = int(Decimal(paid_amount_str.replace(',', '')))
-        payment_direction = request.data.get('payment_direction', request.data.get('paymentDirection', 'FROM_CLIENT'))
-        notes = request.data.get('notes', '').strip()
+        payment_direction = data.get('payment_direction', data.get('paymentDirection', 'FROM_CLIENT'))
+        notes = data.get('notes', '').strip()
 
         # Handle nullable boolean fields properly - check both snake_case and camelCase
-        update_exchange_balance = request.data.get('update_exchange_balance', request.data.get('updateExchangeBalance'))
+        update_exchange_balance = data.get('update_exchange_balance', data.get('updateExchangeBalance'))
         if update_exchange_balance is not None:
             update_exchange_balance = bool(update_exchange_balance)
         else:
             update_exchange_balance = False
 
-        new_exchange_balance = request.data.get('new_exchange_balance', request.data.get('newExchangeBalance'))
+        new_exchange_balance = data.get('new_exchange_balance', data.get('newExchangeBalance'))
 
-        re_add_capital = request.data.get('re_add_capital', request.data.get('reAddCapital'))
+        re_add_capital = data.get('re_add_capital', data.get('reAddCapital'))
         if re_add_capital is not None:
             re_add_capital = bool(re_add_capital)
         else:
             re_add_capital = False
 
-        print(f"DEBUG PARSED: amount={paid_amount}, direction={payment_direction}, update_balance={update_exchange_balance}, new_balance={new_exchange_balance}, re_add={re_add_capital}")
+        logger.debug(f"Record payment on account {account_id}: direction={payment_direction}, update_balance={update_exchange_balance}, re_add={re_add_capital}")
 
         if paid_amount <= 0:
             return Response({'error': 'Paid amount must be greater than zero'}, status=400)
@@ -410,7 +260,7 @@ def api_record_payment(request, account_id):
         # Use database row locking to prevent concurrent payment race conditions
         with transaction.atomic():
             # Lock the account row to prevent concurrent modifications
-            account = ClientExchangeAccount.objects.select_for_update().get(id=account_id, client__user=request.user)
+            account = ClientExchangeAccount.objects.select_for_update().get(id=account_id, client__user=user)
 
             # ============================================================
             # SETTLEMENT FLOW - EXACT ORDER (NON-NEGOTIABLE) - SAME AS WEBSITE
@@ -444,7 +294,7 @@ def api_record_payment(request, account_id):
 
             if is_settlement:
                 # Full settlement logic for accounts with share > 0
-                print(f"DEBUG: Settlement payment (share={initial_final_share})")
+                logger.debug(f"Settlement payment on account {account_id}")
 
                 # Validate against remaining settlement amount
                 if paid_amount > remaining_amount:
@@ -551,7 +401,7 @@ def api_record_payment(request, account_id):
                     cycle_closed = True
             else:
                 # Simple payment recording for accounts with share = 0
-                print(f"DEBUG: Regular payment recording (share=0)")
+                logger.debug(f"Regular payment on account {account_id} (share=0)")
 
                 # For non-settlement payments, just update exchange balance based on payment direction
                 if payment_direction == 'FROM_CLIENT':
@@ -603,13 +453,12 @@ def api_record_payment(request, account_id):
     except ValidationError as e:
         return Response({'error': str(e)}, status=400)
     except Exception as e:
-        print(f"DEBUG API RECORD PAYMENT ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Record payment failed for account {account_id}")
         return Response({'error': str(e)}, status=400)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get
 def api_reports_summary(request):
     """Real business reports for mobile with period filtering"""
     period = request.query_params.get('period', 'DAILY')
@@ -625,96 +474,54 @@ def api_reports_summary(request):
     # Filter transactions for stats if needed, or just return overview
     total_funding = accounts.aggregate(Sum('funding'))['funding__sum'] or 0
     total_balance = accounts.aggregate(Sum('exchange_balance'))['exchange_balance__sum'] or 0
-    total_pnl = sum(acc.compute_client_pnl() for acc in accounts)
-    total_my_share = sum(acc.compute_my_share() for acc in accounts)
-    
-    # NEW: Split of My Share (My Own vs Friend/Student)
-    my_own_total_share = 0
-    friend_total_share = 0
     
-    for acc in accounts:
-        try:
-            config = ClientExchangeReportConfig.objects.get(client_exchange=acc)
-            acc_my_share = acc.compute_my_share()
-            if acc_my_share > 0:
-                # Calculate ratio based on config
-                total_config_pct = float(config.my_own_percentage + config.friend_percentage)
-                if total_config_pct > 0:
-                    my_own_total_share += int((acc_my_share * float(config.my_own_percentage)) / total_config_pct)
-                    friend_total_share += int((acc_my_share * float(config.friend_percentage)) / total_config_pct)
-                else:
-                    # Default if no config
-                    my_own_total_share += acc_my_share
-        except ClientExchangeReportConfig.DoesNotExist:
-            # Default if no config
-            my_own_total_share += acc.compute_my_share()
-
-    # Recent Daily Performance (last 7 days)
-    daily_stats = []
-    for i in range(7):
-        day = today - timedelta(days=i)
-        day_txns = Transaction.objects.filter(
-            client_exchange__client__user=request.user,
-            date__date=day
-        )
-        
-        day_pnl = 0
-        for tx in day_txns:
-            if tx.type == 'TRADE':
-                if tx.exchange_balance_before is not None and tx.exchange_balance_after is not None:
-                    day_pnl += (tx.exchange_balance_after - tx.exchange_balance_before)
-            elif tx.type == 'SETTLEMENT_SHARE' or tx.type == 'RECORD_PAYMENT':
-                # These are payments, not trading PnL
-                pass
-        
-        if day_txns.exists():
-            daily_stats.append({
-                'date': day.strftime('%Y-%m-%d'),
-                'pnl': day_pnl,
-                'tx_count': day_txns.count()
-            })
+    # PnL, My Share and its split (My Own vs Friend/Student)
+    split = account_share_split(accounts)
+
+    # Recent Daily Performance (last 7 days), one row per day with transactions
+    recent_txns = Transaction.objects.filter(
+        client_exchange__client__user=request.user,
+        date__date__gte=today - timedelta(days=6),
+        date__date__lte=today
+    )
+    daily_stats = [
+        {
+            'date': row['day'].strftime('%Y-%m-%d'),
+            'pnl': row['pnl'],  # Trading PnL; payments are not trading PnL
+            'tx_count': row['tx_count']
+        }
+        for row in recent_txns.performance('day').order_by('-day')
+    ]
 
     # NEW: Client Performance for the selected period
-    client_performance = []
     period_txns = Transaction.objects.filter(
         client_exchange__client__user=request.user,
         date__date__gte=start_date,
         date__date__lte=today
     )
-    
-    client_ids = accounts.values_list('client_id', flat=True).distinct()
-    for cid in client_ids:
-        client = Client.objects.get(id=cid)
-        client_txns = period_txns.filter(client_exchange__client_id=cid)
-        
-        # Calculate PnL (trading activity) and Settlements (your profit/loss)
-        client_pnl = 0
-        client_settlements = 0
-        
-        for tx in client_txns:
-            if tx.type == 'TRADE':
-                if tx.exchange_balance_before is not None and tx.exchange_balance_after is not None:
-                    client_pnl += (tx.exchange_balance_after - tx.exchange_balance_before)
-            elif tx.type in ['SETTLEMENT_SHARE', 'RECORD_PAYMENT']:
-                client_settlements += tx.amount
-        
-        if client_txns.exists():
-            client_performance.append({
-                'client_name': client.name,
-                'client_code': client.code,
-                'pnl': client_pnl,
-                'settlements': client_settlements, # Your actual profit/loss
-                'tx_count': client_txns.count()
-            })
+    client_performance = [
+        {
+            'client_name': row['client_exchange__client__name'],
+            'client_code': row['client_exchange__client__code'],
+            'pnl': row['pnl'],
+            'settlements': row['settlements'], # Your actual profit/loss
+            'tx_count': row['tx_count']
+        }
+        for row in period_txns.performance(
+            'client_exchange__client_id',
+            'client_exchange__client__name',
+            'client_exchange__client__code',
+        ).order_by('client_exchange__client__name', 'client_exchange__client_id')
+    ]
 
     return Response({
         'overview': {
             'total_funding': total_funding,
             'total_balance': total_balance,
-            'total_pnl': total_pnl,
-            'total_my_share': total_my_share,
-            'my_own_share': my_own_total_share,
-            'friend_share': friend_total_share,
+            'total_pnl': split['total_pnl'],
+            'total_my_share': split['total_my_share'],
+            'my_own_share': split['my_own_share'],
+            'friend_share': split['friend_share'],
         },
         'daily_performance': daily_stats,
         'client_performance': client_performance,
@@ -759,26 +566,9 @@ def api_custom_reports(request):
     # Calculate summary stats
     total_funding = accounts.aggregate(Sum('funding'))['funding__sum'] or 0
     total_balance = accounts.aggregate(Sum('exchange_balance'))['exchange_balance__sum'] or 0
-    total_pnl = sum(acc.compute_client_pnl() for acc in accounts)
-    total_my_share = sum(acc.compute_my_share() for acc in accounts)
 
     # Split calculation (same as other reports)
-    my_own_total_share = 0
-    friend_total_share = 0
-
-    for acc in accounts:
-        try:
-            config = ClientExchangeReportConfig.objects.get(client_exchange=acc)
-            acc_my_share = acc.compute_my_share()
-            if acc_my_share > 0:
-                total_config_pct = float(config.my_own_percentage + config.friend_percentage)
-                if total_config_pct > 0:
-                    my_own_total_share += int((acc_my_share * float(config.my_own_percentage)) / total_config_pct)
-                    friend_total_share += int((acc_my_share * float(config.friend_percentage)) / total_config_pct)
-                else:
-                    my_own_total_share += acc_my_share
-        except ClientExchangeReportConfig.DoesNotExist:
-            my_own_total_share += acc.compute_my_share()
+    split = account_share_split(accounts)
 
     # Serialize transactions for mobile
     transaction_data = []
@@ -797,10 +587,10 @@ def api_custom_reports(request):
         'overview': {
             'total_funding': total_funding,
             'total_balance': total_balance,
-            'total_pnl': total_pnl,
-            'total_my_share': total_my_share,
-            'my_own_share': my_own_total_share,
-            'friend_share': friend_total_share,
+            'total_pnl': split['total_pnl'],
+            'total_my_share': split['total_my_share'],
+            'my_own_share': split['my_own_share'],
+            'friend_share': split['friend_share'],
         },
         'transactions': transaction_data,
         'from_date': from_date_str,
@@ -972,7 +762,7 @@ def api_delete_exchange(request, pk):
         print(f"DEBUG API DELETE EXCHANGE ERROR: {str(e)}")
         return Response({'error': str(e)}, status=400)
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ClientSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -982,12 +772,12 @@ class ClientViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class ExchangeViewSet(viewsets.ReadOnlyModelViewSet):
+class ExchangeViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Exchange.objects.all()
     serializer_class = ExchangeSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class ClientExchangeAccountViewSet(viewsets.ModelViewSet):
+class ClientExchangeAccountViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ClientExchangeAccountSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -995,12 +785,139 @@ class ClientExchangeAccountViewSet(viewsets.ModelViewSet):
         # Filter accounts by authenticated user for proper security
         return ClientExchangeAccount.objects.filter(client__user=self.request.user).select_related('client', 'exchange')
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Keyset pages; next/prev cursors in the Link header
+    pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
         # Filter transactions by authenticated user for proper security
-        return Transaction.objects.filter(
+        transactions = Transaction.objects.filter(
             client_exchange__client__user=self.request.user
+        ).select_related(
+            'client_exchange__client', 'client_exchange__exchange'
         ).order_by('-created_at', '-id')
+        if self.action != 'list':
+            return transactions
+
+        params = self.request.query_params
+        return filter_transactions(
+            transactions,
+            client_id=params.get('client'),
+            exchange_id=params.get('exchange'),
+            client_exchange_id=params.get('client_exchange'),
+            tx_type=params.get('type'),
+            start_date=params.get('start_date'),
+            end_date=params.get('end_date'),
+            search_query=params.get('search', ''),
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint. Staff only: scrape with a staff user's API
+    token (Authorization: Token <key>).
+    """
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def api_sync(request):
+    """
+    Delta sync for the mobile app: clients, accounts, transactions and
+    settlements changed or deleted since ?cursor= (see core.sync).
+    """
+    try:
+        return Response(sync_changes(request.user, request.query_params.get('cursor')))
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# op of an /api/batch/ operation → the function behind its single endpoint
+BATCH_OPERATIONS = {
+    'funding': _add_funding,
+    'balance': _update_balance,
+    'payment': _record_payment,
+}
+BATCH_MODES = ('atomic', 'savepoint')
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_batch(request):
+    """
+    Funding, balance updates and payments for several accounts in one request:
+
+        {"mode": "atomic", "operations": [
+            {"op": "funding", "account_id": 1, "amount": 1000},
+            {"op": "balance", "account_id": 1, "amount": 950},
+            {"op": "payment", "account_id": 2, "amount": 50, "notes": "cash"}
+        ]}
+
+    Each operation takes the fields of its single endpoint and runs in
+    order, in one database transaction. The accounts are locked up front
+    in id order, so concurrent batches cannot deadlock. In "atomic" mode
+    (default) the first failure rolls back the whole batch and skips the
+    rest; in "savepoint" mode only the failed operations are rolled back.
+
+    Returns: committed, and per operation the status and body its single
+    endpoint would have answered
+    """
+    mode = request.data.get('mode', 'atomic')
+    operations = request.data.get('operations')
+    max_operations = getattr(settings, 'BATCH_MAX_OPERATIONS', 100)
+    if mode not in BATCH_MODES:
+        return Response({'error': f"mode must be one of: {', '.join(BATCH_MODES)}"}, status=400)
+    if not isinstance(operations, list) or not 0 < len(operations) <= max_operations:
+        return Response({'error': f'operations must be a list of 1 to {max_operations} operations'}, status=400)
+
+    account_ids = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+            return Response({
+                'error': f"Operation {index}: op must be one of: {', '.join(BATCH_OPERATIONS)}"
+            }, status=400)
+        try:
+            account_ids.append(int(operation.get('account_id')))
+        except (TypeError, ValueError):
+            return Response({'error': f'Operation {index}: invalid account_id'}, status=400)
+
+    results = []
+    committed = True
+    with transaction.atomic():
+        locked = set(
+            ClientExchangeAccount.objects.select_for_update(of=('self',))
+            .filter(pk__in=account_ids, client__user=request.user)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        missing = sorted(set(account_ids) - locked)
+        if missing:
+            return Response({'error': 'Account not found', 'account_ids': missing}, status=404)
+
+        for index, (operation, account_id) in enumerate(zip(operations, account_ids)):
+            result = {'index': index, 'op': operation['op'], 'account_id': account_id}
+            if not committed:
+                results.append({**result, 'status': 424, 'body': {'error': 'Not run: an earlier operation failed'}})
+                continue
+
+            # Savepoint: a failed operation leaves nothing behind
+            with transaction.atomic():
+                response = BATCH_OPERATIONS[operation['op']](request.user, account_id, operation)
+                if response.status_code >= 400:
+                    transaction.set_rollback(True)
+            results.append({**result, 'status': response.status_code, 'body': response.data})
+            if response.status_code >= 400 and mode == 'atomic':
+                committed = False
+
+        if not committed:
+            transaction.set_rollback(True)
+
+    return Response(
+        {'mode': mode, 'committed': committed, 'results': results},
+        status=200 if committed else 400,
+    )
@@ -0,0 +1,283 @@
+"""
+End-to-end benchmarks of the portal's hot endpoints.
+
+Each scale seeds a dataset with generate_sample_data, then requests every
+endpoint through the Django test client and records wall time, SQL query
+count and peak Python memory. Results are plain dicts (JSON ready) and can
+be compared against a stored baseline. Run with the run_benchmarks command.
+A request that does not succeed fails the run, so an error page is never
+timed or stored as a baseline.
+
+serialization_benchmark() separately times the JSON renderers (and gzip)
+on large synthetic API payloads, without a database.
+"""
+import gzip
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client as TestClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import ClientExchangeAccount
+from .renderers import FastJSONRenderer
+
+# generate_sample_data options of each dataset size
+SCALES = {
+    'small': {'clients': 10, 'accounts_per_client': 2, 'days': 30, 'trades_per_day': 2},
+    'medium': {'clients': 100, 'accounts_per_client': 2, 'days': 90, 'trades_per_day': 3},
+    'large': {'clients': 500, 'accounts_per_client': 3, 'days': 365, 'trades_per_day': 3},
+}
+
+# Slower or bigger by more than this fraction counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# Absolute slack on top of the tolerance, so tiny timings do not flap
+NOISE_FLOOR = {'wall_ms': 5, 'peak_kib': 64}
+
+
+class BenchmarkError(Exception):
+    """A benchmarked request did not succeed."""
+
+
+def failed(status):
+    """True for a status other than 2xx/3xx."""
+    return not 200 <= status < 400
+
+
+def benchmark_requests(account):
+    """
+    (name, method, url, data) of each benchmarked endpoint.
+
+    report_daily, report_weekly and report_monthly are left out while their
+    templates reverse the unregistered 'reports' URL namespace and error.
+    """
+    return [
+        ('dashboard', 'get', '/', None),
+        ('pending_summary', 'get', '/pending/', None),
+        ('export_pending_csv', 'get', '/pending/export/', None),
+        ('report_overview', 'get', '/reports/', None),
+        ('transaction_list', 'get', '/transactions/', None),
+        ('record_payment', 'post', f'/exchanges/account/{account.pk}/record-payment/', {'amount': '1'}),
+        ('mobile_dashboard_summary', 'get', '/api/mobile-dashboard/', None),
+        ('api_pending_payments', 'get', '/api/pending-payments/', None),
+        ('api_reports_summary', 'get', '/api/reports-summary/', None),
+    ]
+
+
+def _request(client, method, url, data):
+    response = getattr(client, method)(url, data)
+    if response.streaming:
+        # Streamed bodies are produced while being read
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(client, method, url, data=None, repeat=5):
+    """
+    Returns:
+        dict with status (the worst of all runs), wall_ms (median of
+        `repeat` runs), min_ms, queries and peak_kib (one extra run, traced)
+    """
+    timings = []
+    statuses = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = _request(client, method, url, data)
+        timings.append((time.perf_counter() - started) * 1000)
+        statuses.append(response.status_code)
+
+    # Query capture and tracemalloc slow requests down, so they get their own run
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            statuses.append(_request(client, method, url, data).status_code)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': max(statuses, key=failed),
+        'wall_ms': round(statistics.median(timings), 2),
+        'min_ms': round(min(timings), 2),
+        'queries': len(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _payment_account(user, repeat):
+    """An account with enough remaining share for every record_payment run."""
+    for account in ClientExchangeAccount.objects.filter(client__user=user).order_by('pk'):
+        if account.compute_client_pnl() and account.preview_settlement_state()['remaining'] > repeat + 1:
+            return account
+    return ClientExchangeAccount.objects.filter(client__user=user).order_by('pk').first()
+
+
+def run_scale(scale, repeat=5, seed=1):
+    """
+    Seed a dataset of the given scale and benchmark every endpoint on it.
+    Everything runs in one transaction that is rolled back afterwards.
+
+    Returns:
+        dict of endpoint name → measure() result
+
+    Raises:
+        BenchmarkError: if a request did not succeed
+    """
+    options = SCALES[scale]
+    results = {}
+    with transaction.atomic(), override_settings(RATE_LIMIT_ENABLED=False):
+        user = get_user_model().objects.create_user(
+            username=f'_benchmark_{scale}_{time.time_ns()}', password=None
+        )
+        call_command(
+            'generate_sample_data',
+            user_id=user.pk,
+            seed=seed,
+            stdout=StringIO(),
+            **options,
+        )
+        client = TestClient(raise_request_exception=False)
+        client.force_login(user)
+
+        account = _payment_account(user, repeat)
+        for name, method, url, data in benchmark_requests(account):
+            results[name] = measure(client, method, url, data, repeat)
+
+        transaction.set_rollback(True)
+
+    errors = [f'{name} ({metrics["status"]})' for name, metrics in results.items() if failed(metrics['status'])]
+    if errors:
+        raise BenchmarkError(f'{scale}: request failed: {", ".join(errors)}')
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare benchmark results against a baseline of the same shape
+    ({scale: {endpoint: metrics}}).
+
+    A failed request (not 2xx/3xx) is always a regression. Query counts may
+    not grow at all; wall time and peak memory may grow by `tolerance` (a
+    fraction) plus NOISE_FLOOR. Other endpoints missing from the baseline
+    are skipped.
+
+    Returns:
+        list of regression messages
+    """
+    regressions = []
+    for scale, endpoints in results.items():
+        for name, metrics in endpoints.items():
+            if failed(metrics['status']):
+                regressions.append(f'{scale}/{name}: status {metrics["status"]}')
+                continue
+            expected = baseline.get(scale, {}).get(name)
+            if not expected:
+                continue
+            if metrics['status'] != expected['status']:
+                regressions.append(
+                    f'{scale}/{name}: status {expected["status"]} → {metrics["status"]}'
+                )
+            if metrics['queries'] > expected['queries']:
+                regressions.append(
+                    f'{scale}/{name}: queries {expected["queries"]} → {metrics["queries"]}'
+                )
+            for key in ('wall_ms', 'peak_kib'):
+                limit = expected[key] * (1 + tolerance) + NOISE_FLOOR[key]
+                if metrics[key] > limit:
+                    regressions.append(
+                        f'{scale}/{name}: {key} {expected[key]} → {metrics[key]} (limit {limit:.1f})'
+                    )
+    return regressions
+
+
+def serialization_payloads(rows=10000):
+    """
+    Payloads shaped like /api/pending-payments/ and /api/transactions/,
+    with Decimal and datetime values as views hand them to the renderer.
+    """
+    now = timezone.now()
+    pending = [
+        {
+            'account_id': i,
+            'client_name': f'Client {i}',
+            'client_code': f'C{i:05d}',
+            'exchange_name': f'Exchange {i % 7}',
+            'funding': 100000 + i,
+            'exchange_balance': 90000 - i,
+            'pnl': -10000 - 2 * i,
+            'my_share': 1000 + i,
+            'type': 'RECEIVE' if i % 3 else 'PAY',
+            'opening_points': 10000 + 2 * i,
+            'available_points': 10000 + 2 * i,
+            'share_percentage': Decimal('12.50'),
+            'remaining_amount': 500 + i,
+            'show_na': False,
+        }
+        for i in range(rows)
+    ]
+    transactions = [
+        {
+            'id': i,
+            'client_exchange': i % 50,
+            'client_name': f'Client {i % 50}',
+            'exchange_name': f'Exchange {i % 7}',
+            'date': now - timedelta(minutes=i),
+            'type': 'TRADE',
+            'type_display': 'Trade',
+            'amount': -(i % 1000),
+            'funding_before': 100000,
+            'funding_after': 100000,
+            'exchange_balance_before': 90000 + i,
+            'exchange_balance_after': 90000 + i - (i % 1000),
+            'sequence_no': i,
+            'notes': '',
+        }
+        for i in range(rows)
+    ]
+    return {
+        'pending_payments': {'pending_payments': pending, 'total_to_receive': 0, 'total_to_pay': 0},
+        'transactions': {'count': rows, 'results': transactions},
+    }
+
+
+def _timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, round(statistics.median(timings), 2)
+
+
+def serialization_benchmark(rows=10000, repeat=5):
+    """
+    Time DRF's JSONRenderer against FastJSONRenderer on each payload, plus
+    gzip of the rendered body (what ApiGZipMiddleware adds per response).
+
+    Returns:
+        dict of payload → json_ms, fast_json_ms, speedup, bytes, gzip_ms,
+        gzip_bytes and identical (both renderers produced the same bytes)
+    """
+    results = {}
+    for name, payload in serialization_payloads(rows).items():
+        slow, slow_ms = _timed(lambda: JSONRenderer().render(payload), repeat)
+        fast, fast_ms = _timed(lambda: FastJSONRenderer().render(payload), repeat)
+        compressed, gzip_ms = _timed(lambda: gzip.compress(fast, compresslevel=6), repeat)
+        results[name] = {
+            'json_ms': slow_ms,
+            'fast_json_ms': fast_ms,
+            'speedup': round(slow_ms / fast_ms, 1) if fast_ms else None,
+            'bytes': len(fast),
+            'gzip_ms': gzip_ms,
+            'gzip_bytes': len(compressed),
+            'identical': slow == fast,
+        }
+    return results
@@ -0,0 +1,138 @@
+"""
+Conditional GET (ETag / 304 Not Modified) for the mobile read APIs.
+
+Every user has a data version in the cache. core.signals bumps it on any
+write to the user's clients, accounts (and their report config),
+transactions or settlements; exchange writes bump a global version, as
+every user sees all exchanges. A read response's ETag is derived from both
+versions, the current day (reports count days back from today) and the
+request itself. A matching If-None-Match is answered 304 before the view
+computes anything, so an idle poll costs one cache lookup.
+
+ETags are only sent with a cache shared by all workers (CACHE_IS_SHARED).
+With a per-process cache a write only bumps the versions of the worker
+that served it, and the others would keep answering 304.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+GLOBAL_VERSION_KEY = 'data_version:global'
+
+
+def data_version_key(user_id):
+    return f'data_version:{user_id}'
+
+
+def _initial_version(key):
+    # A version lost from the cache restarts from the clock, which is above
+    # any count it reached, so an old ETag can never match again
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        _initial_version(key)
+
+
+def data_versions(user_id):
+    """
+    Returns:
+        tuple (user's data version, global data version), read in one cache call
+    """
+    keys = [data_version_key(user_id), GLOBAL_VERSION_KEY]
+    versions = cache.get_many(keys)
+    return tuple(versions.get(key) or _initial_version(key) for key in keys)
+
+
+def bump_data_version(user_id=None):
+    """
+    Advance a user's data version (the global one for user_id=None).
+
+    Bumped right away and again once the surrounding database transaction
+    commits, so a response built from pre-commit data in between is not
+    served under the final version.
+    """
+    key = data_version_key(user_id) if user_id else GLOBAL_VERSION_KEY
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def request_etag(request):
+    """Strong ETag of a read request for the data versions as they are now."""
+    user_id = request.user.pk
+    parts = [
+        user_id,
+        *data_versions(user_id),
+        timezone.now().date().isoformat(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ]
+    return quote_etag(hashlib.sha1(':'.join(map(str, parts)).encode()).hexdigest())
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def conditional_response(request, build_response):
+    """
+    304 when the request's If-None-Match holds the current ETag, otherwise
+    build_response() with the ETag set. Without a shared cache, always
+    build_response() and no ETag.
+    """
+    if not getattr(settings, 'CACHE_IS_SHARED', False):
+        return build_response()
+
+    etag = request_etag(request)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # Weak comparison (RFC 9110): GZipMiddleware sends our ETag back as W/"…"
+        client_etags = {_strip_weak(tag) for tag in parse_etags(if_none_match)}
+        if '*' in client_etags or _strip_weak(etag) in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+    response = build_response()
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_get(view):
+    """Decorator for @api_view functions (place it below @permission_classes)."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+        return conditional_response(request, lambda: view(request, *args, **kwargs))
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """ETag / 304 for the list and retrieve actions of a viewset."""
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
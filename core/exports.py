@@ -0,0 +1,37 @@
+"""
+Streaming CSV responses.
+
+Rows are written to the client as they are produced, so large exports keep
+memory flat and the first byte is sent immediately.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+
+
+class _Echo:
+    """File-like object whose write() returns the CSV line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv_response(filename, header, rows):
+    """
+    StreamingHttpResponse of a CSV attachment.
+
+    Args:
+        filename: Download file name
+        header: Header row
+        rows: Iterable of data rows, consumed lazily
+    """
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,56 @@
+"""
+Shared filters for transaction lists (web list and API).
+"""
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def filter_transactions(transactions, client_id=None, exchange_id=None, client_exchange_id=None,
+                        tx_type=None, start_date=None, end_date=None, search_query=""):
+    """
+    Apply the transaction list filters.
+
+    Args:
+        client_exchange_id: Specific account; takes priority over client_id / exchange_id
+        tx_type: Transaction type; FUNDING_MANUAL also matches legacy FUNDING
+        start_date / end_date: "YYYY-MM-DD" strings, ignored if invalid
+        search_query: Matches client/exchange name or code and notes
+    """
+    if client_exchange_id:
+        transactions = transactions.filter(client_exchange_id=client_exchange_id)
+    else:
+        if client_id:
+            transactions = transactions.filter(client_exchange__client_id=client_id)
+        if exchange_id:
+            transactions = transactions.filter(client_exchange__exchange_id=exchange_id)
+
+    if start_date:
+        try:
+            transactions = transactions.filter(date__gte=datetime.strptime(start_date, "%Y-%m-%d").date())
+        except ValueError:
+            pass
+
+    if end_date:
+        try:
+            transactions = transactions.filter(date__lte=datetime.strptime(end_date, "%Y-%m-%d").date())
+        except ValueError:
+            pass
+
+    if tx_type:
+        # Map FUNDING_MANUAL to also include legacy FUNDING transactions
+        if tx_type == 'FUNDING_MANUAL':
+            transactions = transactions.filter(type__in=['FUNDING_MANUAL', 'FUNDING'])
+        else:
+            transactions = transactions.filter(type=tx_type)
+
+    if search_query:
+        transactions = transactions.filter(
+            Q(client_exchange__client__name__icontains=search_query) |
+            Q(client_exchange__client__code__icontains=search_query) |
+            Q(client_exchange__exchange__name__icontains=search_query) |
+            Q(client_exchange__exchange__code__icontains=search_query) |
+            Q(notes__icontains=search_query)
+        )
+
+    return transactions
@@ -0,0 +1,272 @@
+"""
+Per-request instrumentation: wall time, DB time and query count, cache
+hits/misses and response size, plus in-process per-view latency histograms.
+
+RequestLoggingMiddleware starts a RequestMetrics for each request and
+records the finished request with record_request(). Histograms and
+counters live in the worker process; with METRICS_DIR set, each worker
+also writes them to a file there so core.prometheus can add up all
+workers of a deployment.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, float('inf'))
+
+_MISSING = object()
+
+logger = logging.getLogger('core.requests')
+
+
+def fingerprint(sql):
+    """SQL with literals and IN lists replaced, so repeated queries group together."""
+    sql = re.sub(r'"s\d+_x\d+"', '?', sql)  # savepoint names
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    return re.sub(r'\(\?(?:, \?)+\)', '(?, ...)', sql)
+
+
+class RequestMetrics:
+    """
+    Counters of one request. start() hooks the database connections and
+    cache backends of the current thread, stop() removes the hooks.
+    """
+
+    def __init__(self):
+        self.started = None
+        self.wall_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = []  # (sql, duration ms)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_size = None
+        self._connections = []
+        self._caches = []
+
+    def start(self):
+        self.started = time.perf_counter()
+        for connection in connections.all():
+            connection.execute_wrappers.append(self._execute)
+            self._connections.append(connection)
+        for cache in caches.all():
+            # Instance attributes shadow the backend methods until stop()
+            cache.get = self._counting_get(cache.get)
+            # BaseCache.get_many() reads through get(), which is counted already
+            if type(cache).get_many is not BaseCache.get_many:
+                cache.get_many = self._counting_get_many(cache.get_many)
+            self._caches.append(cache)
+
+    def stop(self, response=None):
+        self.wall_ms = (time.perf_counter() - self.started) * 1000
+        for connection in self._connections:
+            if self._execute in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self._execute)
+        for cache in self._caches:
+            vars(cache).pop('get', None)
+            vars(cache).pop('get_many', None)
+        self._connections, self._caches = [], []
+        if response is not None and not response.streaming:
+            self.response_size = len(response.content)
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.db_ms += duration
+            self.queries.append((sql, duration))
+
+    def _counting_get(self, get):
+        def counting_get(key, default=None, version=None):
+            value = get(key, _MISSING, version=version)
+            if value is _MISSING:
+                self.cache_misses += 1
+                return default
+            self.cache_hits += 1
+            return value
+        return counting_get
+
+    def _counting_get_many(self, get_many):
+        def counting_get_many(keys, version=None):
+            keys = list(keys)
+            values = get_many(keys, version=version)
+            self.cache_hits += len(values)
+            self.cache_misses += len(keys) - len(values)
+            return values
+        return counting_get_many
+
+    def top_queries(self, limit=5):
+        """
+        Returns:
+            list of (fingerprint, count, total ms), slowest in total first
+        """
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, duration in self.queries:
+            entry = grouped[fingerprint(sql)]
+            entry[0] += 1
+            entry[1] += duration
+        ranked = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, total) for sql, (count, total) in ranked[:limit]]
+
+    def server_timing(self):
+        """Value of the Server-Timing header."""
+        return ', '.join([
+            f'total;dur={self.wall_ms:.1f}',
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ])
+
+
+def _observe(buckets, bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            buckets[i] += 1
+            return
+
+
+def _cumulative(buckets, bounds):
+    cumulative, running = [], 0
+    for bound, hits in zip(bounds, buckets):
+        running += hits
+        cumulative.append((bound, running))
+    return cumulative
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency and queries-per-request histograms of one view,
+    in the Prometheus layout.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.query_buckets = [0] * len(QUERY_BUCKETS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+
+    def observe(self, metrics):
+        _observe(self.buckets, LATENCY_BUCKETS_MS, metrics.wall_ms)
+        _observe(self.query_buckets, QUERY_BUCKETS, metrics.query_count)
+        self.count += 1
+        self.total_ms += metrics.wall_ms
+        self.queries += metrics.query_count
+        self.db_ms += metrics.db_ms
+
+    def snapshot(self):
+        return {
+            'buckets': _cumulative(self.buckets, LATENCY_BUCKETS_MS),
+            'query_buckets': _cumulative(self.query_buckets, QUERY_BUCKETS),
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'queries': self.queries,
+            'db_ms': round(self.db_ms, 3),
+        }
+
+
+_histograms = defaultdict(LatencyHistogram)
+_counters = Counter()  # (name, ((label, value), ...)) → count
+_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def increment(name, amount=1, **labels):
+    """Add to a process-wide counter, e.g. increment('rate_limit_rejections')."""
+    with _lock:
+        _counters[name, tuple(sorted(labels.items()))] += amount
+
+
+def record_request(view_name, metrics, status_code):
+    """Add a finished request to its view's histograms and request counter."""
+    with _lock:
+        _histograms[view_name].observe(metrics)
+        _counters['http_requests', (('status', str(status_code)), ('view', view_name))] += 1
+    flush_process_metrics()
+
+
+def latency_histograms():
+    """
+    Returns:
+        dict of view name → histogram snapshot (buckets are cumulative
+        (upper bound, count) pairs)
+    """
+    with _lock:
+        return {view: histogram.snapshot() for view, histogram in _histograms.items()}
+
+
+def counters():
+    """
+    Returns:
+        dict of (name, ((label, value), ...)) → count
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def reset_process_metrics():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def process_metrics_path(pid=None):
+    """File of a worker process in METRICS_DIR, or None without a METRICS_DIR."""
+    directory = getattr(settings, 'METRICS_DIR', '')
+    if not directory:
+        return None
+    return os.path.join(directory, f'metrics-{pid or os.getpid()}.json')
+
+
+def process_snapshot():
+    """Histograms and counters of this process, JSON ready."""
+    return {
+        'histograms': latency_histograms(),
+        'counters': [[name, list(labels), value] for (name, labels), value in counters().items()],
+    }
+
+
+def flush_process_metrics(force=False):
+    """
+    Write this process's snapshot to METRICS_DIR, at most once every
+    METRICS_FLUSH_INTERVAL seconds unless forced. The file is replaced
+    atomically, so readers never see a partial write.
+    """
+    global _last_flush
+    path = process_metrics_path()
+    if path is None:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+        return
+    _last_flush = now
+
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(process_snapshot(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # Metrics must never fail the request that triggered the flush
+        logger.warning(f'Could not write metrics to {path}: {e}')
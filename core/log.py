@@ -0,0 +1,154 @@
+"""
+Logging pipeline for the security and request logs.
+
+Records are put on a bounded in-memory queue on the request thread and
+written to the real handlers (file, console) by a background
+QueueListener. When the queue is full, new records are dropped instead of
+blocking the request. The drops are counted, reported as one warning once
+the queue drains, and exported to /metrics.
+
+Each record is stamped with the request id, user id and view name of the
+request that logged it. JsonFormatter writes one JSON object per line.
+"""
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone as dt_timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .instrumentation import increment
+
+_request_context = contextvars.ContextVar('request_log_context', default={})
+
+
+def set_request_context(**values):
+    """Add request_id/user_id/view to the log context of the current request."""
+    _request_context.set({**_request_context.get(), **values})
+
+
+def clear_request_context():
+    _request_context.set({})
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with request_id, user_id and view (None outside a request)."""
+
+    def filter(self, record):
+        context = _request_context.get()
+        for key in ('request_id', 'user_id', 'view'):
+            if not hasattr(record, key):
+                setattr(record, key, context.get(key))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request context and any traceback."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, dt_timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'user_id': getattr(record, 'user_id', None),
+            'view': getattr(record, 'view', None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler in front of other handlers, with a bounded queue.
+
+    Configure it in LOGGING with the handlers it feeds as cfg:// references:
+
+        'queue': {
+            'class': 'core.log.BoundedQueueHandler',
+            'handlers': ['cfg://handlers.file', 'cfg://handlers.console'],
+            'queue_size': 10000,
+        }
+
+    A full queue drops the new record (emit() never blocks). The listener
+    thread is started lazily in each process, so forked workers (gunicorn
+    --preload) get their own.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        # dictConfig passes a ConvertingList; indexing resolves the cfg:// references
+        self.handlers = [handlers[i] for i in range(len(handlers))]
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.addFilter(RequestContextFilter())
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A listener thread does not survive fork(); start over with a fresh queue
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self.listener = _DropReportingListener(self)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        """Merge the message args on this thread, keeping the traceback separate."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            increment('log_records_dropped')
+
+    def close(self):
+        # logging.shutdown() closes this handler before the ones it feeds,
+        # so stopping the listener here drains the queue into them at exit
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self._pid = None
+        super().close()
+
+
+class _DropReportingListener(QueueListener):
+    """Writes queued records and reports drops once the queue has room again."""
+
+    def __init__(self, handler):
+        super().__init__(handler.queue, *handler.handlers, respect_handler_level=True)
+        self.handler = handler
+
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail when stopping with a full queue
+        self.queue.put(self._sentinel)
+
+    def handle(self, record):
+        super().handle(record)
+        dropped, self.handler.dropped = self.handler.dropped, 0
+        if dropped:
+            super().handle(logging.LogRecord(
+                'core.log', logging.WARNING, __file__, 0,
+                f'Log queue full: dropped {dropped} record(s)', None, None,
+            ))
@@ -90,9 +90,8 @@ class Command(BaseCommand):
                 if initial_final_share == 0:
                     continue
                 
-                # Get existing settlements for THIS account only (CRITICAL: account-specific filter)
-                existing_settlements = Settlement.objects.filter(client_exchange=account)
-                total_settled = sum(s.amount for s in existing_settlements) if existing_settlements.exists() else 0
+                # Settled so far for THIS account (running ledger column)
+                total_settled = account.settled_total
                 remaining_amount = max(0, initial_final_share - total_settled)
                 
                 # Store original account state BEFORE any modifications
@@ -196,6 +195,7 @@ class Command(BaseCommand):
                         funding_after = original_funding
 
                     # Create Settlement record (CRITICAL: filtered by account)
+                    # Settlement.save() updates account.settled_total/cycle_settled_total in the same transaction
                     Settlement.objects.create(
                         client_exchange=account,  # This ensures account isolation
                         amount=payment_amount,
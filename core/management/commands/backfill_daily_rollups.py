@@ -0,0 +1,83 @@
+"""
+Management command to (re)build DailyAccountRollup rows from Transaction rows.
+Aggregation runs in the database, one grouped query per run.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, F, Sum, Value, When
+from django.db.models.functions import Abs, TruncDate
+
+from core.models import DailyAccountRollup, Transaction
+
+
+def _conditional_sum(expression, *conditions, **filters):
+    return Sum(Case(
+        When(*conditions, then=expression, **filters),
+        default=Value(0),
+        output_field=BigIntegerField(),
+    ))
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily per-account report rollups from transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account-id',
+            type=int,
+            help='Only rebuild rollups for this account',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows inserted per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        transactions = Transaction.objects.all()
+        rollups = DailyAccountRollup.objects.all()
+        if options.get('account_id'):
+            transactions = transactions.filter(client_exchange_id=options['account_id'])
+            rollups = rollups.filter(account_id=options['account_id'])
+
+        movement = F('exchange_balance_after') - F('exchange_balance_before')
+        trade = {
+            'type': 'TRADE',
+            'exchange_balance_before__isnull': False,
+            'exchange_balance_after__isnull': False,
+        }
+        rows = transactions.order_by().annotate(
+            day=TruncDate('date'),
+        ).values('client_exchange_id', 'day').annotate(
+            turnover_sum=_conditional_sum(Abs(movement), **trade),
+            trade_pnl_sum=_conditional_sum(movement, **trade),
+            settlements_in_sum=_conditional_sum(
+                F('amount'), type__in=DailyAccountRollup.PAYMENT_TYPES, amount__gt=0
+            ),
+            settlements_out_sum=_conditional_sum(
+                -F('amount'), type__in=DailyAccountRollup.PAYMENT_TYPES, amount__lt=0
+            ),
+            tx_count_sum=Count('id'),
+        )
+
+        new_rollups = [
+            DailyAccountRollup(
+                account_id=row['client_exchange_id'],
+                day=row['day'],
+                turnover=row['turnover_sum'] or 0,
+                trade_pnl=row['trade_pnl_sum'] or 0,
+                settlements_in=row['settlements_in_sum'] or 0,
+                settlements_out=row['settlements_out_sum'] or 0,
+                tx_count=row['tx_count_sum'],
+            )
+            for row in rows.iterator()
+        ]
+
+        with transaction.atomic():
+            deleted, _ = rollups.delete()
+            DailyAccountRollup.objects.bulk_create(new_rollups, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Rebuilt {len(new_rollups)} daily rollups (replaced {deleted})'
+        ))
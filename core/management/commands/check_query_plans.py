@@ -0,0 +1,191 @@
+"""
+Management command to EXPLAIN the portal's hot report and ledger queries
+against a generated dataset and fail when one of them scans a whole table.
+
+The dataset is created inside a transaction that is always rolled back.
+On PostgreSQL sequential scans are disabled for the check, so the result
+does not depend on the dataset size: a query only reports a Seq Scan when
+no index can serve it.
+"""
+import json
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import (
+    Client,
+    ClientExchangeAccount,
+    DailyAccountRollup,
+    Exchange,
+    Settlement,
+    Transaction,
+)
+from core.reports import rollups_for
+
+# Large tables that must always be read through an index
+WATCHED_TABLES = (
+    Transaction._meta.db_table,
+    Settlement._meta.db_table,
+    DailyAccountRollup._meta.db_table,
+)
+
+
+def hot_queries(user, account, start, end):
+    """(name, queryset) pairs mirroring the filters used by the views."""
+    user_transactions = Transaction.objects.filter(client_exchange__client__user=user)
+    in_range = user_transactions.filter(date__gte=start, date__lte=end)
+    return [
+        ('report date range', in_range),
+        ('report payments', in_range.filter(type='RECORD_PAYMENT')),
+        ('report turnover', in_range.trades()),
+        ('time travel', user_transactions.filter(date__lte=start)),
+        ('pending payments history', user_transactions.filter(
+            type__in=DailyAccountRollup.PAYMENT_TYPES
+        )),
+        ('transaction list page', user_transactions.order_by('-created_at', '-id')[:201]),
+        ('account history', Transaction.objects.filter(
+            client_exchange=account
+        ).order_by('-created_at', '-id')[:20]),
+        ('account turnover', Transaction.objects.filter(
+            client_exchange=account, date__gte=start
+        ).trades()),
+        ('cycle settlements', Settlement.objects.filter(
+            client_exchange=account, date__gte=start
+        )),
+        ('latest settlement', Settlement.objects.filter(
+            client_exchange=account
+        ).order_by('-date', '-id')[:1]),
+        ('report rollups', rollups_for(user, start_date=start.date(), end_date=end.date())),
+        ('delta sync', user_transactions.filter(
+            updated_at__gt=start
+        ).order_by('updated_at', 'id')[:501]),
+    ]
+
+
+def _postgresql_plan(plan):
+    """(tables read by a Seq Scan, indexes used) of a JSON plan."""
+    scans, indexes = [], []
+    nodes = [entry['Plan'] for entry in json.loads(plan)]
+    while nodes:
+        node = nodes.pop()
+        if node.get('Node Type') == 'Seq Scan':
+            scans.append(node.get('Relation Name'))
+        if node.get('Index Name'):
+            indexes.append(node['Index Name'])
+        nodes.extend(node.get('Plans', []))
+    return scans, indexes
+
+
+def _sqlite_plan(plan):
+    """
+    (tables walked end to end, indexes used) of an EXPLAIN QUERY PLAN.
+    "SCAN table" is a full pass even when it goes through a covering index.
+    """
+    scans = re.findall(r'\bSCAN (\w+)', plan)
+    indexes = re.findall(r'\bUSING (?:COVERING )?INDEX (\w+)', plan)
+    return scans, indexes
+
+
+def query_plan(queryset):
+    """
+    Returns:
+        tuple (watched tables the database would scan in full, indexes used)
+    """
+    if connection.vendor == 'postgresql':
+        scans, indexes = _postgresql_plan(queryset.explain(format='json'))
+    elif connection.vendor == 'sqlite':
+        scans, indexes = _sqlite_plan(queryset.explain())
+    else:
+        raise CommandError(f'Query plan checks are not supported on {connection.vendor}')
+    full_scans = sorted({table for table in scans if table in WATCHED_TABLES})
+    return full_scans, sorted(set(indexes))
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot report queries on generated data and fail on sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--accounts',
+            type=int,
+            default=20,
+            help='Accounts in the generated dataset (default: 20)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=60,
+            help='Days of history per account (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            user, account, start, end = self._generate(options['accounts'], options['days'])
+            self._prepare_planner()
+
+            for name, queryset in hot_queries(user, account, start, end):
+                scans, indexes = query_plan(queryset)
+                if scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'  ✗ {name}: full scan of {", ".join(scans)}'))
+                else:
+                    self.stdout.write(f'  ✓ {name}: {", ".join(indexes)}')
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{len(failures)} query plan(s) fall back to a sequential scan')
+        self.stdout.write(self.style.SUCCESS('✅ All hot queries use an index'))
+
+    def _generate(self, account_count, days):
+        """Accounts spread over two users with daily trades, payments and settlements."""
+        User = get_user_model()
+        users = [
+            User.objects.create(username=f'_plan_check_{n}_{timezone.now().timestamp()}')
+            for n in range(2)
+        ]
+        exchange = Exchange.objects.create(name=f'_plan_check_{timezone.now().timestamp()}')
+        accounts = [
+            ClientExchangeAccount.objects.create(
+                client=Client.objects.create(name=f'Plan Check {n}', user=users[n % 2]),
+                exchange=exchange,
+            )
+            for n in range(account_count)
+        ]
+
+        end = timezone.now()
+        transactions = []
+        settlements = []
+        rollups = []
+        for account in accounts:
+            for day in range(days):
+                date = end - timedelta(days=day)
+                transactions.append(Transaction(
+                    client_exchange=account, date=date, type='TRADE', amount=10,
+                    exchange_balance_before=100, exchange_balance_after=110,
+                ))
+                transactions.append(Transaction(
+                    client_exchange=account, date=date, type='RECORD_PAYMENT', amount=5,
+                ))
+                settlements.append(Settlement(client_exchange=account, date=date, amount=5))
+                rollups.append(DailyAccountRollup(account=account, day=date.date()))
+
+        Transaction.objects.bulk_create(Transaction.assign_sequence_numbers(transactions), batch_size=1000)
+        Settlement.objects.bulk_create(settlements, batch_size=1000)
+        DailyAccountRollup.objects.bulk_create(rollups, batch_size=1000, ignore_conflicts=True)
+        return users[0], accounts[0], end - timedelta(days=days // 2), end
+
+    def _prepare_planner(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                for table in WATCHED_TABLES:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+                # Only an index-less query can still end up with a Seq Scan
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
@@ -1,21 +1,165 @@
 """
-Management command to generate sample data:
-- 10 clients
-- Exchange accounts for each client
-- Transactions spanning last 6 months
+Management command to generate sample (load test) data:
+- Clients with exchange accounts
+- Daily trade history with settlement payments
+
+Each account's history is simulated in memory with the model's own cycle
+lock and settlement ledger rules, then written with bulk_create() in
+batches, so millions of transactions load in minutes. Funding/exchange
+balance before/after values form an unbroken chain per account, and
+sequence numbers, daily rollups and ledger totals match the transactions.
 """
-from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
-from django.utils import timezone
-from decimal import Decimal
 import random
-from datetime import timedelta, datetime
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.etags import bump_data_version
+from core.metrics import invalidate_dashboard_metrics
+from core.models import (
+    CYCLE_LOCK_FIELDS,
+    Client,
+    ClientExchangeAccount,
+    DailyAccountRollup,
+    Exchange,
+    Settlement,
+    Transaction,
+)
+
+EXCHANGE_NAMES = ['Binance', 'Coinbase', 'Kraken', 'Bybit']
+CLIENT_NAMES = [
+    'Alice Johnson', 'Bob Smith', 'Charlie Brown', 'Diana Prince',
+    'Ethan Hunt', 'Fiona Chen', 'George Wilson', 'Hannah Martinez',
+    'Ian Thompson', 'Julia Rodriguez'
+]
+
+
+class AccountHistory:
+    """
+    Simulated history of one account: its transactions, settlements and
+    daily rollups, with the account fields left at their final values.
+    """
+
+    def __init__(self, account, rng):
+        self.account = account
+        self.rng = rng
+        self.transactions = []
+        self.settlements = []
+        self.rollups = {}
+
+    def add_transaction(self, tx_type, date, amount, funding_before, exchange_before, notes):
+        account = self.account
+        tx = Transaction(
+            client_exchange=account,
+            date=date,
+            type=tx_type,
+            amount=amount,
+            funding_before=funding_before,
+            funding_after=account.funding,
+            exchange_balance_before=exchange_before,
+            exchange_balance_after=account.exchange_balance,
+            sequence_no=len(self.transactions) + 1,
+            notes=notes,
+        )
+        self.transactions.append(tx)
+
+        day = tx.rollup_day()
+        rollup = self.rollups.get(day)
+        if rollup is None:
+            rollup = self.rollups[day] = DailyAccountRollup(account=account, day=day)
+        for field, value in tx.rollup_values().items():
+            setattr(rollup, field, getattr(rollup, field) + value)
+
+    def resolve_cycle(self, now):
+        """Same cycle lock update as lock_initial_share_if_needed(), without saving."""
+        state = self.account.preview_settlement_state(now=now)
+        if state['changed']:
+            for field in CYCLE_LOCK_FIELDS + ['cycle_settled_total']:
+                setattr(self.account, field, state[field])
+
+    def fund(self, date, amount):
+        account = self.account
+        funding_before, exchange_before = account.funding, account.exchange_balance
+        account.funding += amount
+        account.exchange_balance += amount
+        self.add_transaction(
+            'FUNDING_MANUAL', date, amount, funding_before, exchange_before,
+            f'Manual funding added: {amount}',
+        )
+        self.resolve_cycle(date)
+
+    def trade(self, date, volatility):
+        account = self.account
+        exchange_before = account.exchange_balance
+        account.exchange_balance = max(0, exchange_before + int(self.rng.gauss(0, volatility)))
+        self.add_transaction(
+            'TRADE', date, account.exchange_balance - exchange_before,
+            account.funding, exchange_before, 'Trade execution',
+        )
+        self.resolve_cycle(date)
+
+    def record_payment(self, date):
+        """Settlement payment following the record_payment flow (share > 0 only)."""
+        account = self.account
+        client_pnl = account.compute_client_pnl()
+        state = account.preview_settlement_state(now=date)
+        if client_pnl == 0 or state['initial_final_share'] <= 0 or state['remaining'] <= 0:
+            return
+
+        remaining = state['remaining']
+        paid = remaining if self.rng.random() < 0.5 else self.rng.randint(1, remaining)
+        masked_capital = account.compute_masked_capital(paid)
+        if masked_capital == 0:
+            return
+
+        funding_before, exchange_before = account.funding, account.exchange_balance
+        if client_pnl < 0:
+            # LOSS CASE: client pays you, masked capital reduces funding
+            if account.funding - masked_capital < 0:
+                return
+            account.funding -= masked_capital
+            amount = paid
+        else:
+            # PROFIT CASE: you pay client, masked capital reduces exchange balance
+            if account.exchange_balance - masked_capital < 0:
+                return
+            account.exchange_balance -= masked_capital
+            amount = -paid
+
+        self.settlements.append(Settlement(
+            client_exchange=account, amount=paid, date=date, notes=f'Payment recorded: {paid}',
+        ))
+        account.apply_settled_amount(paid, date)
+        self.add_transaction(
+            'RECORD_PAYMENT', date, amount, funding_before, exchange_before,
+            f'Settlement share payment: {paid}. Masked Capital: {masked_capital}',
+        )
+
+    def simulate(self, start, days, trades_per_day, settlement_rate):
+        rng = self.rng
+        opening = rng.randint(50000, 500000)
+        self.fund(start, opening)
+        volatility = opening * 0.03
+
+        whole_trades, extra_trade = int(trades_per_day), trades_per_day % 1
+        for day in range(days):
+            day_start = start + timedelta(days=day)
+            trades = whole_trades + (rng.random() < extra_trade)
+            for second in sorted(rng.randrange(1, 86000) for _ in range(trades)):
+                self.trade(day_start + timedelta(seconds=second), volatility)
+            if rng.random() < settlement_rate:
+                self.record_payment(day_start + timedelta(seconds=86300))
 
-from core.models import Client, Exchange, ClientExchangeAccount, Transaction
+        self.account.next_sequence_no = len(self.transactions) + 1
 
 
 class Command(BaseCommand):
-    help = 'Generate sample data: 10 clients with 6 months of transaction history'
+    help = 'Generate sample data (clients, accounts, trades, settlements) in bulk'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -23,176 +167,145 @@ class Command(BaseCommand):
             type=int,
             help='User ID to associate clients with (defaults to first user)',
         )
+        parser.add_argument('--clients', type=int, default=10, help='Number of clients (default: 10)')
+        parser.add_argument('--exchanges', type=int, default=4, help='Number of exchanges (default: 4)')
+        parser.add_argument(
+            '--accounts-per-client',
+            type=int,
+            default=2,
+            help='Exchange accounts per client, at most --exchanges (default: 2)',
+        )
+        parser.add_argument('--days', type=int, default=180, help='Days of history (default: 180)')
+        parser.add_argument(
+            '--trades-per-day',
+            type=float,
+            default=1.0,
+            help='Average TRADE transactions per account per day (default: 1)',
+        )
+        parser.add_argument(
+            '--settlement-rate',
+            type=float,
+            default=0.05,
+            help='Chance per account per day of a settlement payment (default: 0.05)',
+        )
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible dataset')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Transactions written per bulk insert (default: 5000)',
+        )
 
     def handle(self, *args, **options):
-        # Get or create user
+        User = get_user_model()
         user_id = options.get('user_id')
         if user_id:
             try:
                 user = User.objects.get(pk=user_id)
             except User.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f'User with ID {user_id} not found'))
-                return
+                raise CommandError(f'User with ID {user_id} not found')
         else:
-            user = User.objects.first()
+            user = User.objects.order_by('pk').first()
             if not user:
-                self.stdout.write(self.style.ERROR('No users found. Please create a user first.'))
-                return
+                raise CommandError('No users found. Please create a user first.')
 
-        self.stdout.write(self.style.SUCCESS(f'Using user: {user.username}'))
+        if options['accounts_per_client'] > options['exchanges']:
+            raise CommandError('--accounts-per-client cannot exceed --exchanges')
 
-        # Get or create exchanges
-        exchanges = []
-        exchange_names = ['Binance', 'Coinbase', 'Kraken', 'Bybit']
-        for name in exchange_names:
-            exchange, created = Exchange.objects.get_or_create(name=name)
-            exchanges.append(exchange)
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created exchange: {name}'))
+        rng = random.Random(options['seed'])
+        # Client codes are unique, so every run gets its own code prefix
+        run_tag = options['seed'] if options['seed'] is not None else rng.randrange(10 ** 6)
+        code_prefix = f'S{run_tag}-'
+        if Client.objects.filter(code__startswith=code_prefix).exists():
+            raise CommandError(f'Sample clients with codes {code_prefix}* already exist; use another --seed')
 
-        # Client names
-        client_names = [
-            'Alice Johnson', 'Bob Smith', 'Charlie Brown', 'Diana Prince',
-            'Ethan Hunt', 'Fiona Chen', 'George Wilson', 'Hannah Martinez',
-            'Ian Thompson', 'Julia Rodriguez'
-        ]
-
-        # Generate 10 clients
-        clients = []
-        for i, name in enumerate(client_names):
-            client, created = Client.objects.get_or_create(
-                name=name,
-                defaults={
-                    'user': user,
-                    'code': f'CLT{i+1:03d}' if i < 5 else None,  # First 5 have codes, rest don't
-                    'referred_by': random.choice(['', 'Referral A', 'Referral B', '']) if i % 3 == 0 else '',
-                    'is_company_client': i % 4 == 0,  # Every 4th client is company client
-                }
-            )
-            clients.append(client)
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created client: {name}'))
+        self.stdout.write(self.style.SUCCESS(f'Using user: {user.username}'))
+        started = time.monotonic()
 
-        # Generate accounts and transactions
-        now = timezone.now()
-        six_months_ago = now - timedelta(days=180)
+        exchanges = self._exchanges(options['exchanges'])
+        clients = Client.objects.bulk_create([
+            Client(
+                name=self._client_name(i),
+                user=user,
+                code=f'{code_prefix}{i + 1:06d}' if i % 2 == 0 else None,
+                referred_by=rng.choice(['', 'Referral A', 'Referral B']) if i % 3 == 0 else '',
+                is_company_client=i % 4 == 0,
+            )
+            for i in range(options['clients'])
+        ], batch_size=options['batch_size'])
 
+        start = timezone.now() - timedelta(days=options['days'])
+        totals = {'accounts': 0, 'transactions': 0, 'settlements': 0}
+        pending = []
+        pending_transactions = 0
         for client in clients:
-            # Assign 1-2 exchanges per client
-            num_exchanges = random.randint(1, 2)
-            selected_exchanges = random.sample(exchanges, num_exchanges)
-
-            for exchange in selected_exchanges:
-                # Create or get account
-                account, created = ClientExchangeAccount.objects.get_or_create(
+            for exchange in rng.sample(exchanges, options['accounts_per_client']):
+                history = AccountHistory(ClientExchangeAccount(
                     client=client,
                     exchange=exchange,
-                    defaults={
-                        'funding': random.randint(50000, 500000),  # Initial funding: 50k to 500k
-                        'exchange_balance': random.randint(40000, 600000),  # Initial balance
-                        'my_percentage': random.choice([5, 10, 15, 20, 25]),
-                        'loss_share_percentage': random.choice([5, 10, 15, 20]),
-                        'profit_share_percentage': random.choice([5, 10, 15, 20, 25]),
-                    }
-                )
-
-                if created:
-                    self.stdout.write(self.style.SUCCESS(
-                        f'Created account: {client.name} - {exchange.name}'
-                    ))
-
-                # Generate transactions for last 6 months
-                # Start with initial funding transaction
-                initial_funding = account.funding
-                Transaction.objects.get_or_create(
-                    client_exchange=account,
-                    type='FUNDING',
-                    date=six_months_ago,
-                    defaults={
-                        'amount': initial_funding,
-                        'exchange_balance_after': account.exchange_balance,
-                        'notes': f'Initial funding for {client.name}',
-                    }
-                )
-
-                # Generate transactions over 6 months
-                # Create transactions roughly every 3-7 days
-                current_date = six_months_ago + timedelta(days=random.randint(1, 5))
-                current_balance = account.exchange_balance
-
-                transaction_count = 0
-                while current_date < now:
-                    # Random transaction type
-                    tx_type = random.choices(
-                        ['FUNDING', 'TRADE', 'FEE', 'ADJUSTMENT', 'RECORD_PAYMENT'],
-                        weights=[5, 60, 15, 10, 10]  # More trades, fewer other types
-                    )[0]
-
-                    if tx_type == 'FUNDING':
-                        amount = random.randint(10000, 100000)
-                        current_balance += amount
-                        notes = f'Additional funding for {client.name}'
-
-                    elif tx_type == 'TRADE':
-                        # Trades can be positive or negative
-                        amount = random.randint(-50000, 80000)
-                        current_balance += amount
-                        notes = f'Trade execution - {client.name}'
-
-                    elif tx_type == 'FEE':
-                        amount = -random.randint(100, 5000)  # Fees are negative
-                        current_balance += amount
-                        notes = f'Trading fee - {exchange.name}'
-
-                    elif tx_type == 'ADJUSTMENT':
-                        amount = random.randint(-10000, 10000)
-                        current_balance += amount
-                        notes = f'Balance adjustment - {client.name}'
-
-                    elif tx_type == 'RECORD_PAYMENT':
-                        # Settlement payments - apply sign based on PnL
-                        client_pnl = current_balance - account.funding
-                        payment_amount = random.randint(500, 5000)
-                        if client_pnl < 0:
-                            # Loss case: Client pays you → positive
-                            amount = payment_amount
-                        else:
-                            # Profit case: You pay client → negative
-                            amount = -payment_amount
-                        # Note: RECORD_PAYMENT doesn't change balance, but we'll track it
-                        notes = f'Settlement payment - {client.name}'
-
-                    # Ensure balance doesn't go too negative
-                    if current_balance < -100000:
-                        current_balance = random.randint(0, 100000)
-
-                    # Create transaction
-                    Transaction.objects.create(
-                        client_exchange=account,
-                        type=tx_type,
-                        date=current_date,
-                        amount=amount,
-                        exchange_balance_after=current_balance,
-                        notes=notes,
-                    )
-
-                    transaction_count += 1
-
-                    # Move to next date (3-7 days later)
-                    current_date += timedelta(days=random.randint(3, 7))
-
-                # Update account balance to final value
-                account.exchange_balance = current_balance
-                account.save()
-
-                self.stdout.write(self.style.SUCCESS(
-                    f'  Generated {transaction_count} transactions for {client.name} - {exchange.name}'
-                ))
+                    my_percentage=rng.choice([5, 10, 15, 20, 25]),
+                    loss_share_percentage=rng.choice([5, 10, 15, 20]),
+                    profit_share_percentage=rng.choice([5, 10, 15, 20, 25]),
+                ), rng)
+                history.simulate(start, options['days'], options['trades_per_day'], options['settlement_rate'])
+                pending.append(history)
+                pending_transactions += len(history.transactions)
+                if pending_transactions >= options['batch_size']:
+                    self._write(pending, options['batch_size'], totals)
+                    pending, pending_transactions = [], 0
+        if pending:
+            self._write(pending, options['batch_size'], totals)
+
+        # bulk_create() sends no signals
+        invalidate_dashboard_metrics(user.pk)
+        bump_data_version(user.pk)
 
+        elapsed = time.monotonic() - started
         self.stdout.write(self.style.SUCCESS(
-            f'\n✅ Successfully generated sample data:\n'
+            f'\n✅ Successfully generated sample data in {elapsed:.1f}s:\n'
             f'  - {len(clients)} clients\n'
-            f'  - {ClientExchangeAccount.objects.filter(client__user=user).count()} exchange accounts\n'
-            f'  - {Transaction.objects.filter(client_exchange__client__user=user).count()} total transactions'
+            f'  - {totals["accounts"]} exchange accounts\n'
+            f'  - {totals["transactions"]} transactions\n'
+            f'  - {totals["settlements"]} settlements'
         ))
 
+    def _exchanges(self, count):
+        exchanges = []
+        for n in range(count):
+            name = EXCHANGE_NAMES[n] if n < len(EXCHANGE_NAMES) else f'Exchange {n + 1}'
+            exchange, created = Exchange.objects.get_or_create(name=name)
+            exchanges.append(exchange)
+            if created:
+                self.stdout.write(self.style.SUCCESS(f'Created exchange: {name}'))
+        return exchanges
+
+    def _client_name(self, i):
+        name = CLIENT_NAMES[i % len(CLIENT_NAMES)]
+        if i >= len(CLIENT_NAMES):
+            name = f'{name} {i // len(CLIENT_NAMES) + 1}'
+        return name
+
+    def _write(self, histories, batch_size, totals):
+        """Insert a batch of simulated accounts with their history."""
+        with transaction.atomic():
+            accounts = ClientExchangeAccount.objects.bulk_create(
+                [history.account for history in histories], batch_size=batch_size
+            )
+            transactions = [tx for history in histories for tx in history.transactions]
+            settlements = [s for history in histories for s in history.settlements]
+            Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+            Settlement.objects.bulk_create(settlements, batch_size=batch_size)
+            DailyAccountRollup.objects.bulk_create(
+                [rollup for history in histories for rollup in history.rollups.values()],
+                batch_size=batch_size,
+            )
+
+            # created_at is set to the insert time; date the rows as they happened
+            account_ids = [account.pk for account in accounts]
+            Transaction.objects.filter(client_exchange_id__in=account_ids).update(created_at=F('date'))
+            Settlement.objects.filter(client_exchange_id__in=account_ids).update(created_at=F('date'))
+
+        totals['accounts'] += len(accounts)
+        totals['transactions'] += len(transactions)
+        totals['settlements'] += len(settlements)
+        self.stdout.write(f'  Wrote {totals["transactions"]} transactions for {totals["accounts"]} accounts')
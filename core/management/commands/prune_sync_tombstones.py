@@ -0,0 +1,30 @@
+"""
+Management command to delete old SyncTombstone rows.
+
+Devices whose sync cursor is older than SYNC_TOMBSTONE_RETENTION_DAYS get a
+full snapshot instead of a delta, so tombstones past that age are never read.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import SyncTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete delta sync tombstones older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90),
+            help='Keep tombstones of the last N days (default: SYNC_TOMBSTONE_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'✅ Deleted {deleted} tombstone(s) older than {options["days"]} days'))
@@ -0,0 +1,78 @@
+"""
+Management command to verify and rebuild the per-account settlement ledger
+(ClientExchangeAccount.settled_total / cycle_settled_total) from Settlement rows.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import BigIntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.models import ClientExchangeAccount, Settlement
+
+
+def _settlement_sum(**filters):
+    """Correlated SUM(amount) over the account's settlements."""
+    settlements = Settlement.objects.filter(
+        client_exchange=OuterRef('pk'), **filters
+    ).order_by().values('client_exchange').annotate(
+        total=Sum('amount')
+    ).values('total')
+    return Coalesce(
+        Subquery(settlements, output_field=BigIntegerField()),
+        Value(0),
+        output_field=BigIntegerField(),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Verify (and rebuild) account settlement totals from Settlement rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report mismatches, do not write',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of accounts updated per query (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        accounts = ClientExchangeAccount.objects.annotate(
+            expected_settled=_settlement_sum(),
+            # date >= NULL matches nothing, so accounts without a cycle get 0
+            expected_cycle_settled=_settlement_sum(date__gte=OuterRef('cycle_start_date')),
+        ).select_related('client', 'exchange').order_by('pk')
+
+        mismatched = []
+        for account in accounts.iterator(chunk_size=options['batch_size']):
+            if (account.settled_total == account.expected_settled and
+                    account.cycle_settled_total == account.expected_cycle_settled):
+                continue
+
+            self.stdout.write(self.style.WARNING(
+                f'  {account}: settled {account.settled_total} → {account.expected_settled}, '
+                f'cycle {account.cycle_settled_total} → {account.expected_cycle_settled}'
+            ))
+            account.settled_total = account.expected_settled
+            account.cycle_settled_total = account.expected_cycle_settled
+            mismatched.append(account)
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('All settlement totals are consistent'))
+            return
+
+        if options['check']:
+            raise CommandError(f'{len(mismatched)} account(s) have stale settlement totals')
+
+        with transaction.atomic():
+            ClientExchangeAccount.objects.bulk_update(
+                mismatched,
+                ['settled_total', 'cycle_settled_total'],
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt settlement totals for {len(mismatched)} account(s)'))
@@ -0,0 +1,98 @@
+"""
+Management command to find and repair per-account Transaction.sequence_no
+problems: duplicate numbers, gaps, and a ClientExchangeAccount.next_sequence_no
+counter that does not follow the last transaction.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from core.models import ClientExchangeAccount, Transaction
+
+
+class Command(BaseCommand):
+    help = 'Detect and renumber duplicate or gapped transaction sequence numbers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report broken sequences, do not write',
+        )
+        parser.add_argument(
+            '--account-id',
+            type=int,
+            help='Only check this account',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Transactions updated per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        accounts = ClientExchangeAccount.objects.annotate(
+            tx_count=Count('transactions'),
+            distinct_seq=Count('transactions__sequence_no', distinct=True),
+            min_seq=Min('transactions__sequence_no'),
+            max_seq=Max('transactions__sequence_no'),
+        ).select_related('client', 'exchange').order_by('pk')
+        if options.get('account_id'):
+            accounts = accounts.filter(pk=options['account_id'])
+
+        broken = []
+        for account in accounts.iterator():
+            # A healthy account is numbered exactly 1..n with the counter at n + 1
+            healthy = (
+                account.distinct_seq == account.tx_count and
+                account.next_sequence_no == account.tx_count + 1 and
+                (account.tx_count == 0 or (account.min_seq == 1 and account.max_seq == account.tx_count))
+            )
+            if healthy:
+                continue
+
+            self.stdout.write(self.style.WARNING(
+                f'  {account}: {account.tx_count} transactions, '
+                f'{account.tx_count - account.distinct_seq} duplicate(s), '
+                f'numbered {account.min_seq}..{account.max_seq}, next {account.next_sequence_no}'
+            ))
+            broken.append(account.pk)
+
+        if not broken:
+            self.stdout.write(self.style.SUCCESS('All transaction sequences are consistent'))
+            return
+
+        if options['check']:
+            raise CommandError(f'{len(broken)} account(s) have broken transaction sequences')
+
+        renumbered = 0
+        for account_id in broken:
+            renumbered += self._renumber(account_id, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Repaired sequences of {len(broken)} account(s) ({renumbered} transaction(s) renumbered)'
+        ))
+
+    def _renumber(self, account_id, batch_size):
+        """
+        Renumber an account's transactions 1..n, keeping their current order
+        (ties broken by creation), and reset its counter to n + 1.
+        """
+        with transaction.atomic():
+            # Lock the counter row so no transaction is numbered while we renumber
+            list(ClientExchangeAccount.objects.select_for_update().filter(pk=account_id).values_list('pk'))
+
+            changed = []
+            transactions = Transaction.objects.filter(
+                client_exchange_id=account_id
+            ).order_by('sequence_no', 'created_at', 'id').only('id', 'sequence_no')
+            count = 0
+            for count, tx in enumerate(transactions.iterator(), start=1):
+                if tx.sequence_no != count:
+                    tx.sequence_no = count
+                    changed.append(tx)
+
+            Transaction.objects.bulk_update(changed, ['sequence_no'], batch_size=batch_size)
+            ClientExchangeAccount.objects.filter(pk=account_id).update(next_sequence_no=count + 1)
+        return len(changed)
@@ -0,0 +1,110 @@
+"""
+Management command to benchmark the hot web and mobile endpoints at one or
+more dataset scales, emit the results as JSON and compare them against a
+stored baseline. --serialization times the JSON renderers instead.
+"""
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import (
+    DEFAULT_TOLERANCE, SCALES, BenchmarkError, compare, run_scale, serialization_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark hot endpoints (time, queries, memory) and compare against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            action='append',
+            choices=list(SCALES),
+            help='Dataset scale to run, repeatable (default: small)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed requests per endpoint (default: 5)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Seed of the generated datasets (default: 1)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the JSON results to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            help='Baseline JSON file to compare against',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=DEFAULT_TOLERANCE,
+            help=f'Allowed time/memory growth over the baseline (default: {DEFAULT_TOLERANCE})',
+        )
+        parser.add_argument(
+            '--serialization',
+            action='store_true',
+            help='Time JSON rendering of 10k-row pending and transaction payloads instead',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Rows per payload with --serialization (default: 10000)',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Store these results in the --baseline file instead of comparing',
+        )
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options['baseline']) if options.get('baseline') else None
+        if options['update_baseline'] and not baseline_path:
+            raise CommandError('--update-baseline needs --baseline')
+
+        if options['serialization']:
+            results = serialization_benchmark(rows=options['rows'], repeat=options['repeat'])
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+            return
+
+        results = {}
+        for scale in options.get('scale') or ['small']:
+            self.stderr.write(f'Benchmarking {scale} dataset...')
+            try:
+                results[scale] = run_scale(scale, repeat=options['repeat'], seed=options['seed'])
+            except BenchmarkError as exc:
+                raise CommandError(str(exc))
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options.get('output'):
+            Path(options['output']).write_text(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if not baseline_path:
+            return
+
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        if options['update_baseline']:
+            baseline.update(results)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+            self.stderr.write(self.style.SUCCESS(f'✅ Baseline updated: {baseline_path}'))
+            return
+
+        regressions = compare(results, baseline, options['tolerance'])
+        for message in regressions:
+            self.stderr.write(self.style.ERROR(f'  ✗ {message}'))
+        if regressions:
+            raise CommandError(f'{len(regressions)} benchmark regression(s) against {baseline_path}')
+        self.stderr.write(self.style.SUCCESS('✅ No regressions against the baseline'))
@@ -0,0 +1,30 @@
+"""
+Management command to precompute the cached per-user dashboard metrics.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.metrics import warm_dashboard_metrics
+
+
+class Command(BaseCommand):
+    help = 'Compute and cache dashboard metrics for users with clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='Only warm metrics for this user',
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(clients__isnull=False).distinct()
+        if options.get('username'):
+            users = users.filter(username=options['username'])
+
+        warmed = 0
+        for user in users.iterator():
+            warm_dashboard_metrics(user)
+            warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Warmed dashboard metrics for {warmed} user(s)'))
@@ -0,0 +1,98 @@
+"""
+Per-user dashboard metrics cache.
+
+The totals shown on the web dashboard and the mobile summary (funding,
+balance, PnL, My Share, turnover, counts) are computed once per user and
+kept in the Django cache. core.signals drops a user's entry whenever one of
+their clients, accounts, transactions or settlements is written, so the
+next dashboard load recomputes it. That only reaches every worker with a
+shared cache (CACHE_IS_SHARED); with a per-process cache the metrics are
+computed on every load instead of serving another worker's stale totals.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Client, ClientExchangeAccount
+from .reports import rollup_totals, rollups_for
+
+
+def metrics_cache_key(user_id):
+    return f'dashboard_metrics:{user_id}'
+
+
+def compute_dashboard_metrics(user):
+    """
+    Compute the dashboard totals of a user from their accounts.
+
+    Returns:
+        dict with total_funding, total_exchange_balance, total_client_pnl,
+        total_my_share (signed), total_share_amount (unsigned),
+        total_turnover, total_clients, total_accounts
+    """
+    metrics = {
+        'total_funding': 0,
+        'total_exchange_balance': 0,
+        'total_client_pnl': 0,
+        'total_my_share': Decimal(0),
+        'total_share_amount': 0,
+        'total_turnover': rollup_totals(rollups_for(user))['turnover'],
+        'total_clients': Client.objects.filter(user=user).count(),
+        'total_accounts': 0,
+    }
+
+    for account in ClientExchangeAccount.objects.filter(client__user=user):
+        client_pnl = account.compute_client_pnl()
+        share_amount = account.compute_my_share()
+
+        metrics['total_accounts'] += 1
+        metrics['total_funding'] += account.funding
+        metrics['total_exchange_balance'] += account.exchange_balance
+        metrics['total_client_pnl'] += client_pnl
+        metrics['total_share_amount'] += share_amount
+
+        # FINANCIAL INTERPRETATION: Apply sign to Total My Share
+        # - If client_pnl < 0 (LOSS): Client owes you → share is POSITIVE
+        # - If client_pnl > 0 (PROFIT): You owe client → share is NEGATIVE
+        if client_pnl < 0:
+            metrics['total_my_share'] += share_amount
+        elif client_pnl > 0:
+            metrics['total_my_share'] -= share_amount
+
+    return metrics
+
+
+def warm_dashboard_metrics(user):
+    """Recompute a user's metrics and store them in the cache."""
+    metrics = compute_dashboard_metrics(user)
+    cache.set(
+        metrics_cache_key(user.pk),
+        metrics,
+        getattr(settings, 'DASHBOARD_METRICS_CACHE_TIMEOUT', 3600),
+    )
+    return metrics
+
+
+def get_dashboard_metrics(user):
+    """Cached dashboard metrics of a user, computed on a miss."""
+    if not getattr(settings, 'CACHE_IS_SHARED', False):
+        return compute_dashboard_metrics(user)
+    metrics = cache.get(metrics_cache_key(user.pk))
+    if metrics is None:
+        metrics = warm_dashboard_metrics(user)
+    return metrics
+
+
+def invalidate_dashboard_metrics(user_id):
+    """
+    Drop a user's cached metrics.
+
+    The entry is deleted right away and again once the surrounding database
+    transaction commits, so a request that read the pre-commit data in
+    between cannot leave stale totals behind.
+    """
+    key = metrics_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -1,33 +1,142 @@
 """
-Security middleware for rate limiting and request validation.
+Security middleware for rate limiting and request validation, request
+logging/instrumentation, and gzip for large API responses.
 """
+import re
 import time
+import uuid
 from django.core.cache import cache
 from django.http import HttpResponse, JsonResponse
 from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
 from django.utils.deprecation import MiddlewareMixin
 import logging
 
+from .instrumentation import RequestMetrics, increment, record_request
+from .log import clear_request_context, set_request_context
+
 logger = logging.getLogger('core.security')
+request_logger = logging.getLogger('core.requests')
+
+
+def rate_limit_hit(key, max_requests, window, now=None):
+    """
+    Count one request against a sliding window limit.
+    
+    Uses two fixed-window counters (current and previous window) updated
+    with atomic cache add/incr, so all workers sharing the cache enforce one
+    limit. The previous window is weighted by how much of it still overlaps
+    the sliding window. Rejected requests are taken back off the counter, so
+    a client that keeps retrying is allowed again once the window slides.
+    
+    Returns: True if the request is allowed, False if over the limit
+    """
+    if now is None:
+        now = time.time()
+    current_window = int(now // window)
+    current_key = f'{key}:{current_window}'
+    
+    # add() only creates the counter if it is missing; incr() is atomic
+    cache.add(current_key, 0, window * 2)
+    try:
+        current_count = cache.incr(current_key)
+    except ValueError:
+        # Counter expired/evicted between add() and incr()
+        cache.set(current_key, 1, window * 2)
+        current_count = 1
+    
+    previous_count = cache.get(f'{key}:{current_window - 1}', 0)
+    overlap = 1 - (now % window) / window
+    if previous_count * overlap + current_count <= max_requests:
+        return True
+    
+    try:
+        cache.decr(current_key)
+    except ValueError:
+        pass
+    return False
 
 
 class RequestLoggingMiddleware(MiddlewareMixin):
-    """Log all requests and responses for debugging."""
+    """
+    Log and instrument every request.
+    
+    Records wall time, DB time, query count, cache hits/misses and response
+    size, sends them back in a Server-Timing header (SERVER_TIMING_ENABLED)
+    and adds the request to its view's latency histogram. Requests slower
+    than SLOW_REQUEST_MS are logged as warnings with their top queries.
+    
+    Every log record written during the request carries its request id
+    (the client's X-Request-ID when valid, echoed back), user id and view.
+    """
+    REQUEST_ID_PATTERN = re.compile(r'^[\w.-]{1,64}$')
+    
     def process_request(self, request):
-        logger.info(f"REQUEST: {request.method} {request.path}")
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+        if not self.REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        clear_request_context()
+        set_request_context(request_id=request_id)
+        
+        request._metrics = RequestMetrics()
+        request._metrics.start()
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.set_user_context(request)
+        set_request_context(view=request.resolver_match.view_name)
         return None
 
+    def set_user_context(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            set_request_context(user_id=user.pk)
+
     def process_response(self, request, response):
-        logger.info(f"RESPONSE: {response.status_code} {request.path}")
+        metrics = getattr(request, '_metrics', None)
+        if metrics is None:
+            return response
+        metrics.stop(response)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else '<unresolved>'
+        record_request(view_name, metrics, response.status_code)
+        # API token users are only authenticated inside the view
+        self.set_user_context(request)
+
+        size = 'streamed' if metrics.response_size is None else f'{metrics.response_size}B'
+        request_logger.info(
+            f"{request.method} {request.path} {response.status_code} {view_name} "
+            f"{metrics.wall_ms:.1f}ms db={metrics.db_ms:.1f}ms/{metrics.query_count}q "
+            f"cache={metrics.cache_hits}h/{metrics.cache_misses}m size={size}"
+        )
+
+        if metrics.wall_ms >= getattr(settings, 'SLOW_REQUEST_MS', 500):
+            top = '\n'.join(
+                f'  {count}x {total:.1f}ms {sql[:300]}' for sql, count, total in metrics.top_queries()
+            )
+            request_logger.warning(
+                f"SLOW REQUEST: {request.method} {request.path} {view_name} took "
+                f"{metrics.wall_ms:.1f}ms ({metrics.query_count} queries, {metrics.db_ms:.1f}ms in DB)\n{top}"
+            )
+
         if response.status_code == 500:
             logger.error(f"500 ERROR at {request.path}")
+
+        if getattr(settings, 'SERVER_TIMING_ENABLED', True):
+            response['Server-Timing'] = metrics.server_timing()
+        response['X-Request-ID'] = request.request_id
+        clear_request_context()
         return response
 
 
 class RateLimitMiddleware(MiddlewareMixin):
     """
     Rate limiting middleware to prevent abuse.
-    Limits requests per IP address within a time window.
+    Limits requests per IP address within a sliding time window.
+    Counters live in the default cache, so configure a shared backend
+    (CACHE_BACKEND) to enforce one limit across all workers.
     """
     
     def process_request(self, request):
@@ -42,25 +151,18 @@ class RateLimitMiddleware(MiddlewareMixin):
         # Get client IP address
         ip_address = self.get_client_ip(request)
         
-        # Rate limit key
-        rate_limit_key = f'rate_limit:{ip_address}'
-        
-        # Get current request count
-        requests = cache.get(rate_limit_key, 0)
         max_requests = getattr(settings, 'RATE_LIMIT_REQUESTS', 100)
         window = getattr(settings, 'RATE_LIMIT_WINDOW', 60)
         
-        if requests >= max_requests:
+        if not rate_limit_hit(f'rate_limit:{ip_address}', max_requests, window):
             logger.warning(f'Rate limit exceeded for IP: {ip_address}')
+            increment('rate_limit_rejections')
             return HttpResponse(
                 'Too many requests. Please try again later.',
                 status=429,
                 content_type='text/plain'
             )
         
-        # Increment request count
-        cache.set(rate_limit_key, requests + 1, window)
-        
         return None
     
     def get_client_ip(self, request):
@@ -107,3 +209,20 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         return response
 
 
+
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """
+    Gzip JSON responses of at least GZIP_MIN_SIZE bytes, when
+    GZIP_API_RESPONSES is on. HTML pages are never compressed: they carry
+    the CSRF token, which compression would expose to BREACH.
+    """
+    
+    def process_response(self, request, response):
+        if not getattr(settings, 'GZIP_API_RESPONSES', False):
+            return response
+        if response.streaming or not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        if len(response.content) < getattr(settings, 'GZIP_MIN_SIZE', 1024):
+            return response
+        return super().process_response(request, response)
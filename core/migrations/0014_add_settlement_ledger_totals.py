@@ -0,0 +1,42 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_settled_totals(apps, schema_editor):
+    """Populate the settlement ledger columns from existing Settlement rows."""
+    ClientExchangeAccount = apps.get_model('core', 'ClientExchangeAccount')
+    Settlement = apps.get_model('core', 'Settlement')
+
+    for account in ClientExchangeAccount.objects.all().iterator():
+        settlements = Settlement.objects.filter(client_exchange_id=account.pk)
+        account.settled_total = settlements.aggregate(total=Sum('amount'))['total'] or 0
+        if account.cycle_start_date:
+            account.cycle_settled_total = settlements.filter(
+                date__gte=account.cycle_start_date
+            ).aggregate(total=Sum('amount'))['total'] or 0
+        else:
+            account.cycle_settled_total = 0
+        account.save(update_fields=['settled_total', 'cycle_settled_total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_add_version_name_to_exchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientexchangeaccount',
+            name='settled_total',
+            field=models.BigIntegerField(default=0, help_text='Sum of all settlements of this account. Rebuild with rebuild_settlement_totals.'),
+        ),
+        migrations.AddField(
+            model_name='clientexchangeaccount',
+            name='cycle_settled_total',
+            field=models.BigIntegerField(default=0, help_text='Sum of settlements in the current PnL cycle (dated on/after cycle_start_date).'),
+        ),
+        migrations.RunPython(backfill_settled_totals, migrations.RunPython.noop),
+    ]
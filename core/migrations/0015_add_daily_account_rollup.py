@@ -0,0 +1,32 @@
+# Generated manually
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_add_settlement_ledger_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAccountRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('turnover', models.BigIntegerField(default=0, help_text='Σ|ExchangeBalanceAfter − ExchangeBalanceBefore| of TRADE transactions')),
+                ('trade_pnl', models.BigIntegerField(default=0, help_text='Σ(ExchangeBalanceAfter − ExchangeBalanceBefore) of TRADE transactions')),
+                ('settlements_in', models.BigIntegerField(default=0, help_text='Payments received from client (positive RECORD_PAYMENT amounts)')),
+                ('settlements_out', models.BigIntegerField(default=0, help_text='Payments made to client (negative RECORD_PAYMENT amounts, stored positive)')),
+                ('tx_count', models.IntegerField(default=0, help_text='Number of transactions on this day')),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.clientexchangeaccount')),
+            ],
+            options={
+                'ordering': ['-day', 'account'],
+                'indexes': [models.Index(fields=['day'], name='core_dailya_day_314172_idx')],
+                'unique_together': {('account', 'day')},
+            },
+        ),
+    ]
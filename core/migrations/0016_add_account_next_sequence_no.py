@@ -0,0 +1,36 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_next_sequence_no(apps, schema_editor):
+    """Start each account's counter after its highest existing sequence_no."""
+    ClientExchangeAccount = apps.get_model('core', 'ClientExchangeAccount')
+    Transaction = apps.get_model('core', 'Transaction')
+
+    max_sequence = Transaction.objects.filter(
+        client_exchange=OuterRef('pk')
+    ).order_by().values('client_exchange').annotate(
+        max_seq=Max('sequence_no')
+    ).values('max_seq')
+    ClientExchangeAccount.objects.update(
+        next_sequence_no=Coalesce(Subquery(max_sequence), Value(0)) + 1
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_add_daily_account_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientexchangeaccount',
+            name='next_sequence_no',
+            field=models.IntegerField(default=1, help_text='Next Transaction.sequence_no of this account. Repair with repair_transaction_sequences.'),
+        ),
+        migrations.RunPython(backfill_next_sequence_no, migrations.RunPython.noop),
+    ]
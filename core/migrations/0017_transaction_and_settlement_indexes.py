@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_add_account_next_sequence_no'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='transaction',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='core_transa_client__95c1f0_idx',
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['client_exchange', 'date'], name='core_settle_client__96b8cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['client_exchange', '-created_at', '-id'], name='core_transa_client__133d48_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['client_exchange', 'date'], name='core_transa_client__76b401_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('type', 'TRADE')), fields=['client_exchange', 'date'], name='core_tx_trade_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('type__in', ['RECORD_PAYMENT', 'SETTLEMENT_SHARE'])), fields=['client_exchange', 'date'], name='core_tx_payment_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def _share_settlements(apps):
+    """SETTLEMENT_SHARE amounts received / paid per account and day."""
+    Transaction = apps.get_model('core', 'Transaction')
+    return Transaction.objects.filter(type='SETTLEMENT_SHARE').order_by().annotate(
+        day=TruncDate('date'),
+    ).values('client_exchange_id', 'day').annotate(
+        received=Coalesce(Sum('amount', filter=Q(amount__gt=0)), 0, output_field=models.BigIntegerField()),
+        paid=Coalesce(Sum('amount', filter=Q(amount__lt=0)), 0, output_field=models.BigIntegerField()),
+    )
+
+
+def remove_share_settlements(apps, schema_editor):
+    """Take SETTLEMENT_SHARE transactions out of the rollup payment columns."""
+    DailyAccountRollup = apps.get_model('core', 'DailyAccountRollup')
+    for row in _share_settlements(apps):
+        DailyAccountRollup.objects.filter(account_id=row['client_exchange_id'], day=row['day']).update(
+            settlements_in=F('settlements_in') - row['received'],
+            settlements_out=F('settlements_out') + row['paid'],
+        )
+
+
+def add_share_settlements(apps, schema_editor):
+    DailyAccountRollup = apps.get_model('core', 'DailyAccountRollup')
+    for row in _share_settlements(apps):
+        DailyAccountRollup.objects.filter(account_id=row['client_exchange_id'], day=row['day']).update(
+            settlements_in=F('settlements_in') + row['received'],
+            settlements_out=F('settlements_out') - row['paid'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_share_settlements, add_share_settlements),
+    ]
@@ -2,13 +2,25 @@
 Database models for Profit-Loss-Share-Settlement System
 Following PIN-TO-PIN master document specifications.
 """
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Abs, Coalesce, TruncDate
 from django.utils import timezone
+from collections import defaultdict
 from decimal import Decimal
 
 
+# Fields holding the locked state of the current PnL cycle
+CYCLE_LOCK_FIELDS = [
+    'locked_initial_final_share',
+    'locked_share_percentage',
+    'locked_initial_pnl',
+    'cycle_start_date',
+    'locked_initial_funding',
+]
+
+
 class CustomUser(AbstractUser):
     """
     Custom User model that allows any characters in username.
@@ -238,6 +250,22 @@ class ClientExchangeAccount(TimeStampedModel):
         help_text="Funding amount when share was locked. Used to detect funding changes that should reset cycle."
     )
     
+    # Running settlement ledger (kept in step with Settlement rows, see Settlement.save/delete)
+    settled_total = models.BigIntegerField(
+        default=0,
+        help_text="Sum of all settlements of this account. Rebuild with rebuild_settlement_totals."
+    )
+    cycle_settled_total = models.BigIntegerField(
+        default=0,
+        help_text="Sum of settlements in the current PnL cycle (dated on/after cycle_start_date)."
+    )
+    
+    # Per-account Transaction.sequence_no counter (see reserve_sequence_numbers)
+    next_sequence_no = models.IntegerField(
+        default=1,
+        help_text="Next Transaction.sequence_no of this account. Repair with repair_transaction_sequences."
+    )
+    
     class Meta:
         unique_together = [['client', 'exchange']]
         ordering = ['client__name', 'exchange__name']
@@ -245,6 +273,40 @@ class ClientExchangeAccount(TimeStampedModel):
     def __str__(self):
         return f"{self.client.name} - {self.exchange.name}"
     
+    # Columns only ever changed with UPDATE ... SET col = col + n
+    COUNTER_FIELDS = ['settled_total', 'cycle_settled_total', 'next_sequence_no']
+    
+    def save(self, *args, **kwargs):
+        """
+        Full saves of an existing account leave the settlement ledger and
+        next_sequence_no alone, so a stale instance cannot roll back
+        settlements or numbers recorded since it was loaded.
+        """
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def reserve_sequence_numbers(cls, account_id, count=1):
+        """
+        Reserve `count` consecutive Transaction.sequence_no values of an account.
+        
+        The counter is advanced with a single UPDATE, which keeps the account
+        row locked until the surrounding transaction ends: concurrent writers
+        never get the same number, and a rolled back insert returns its numbers.
+        
+        Returns: range of the reserved numbers
+        """
+        with db_transaction.atomic():
+            cls.objects.filter(pk=account_id).update(
+                next_sequence_no=models.F('next_sequence_no') + count
+            )
+            next_no = cls.objects.filter(pk=account_id).values_list('next_sequence_no', flat=True).get()
+        return range(next_no - count, next_no)
+    
     def compute_client_pnl(self):
         """
         MASTER PROFIT/LOSS FORMULA
@@ -302,9 +364,9 @@ class ClientExchangeAccount(TimeStampedModel):
         Returns:
             int: Masked capital amount
         """
-        settlement_info = self.get_remaining_settlement_amount()
+        settlement_info = self.preview_settlement_state()
         initial_final_share = settlement_info['initial_final_share']
-        locked_initial_pnl = self.locked_initial_pnl
+        locked_initial_pnl = settlement_info['locked_initial_pnl']
         
         if initial_final_share == 0 or locked_initial_pnl is None:
             return 0
@@ -372,115 +434,187 @@ class ClientExchangeAccount(TimeStampedModel):
             print(f"Error in compute_exact_share for account {self.id}: {e}")
             return 0.0
     
-    def lock_initial_share_if_needed(self):
+    def add_settled_amount(self, amount, settled_at):
         """
-        CRITICAL FIX: Lock InitialFinalShare at first compute per PnL cycle.
+        Update the running settlement ledger for a settlement of `amount`
+        dated `settled_at` (negative amount when a settlement is removed).
         
-        This ensures share doesn't shrink after payments.
-        Share is decided by trading outcome, not by settlement.
+        Must run in the same transaction as the Settlement insert/delete.
+        The totals are updated in the database (col = col + amount, with the
+        cycle rule on the stored cycle_start_date), so concurrent settlements
+        and stale instances cannot lose an update; this instance is refreshed.
+        """
+        type(self).objects.filter(pk=self.pk).update(
+            settled_total=models.F('settled_total') + amount,
+            # Same rule as the cycle filter: date >= cycle_start_date
+            cycle_settled_total=models.Case(
+                models.When(cycle_start_date__lte=settled_at, then=models.F('cycle_settled_total') + amount),
+                default=models.F('cycle_settled_total'),
+                output_field=models.BigIntegerField(),
+            ),
+            # The account's remaining amount changes for delta sync
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['settled_total', 'cycle_settled_total', 'cycle_start_date', 'updated_at'])
+    
+    def apply_settled_amount(self, amount, settled_at):
+        """
+        In-memory version of add_settled_amount(), for bulk loads of new accounts.
         
-        NEW FIX: Funding change should reset cycle (new exposure = new cycle).
+        Returns: list of the ledger fields that changed
         """
+        self.settled_total += amount
+        update_fields = ['settled_total']
+        # Same rule as the cycle filter: date >= cycle_start_date
+        if self.cycle_start_date and settled_at >= self.cycle_start_date:
+            self.cycle_settled_total += amount
+            update_fields.append('cycle_settled_total')
+        return update_fields
+    
+    def preview_settlement_state(self, now=None):
+        """
+        READ-ONLY: Resolve the PnL cycle lock state without persisting anything.
+        
+        Applies the locking rules in order:
+        - PnL magnitude reduction resets the cycle
+        - Funding change resets the cycle (new exposure = new cycle)
+        - No locked share, or PnL sign flip → lock new share (new cycle)
+        - PnL = 0 and locked share fully settled → reset the cycle
+        
+        Then computes remaining/overpaid against the resolved locked share.
+        Settled amounts come from the settlement ledger columns, so this
+        runs no queries.
+        
+        Args:
+            now: Timestamp used when a new cycle starts (defaults to now)
+        
+        Returns:
+            dict with the resolved CYCLE_LOCK_FIELDS, 'cycle_settled_total',
+            'changed' (differs from the stored lock), 'remaining', 'overpaid',
+            'initial_final_share' and 'total_settled'
+        """
+        if now is None:
+            now = timezone.now()
+        
+        state = {field: getattr(self, field) for field in CYCLE_LOCK_FIELDS}
         client_pnl = self.compute_client_pnl()
+        changed = False
+        # A cycle started during this resolution has no settlements yet
+        new_cycle = False
         
-        # CRITICAL FIX: PnL magnitude reduction should reset cycle (trading reduced exposure)
-        # If PnL magnitude reduced significantly, old lock is invalid
-        if self.locked_initial_pnl is not None and client_pnl != 0:
-            locked_pnl_abs = abs(self.locked_initial_pnl)
-            current_pnl_abs = abs(client_pnl)
-            
-            # If PnL magnitude reduced, trading has reduced exposure → old lock invalid
-            # This prevents stale locked shares from persisting when profit/loss shrinks
-            if current_pnl_abs < locked_pnl_abs:
-                # PnL magnitude reduced → reset cycle to allow re-lock with new (smaller) PnL
-                self.locked_initial_final_share = None
-                self.locked_share_percentage = None
-                self.locked_initial_pnl = None
-                self.cycle_start_date = None
-                self.locked_initial_funding = None
-                # Save reset before continuing
-                self.save(update_fields=['locked_initial_final_share', 'locked_share_percentage', 'locked_initial_pnl', 'cycle_start_date', 'locked_initial_funding'])
-        
-        # CRITICAL FIX: Funding change should reset cycle (new exposure = new cycle)
-        # If funding changed after cycle was locked, reset the cycle
-        if self.locked_initial_final_share is not None:
-            # Check if funding tracking exists (new data) or is missing (old data)
-            if self.locked_initial_funding is not None:
-                # New data: Compare with tracked funding
-                if self.funding != self.locked_initial_funding:
-                    # Funding changed → new exposure → new cycle
-                    # Reset all locks to force new cycle
-                    self.locked_initial_final_share = None
-                    self.locked_share_percentage = None
-                    self.locked_initial_pnl = None
-                    self.cycle_start_date = None
-                    self.locked_initial_funding = None
-                    # Save reset before continuing
-                    self.save(update_fields=['locked_initial_final_share', 'locked_share_percentage', 'locked_initial_pnl', 'cycle_start_date', 'locked_initial_funding'])
+        def reset():
+            state.update(dict.fromkeys(CYCLE_LOCK_FIELDS))
+        
+        def lock(final_share, track_funding=True):
+            state['locked_initial_final_share'] = final_share
+            state['locked_share_percentage'] = self.get_share_percentage(client_pnl)
+            state['locked_initial_pnl'] = client_pnl
+            state['cycle_start_date'] = now
+            if track_funding:
+                state['locked_initial_funding'] = self.funding
+        
+        def settled():
+            if new_cycle:
+                return 0
+            # Only count settlements from the CURRENT cycle
+            if state['cycle_start_date']:
+                return self.cycle_settled_total
+            # No cycle start date - count all settlements (backward compatibility)
+            return self.settled_total
+        
+        # PnL magnitude reduction should reset cycle (trading reduced exposure)
+        if state['locked_initial_pnl'] is not None and client_pnl != 0:
+            if abs(client_pnl) < abs(state['locked_initial_pnl']):
+                reset()
+                changed = True
+        
+        # Funding change should reset cycle (new exposure = new cycle)
+        if state['locked_initial_final_share'] is not None:
+            if state['locked_initial_funding'] is not None:
+                if self.funding != state['locked_initial_funding']:
+                    reset()
+                    changed = True
             else:
-                # Old data: locked_initial_funding is None (from before this fix)
-                # For old data without funding tracking, we can't reliably detect funding changes
-                # The PnL magnitude reduction check above will handle trading reductions
-                # For funding increases, we'll set locked_initial_funding to current funding
-                # so future checks can detect funding changes
-                if self.locked_initial_funding is None:
-                    # Set it now for future checks (migration from old data)
-                    self.locked_initial_funding = self.funding
-                    self.save(update_fields=['locked_initial_funding'])
-        
-        # If no locked share exists, or PnL cycle changed (sign flip or zero crossing), lock new share
-        if self.locked_initial_final_share is None or self.locked_initial_pnl is None:
+                # Old data without funding tracking: start tracking current funding
+                state['locked_initial_funding'] = self.funding
+                changed = True
+        
+        if state['locked_initial_final_share'] is None or state['locked_initial_pnl'] is None:
             # First time - lock the share
             final_share = self.compute_my_share()
             if final_share > 0:
-                # Use helper method to get appropriate share percentage
-                share_pct = self.get_share_percentage(client_pnl)
-                
-                self.locked_initial_final_share = final_share
-                self.locked_share_percentage = share_pct
-                self.locked_initial_pnl = client_pnl
-                self.cycle_start_date = timezone.now()  # Track when this cycle started
-                self.locked_initial_funding = self.funding  # Track funding when cycle started
-                self.save(update_fields=['locked_initial_final_share', 'locked_share_percentage', 'locked_initial_pnl', 'cycle_start_date', 'locked_initial_funding'])
-        elif client_pnl != 0 and self.locked_initial_pnl != 0:
-            # Check if PnL cycle changed (sign flip)
-            if (client_pnl < 0) != (self.locked_initial_pnl < 0):
-                # PnL cycle changed - lock new share
+                lock(final_share)
+                changed = True
+                new_cycle = True
+        elif client_pnl != 0 and state['locked_initial_pnl'] != 0:
+            # PnL cycle changed (sign flip) - lock new share
+            if (client_pnl < 0) != (state['locked_initial_pnl'] < 0):
                 final_share = self.compute_my_share()
                 if final_share > 0:
-                    # Use helper method to get appropriate share percentage
-                    share_pct = self.get_share_percentage(client_pnl)
-                    
-                    self.locked_initial_final_share = final_share
-                    self.locked_share_percentage = share_pct
-                    self.locked_initial_pnl = client_pnl
-                    self.cycle_start_date = timezone.now()  # NEW CYCLE: Track when this cycle started
-                    self.save(update_fields=['locked_initial_final_share', 'locked_share_percentage', 'locked_initial_pnl', 'cycle_start_date'])
+                    lock(final_share, track_funding=False)
+                    changed = True
+                    new_cycle = True
         elif client_pnl == 0:
-            # PnL is zero - only reset locks if there are no pending settlements
-            # CRITICAL FIX: Don't reset locked share if there's still remaining settlement amount
-            # CRITICAL FIX: Only count settlements from current cycle
-            if self.cycle_start_date:
-                cycle_settled = self.settlements.filter(
-                    date__gte=self.cycle_start_date
-                ).aggregate(
-                    total=models.Sum('amount')
-                )['total'] or 0
-            else:
-                cycle_settled = self.settlements.aggregate(
-                    total=models.Sum('amount')
-                )['total'] or 0
-            
             # Only reset if locked share is fully settled (or no locked share exists)
-            if self.locked_initial_final_share is None or cycle_settled >= (self.locked_initial_final_share or 0):
-                # Fully settled or no share - safe to reset
-                self.locked_initial_final_share = None
-                self.locked_share_percentage = None
-                self.locked_initial_pnl = None
-                self.cycle_start_date = None
-                self.locked_initial_funding = None
-                self.save(update_fields=['locked_initial_final_share', 'locked_share_percentage', 'locked_initial_pnl', 'cycle_start_date', 'locked_initial_funding'])
-            # Otherwise, keep the locked share even if PnL is 0 (settlements may have brought it to zero)
+            locked_share = state['locked_initial_final_share']
+            if locked_share is None or settled() >= (locked_share or 0):
+                if any(value is not None for value in state.values()):
+                    changed = True
+                reset()
+        
+        total_settled = settled()
+        
+        # CRITICAL: Always use locked share - NEVER recalculate from current PnL
+        if state['locked_initial_final_share'] is not None:
+            initial_final_share = state['locked_initial_final_share']
+        else:
+            current_share = self.compute_my_share()
+            if current_share > 0:
+                lock(current_share)
+                changed = True
+                new_cycle = True
+                initial_final_share = current_share
+            else:
+                # No locked share and current share is 0 - no settlement possible
+                state.update(
+                    cycle_settled_total=0,
+                    changed=changed,
+                    remaining=0,
+                    overpaid=0,
+                    initial_final_share=0,
+                    total_settled=total_settled,
+                )
+                return state
+        
+        state.update(
+            # A new or closed cycle starts its ledger from zero
+            cycle_settled_total=settled() if state['cycle_start_date'] else 0,
+            changed=changed,
+            remaining=max(0, initial_final_share - total_settled),
+            overpaid=max(0, total_settled - initial_final_share),
+            initial_final_share=initial_final_share,
+            total_settled=total_settled,
+        )
+        return state
+    
+    def lock_initial_share_if_needed(self):
+        """
+        CRITICAL FIX: Lock InitialFinalShare at first compute per PnL cycle.
+        
+        This ensures share doesn't shrink after payments.
+        Share is decided by trading outcome, not by settlement.
+        
+        NEW FIX: Funding change should reset cycle (new exposure = new cycle).
+        
+        Persists the state resolved by preview_settlement_state(). Call only
+        from mutating paths (funding, balance update, payment); read paths
+        use get_remaining_settlement_amount(), which never writes.
+        """
+        state = self.preview_settlement_state()
+        if state['changed']:
+            for field in CYCLE_LOCK_FIELDS + ['cycle_settled_total']:
+                setattr(self, field, state[field])
+            self.save(update_fields=CYCLE_LOCK_FIELDS + ['cycle_settled_total', 'updated_at'])
     
     def close_cycle(self):
         """
@@ -498,7 +632,8 @@ class ClientExchangeAccount(TimeStampedModel):
         self.locked_initial_pnl = None
         self.cycle_start_date = None
         self.locked_initial_funding = None
-        self.save(update_fields=['locked_initial_final_share', 'locked_share_percentage', 'locked_initial_pnl', 'cycle_start_date', 'locked_initial_funding'])
+        self.cycle_settled_total = 0
+        self.save(update_fields=CYCLE_LOCK_FIELDS + ['cycle_settled_total', 'updated_at'])
     
     def get_remaining_settlement_amount(self):
         """
@@ -510,6 +645,9 @@ class ClientExchangeAccount(TimeStampedModel):
         Share is locked at first compute and NEVER shrinks after payments.
         This ensures share is decided by trading outcome, not by settlement.
         
+        READ-ONLY: Uses the lock state the account would have (see
+        preview_settlement_state()) without saving it. Safe for GET requests.
+        
         IMPORTANT: This method returns RemainingRaw (always ≥ 0).
         The SIGN must be applied at DISPLAY TIME based on Client_PnL direction:
         
@@ -519,64 +657,12 @@ class ClientExchangeAccount(TimeStampedModel):
         
         Returns: dict with 'remaining' (raw value ≥ 0), 'overpaid', 'initial_final_share', and 'total_settled'
         """
-        # Lock share if needed
-        self.lock_initial_share_if_needed()
-        
-        # CRITICAL FIX: Only count settlements from CURRENT cycle
-        # When PnL sign changes (LOSS → PROFIT or PROFIT → LOSS), a NEW cycle starts
-        # Old cycle settlements must NOT mix with new cycle shares
-        if self.cycle_start_date:
-            # Only count settlements that occurred AFTER this cycle started
-            total_settled = self.settlements.filter(
-                date__gte=self.cycle_start_date
-            ).aggregate(
-                total=models.Sum('amount')
-            )['total'] or 0
-        else:
-            # No cycle start date - count all settlements (backward compatibility)
-            total_settled = self.settlements.aggregate(
-                total=models.Sum('amount')
-            )['total'] or 0
-        
-        # CRITICAL: Always use locked share - NEVER recalculate from current PnL
-        # If locked share doesn't exist, check if we should lock current share
-        if self.locked_initial_final_share is not None:
-            initial_final_share = self.locked_initial_final_share
-        else:
-            # No locked share - check if current share > 0 and should be locked
-            current_share = self.compute_my_share()
-            if current_share > 0:
-                # Current share exists but not locked - lock it now
-                client_pnl = self.compute_client_pnl()
-                # Use helper method to get appropriate share percentage
-                share_pct = self.get_share_percentage(client_pnl)
-                
-                self.locked_initial_final_share = current_share
-                self.locked_share_percentage = share_pct
-                self.locked_initial_pnl = client_pnl
-                self.cycle_start_date = timezone.now()  # Track when this cycle started
-                self.locked_initial_funding = self.funding  # Track funding when cycle started
-                self.save(update_fields=['locked_initial_final_share', 'locked_share_percentage', 'locked_initial_pnl', 'cycle_start_date', 'locked_initial_funding'])
-                initial_final_share = current_share
-            else:
-                # No locked share and current share is 0 - no settlement possible
-                return {
-                    'remaining': 0,
-                    'overpaid': 0,
-                    'initial_final_share': 0,
-                    'total_settled': total_settled
-                }
-        
-        # CORRECT FORMULA: Remaining = LockedInitialFinalShare - TotalSettled
-        # Share NEVER shrinks - it's locked at initial compute
-        remaining = max(0, initial_final_share - total_settled)
-        overpaid = max(0, total_settled - initial_final_share)
-        
+        state = self.preview_settlement_state()
         return {
-            'remaining': remaining,
-            'overpaid': overpaid,
-            'initial_final_share': initial_final_share,
-            'total_settled': total_settled
+            'remaining': state['remaining'],
+            'overpaid': state['overpaid'],
+            'initial_final_share': state['initial_final_share'],
+            'total_settled': state['total_settled']
         }
     
     def get_remaining_settlement_amount_legacy(self):
@@ -724,9 +810,141 @@ class Settlement(TimeStampedModel):
     
     class Meta:
         ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['client_exchange', 'date']),
+            models.Index(fields=['client_exchange', 'updated_at']),
+        ]
     
     def __str__(self):
         return f"Settlement: {self.client_exchange} - {self.amount} - {self.date.strftime('%Y-%m-%d')}"
+    
+    def save(self, *args, **kwargs):
+        """
+        Add new settlements to the account's running settlement ledger; an
+        edited amount, date or account moves the old values out and the new
+        ones in.
+        """
+        previous = None
+        if not self._state.adding:
+            previous = Settlement.objects.filter(pk=self.pk).values(
+                'client_exchange_id', 'amount', 'date'
+            ).first()
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous is None:
+                self.client_exchange.add_settled_amount(self.amount, self.date)
+            elif previous != {'client_exchange_id': self.client_exchange_id, 'amount': self.amount, 'date': self.date}:
+                old_account = (
+                    self.client_exchange if previous['client_exchange_id'] == self.client_exchange_id
+                    else ClientExchangeAccount.objects.get(pk=previous['client_exchange_id'])
+                )
+                old_account.add_settled_amount(-previous['amount'], previous['date'])
+                self.client_exchange.add_settled_amount(self.amount, self.date)
+    
+    def delete(self, *args, **kwargs):
+        """
+        Remove the settlement from the account's running settlement ledger.
+        """
+        with db_transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.client_exchange.add_settled_amount(-self.amount, self.date)
+        return result
+
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    Report aggregations over transactions, computed in the database.
+    """
+    
+    def trades(self):
+        """TRADE transactions with both exchange balances recorded."""
+        return self.filter(
+            type='TRADE',
+            exchange_balance_before__isnull=False,
+            exchange_balance_after__isnull=False,
+        )
+    
+    def turnover(self, *group_by):
+        """
+        Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) and the
+        signed trade PnL = Σ(ExchangeBalanceAfter − ExchangeBalanceBefore)
+        of TRADE transactions.
+        
+        Args:
+            group_by: Optional values() lookups; 'day' groups by the calendar
+                day of the transaction date
+        
+        Returns:
+            dict {'turnover', 'trade_pnl'} without group_by, otherwise a
+            values queryset with one such row per group
+        """
+        movement = models.F('exchange_balance_after') - models.F('exchange_balance_before')
+        sums = {
+            'turnover': Coalesce(models.Sum(Abs(movement)), 0, output_field=models.BigIntegerField()),
+            'trade_pnl': Coalesce(models.Sum(movement), 0, output_field=models.BigIntegerField()),
+        }
+        trades = self.trades().order_by()
+        if not group_by:
+            return trades.aggregate(**sums)
+        if 'day' in group_by:
+            trades = trades.annotate(day=TruncDate('date'))
+        return trades.values(*group_by).annotate(**sums)
+    
+    def performance(self, *group_by):
+        """
+        Trading and settlement activity per group, from one grouped query.
+        
+        - pnl: Σ(ExchangeBalanceAfter − ExchangeBalanceBefore) of TRADE transactions
+        - settlements: Σ amount of payments (your profit/loss)
+        - tx_count: number of transactions of any type
+        
+        Args:
+            group_by: values() lookups; 'day' groups by the calendar day of
+                the transaction date
+        """
+        movement = models.F('exchange_balance_after') - models.F('exchange_balance_before')
+        is_trade = models.Q(
+            type='TRADE',
+            exchange_balance_before__isnull=False,
+            exchange_balance_after__isnull=False,
+        )
+        transactions = self.order_by()
+        if 'day' in group_by:
+            transactions = transactions.annotate(day=TruncDate('date'))
+        return transactions.values(*group_by).annotate(
+            pnl=Coalesce(models.Sum(movement, filter=is_trade), 0, output_field=models.BigIntegerField()),
+            settlements=Coalesce(
+                models.Sum('amount', filter=models.Q(type__in=['RECORD_PAYMENT', 'SETTLEMENT_SHARE'])),
+                0,
+                output_field=models.BigIntegerField(),
+            ),
+            tx_count=models.Count('id'),
+        )
+    
+    def turnover_breakdown(self):
+        """
+        Turnover and trade PnL per day, per client and per exchange from one
+        grouped query.
+        
+        Returns:
+            dict with 'total' and 'by_day' / 'by_client' / 'by_exchange'
+            (keyed by date, client name and exchange name), each value a
+            {'turnover', 'trade_pnl'} dict
+        """
+        breakdown = {'total': {'turnover': 0, 'trade_pnl': 0}, 'by_day': {}, 'by_client': {}, 'by_exchange': {}}
+        rows = self.turnover('day', 'client_exchange__client__name', 'client_exchange__exchange__name')
+        for row in rows:
+            for section, key in (
+                ('by_day', row['day']),
+                ('by_client', row['client_exchange__client__name']),
+                ('by_exchange', row['client_exchange__exchange__name']),
+            ):
+                totals = breakdown[section].setdefault(key, {'turnover': 0, 'trade_pnl': 0})
+                totals['turnover'] += row['turnover']
+                totals['trade_pnl'] += row['trade_pnl']
+            breakdown['total']['turnover'] += row['turnover']
+            breakdown['total']['trade_pnl'] += row['trade_pnl']
+        return breakdown
 
 
 class Transaction(TimeStampedModel):
@@ -795,10 +1013,27 @@ class Transaction(TimeStampedModel):
     
     notes = models.TextField(blank=True, null=True)
     
+    objects = TransactionQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at', '-id']
+        # Reports filter by account (via the user's clients) and date range;
+        # check_query_plans verifies the hot queries use these
         indexes = [
-            models.Index(fields=['client_exchange', '-created_at']),
+            models.Index(fields=['client_exchange', '-created_at', '-id']),
+            models.Index(fields=['client_exchange', 'date']),
+            # Delta sync: rows changed since a cursor
+            models.Index(fields=['client_exchange', 'updated_at']),
+            models.Index(
+                fields=['client_exchange', 'date'],
+                name='core_tx_trade_date_idx',
+                condition=models.Q(type='TRADE'),
+            ),
+            models.Index(
+                fields=['client_exchange', 'date'],
+                name='core_tx_payment_date_idx',
+                condition=models.Q(type__in=['RECORD_PAYMENT', 'SETTLEMENT_SHARE']),
+            ),
         ]
     
     def __str__(self):
@@ -807,16 +1042,169 @@ class Transaction(TimeStampedModel):
     def save(self, *args, **kwargs):
         """
         Auto-increment sequence_no per account if not provided.
+        Keeps DailyAccountRollup in step with the saved values.
         """
-        if not self.sequence_no:
-            # Get the max sequence_no for this account
-            max_seq = Transaction.objects.filter(
-                client_exchange=self.client_exchange
-            ).aggregate(
-                max_seq=models.Max('sequence_no')
-            )['max_seq'] or 0
-            self.sequence_no = max_seq + 1
-        super().save(*args, **kwargs)
+        previous = None
+        if not self._state.adding and self.pk:
+            previous = Transaction.objects.filter(pk=self.pk).first()
+        
+        with db_transaction.atomic():
+            if not self.sequence_no:
+                self.sequence_no = ClientExchangeAccount.reserve_sequence_numbers(self.client_exchange_id)[0]
+            super().save(*args, **kwargs)
+            if previous is not None:
+                DailyAccountRollup.apply_transaction(previous, sign=-1)
+            DailyAccountRollup.apply_transaction(self)
+    
+    @classmethod
+    def assign_sequence_numbers(cls, transactions):
+        """
+        Number unsaved transactions for bulk_create(): one counter update per
+        account instead of one per row. Call inside the transaction.atomic()
+        block that inserts them.
+        
+        Note: bulk_create() skips save(), so DailyAccountRollup must be
+        rebuilt for the affected accounts (backfill_daily_rollups).
+        
+        Returns: the same transactions
+        """
+        by_account = defaultdict(list)
+        for tx in transactions:
+            if not tx.sequence_no:
+                by_account[tx.client_exchange_id].append(tx)
+        
+        # Fixed lock order, so two bulk inserts cannot deadlock on the counters
+        for account_id in sorted(by_account):
+            account_transactions = by_account[account_id]
+            numbers = ClientExchangeAccount.reserve_sequence_numbers(account_id, len(account_transactions))
+            for tx, sequence_no in zip(account_transactions, numbers):
+                tx.sequence_no = sequence_no
+        return transactions
+    
+    def delete(self, *args, **kwargs):
+        """
+        Remove the transaction from DailyAccountRollup.
+        """
+        with db_transaction.atomic():
+            DailyAccountRollup.apply_transaction(self, sign=-1)
+            return super().delete(*args, **kwargs)
+    
+    def rollup_day(self):
+        """Calendar day (in the current time zone) this transaction is rolled up into."""
+        if timezone.is_aware(self.date):
+            return timezone.localdate(self.date)
+        return self.date.date()
+    
+    def rollup_values(self):
+        """
+        Contribution of this transaction to its DailyAccountRollup row.
+        
+        - turnover / trade_pnl: TRADE with before/after balances
+          (|ExchangeBalanceAfter − ExchangeBalanceBefore| and signed movement)
+        - settlements_in / settlements_out: RECORD_PAYMENT
+          (+X = client paid you, -X = you paid client)
+        """
+        values = {
+            'turnover': 0,
+            'trade_pnl': 0,
+            'settlements_in': 0,
+            'settlements_out': 0,
+            'tx_count': 1,
+        }
+        if (self.type == 'TRADE' and self.exchange_balance_before is not None
+                and self.exchange_balance_after is not None):
+            movement = self.exchange_balance_after - self.exchange_balance_before
+            values['turnover'] = abs(movement)
+            values['trade_pnl'] = movement
+        elif self.type in DailyAccountRollup.PAYMENT_TYPES:
+            if self.amount > 0:
+                values['settlements_in'] = self.amount
+            elif self.amount < 0:
+                values['settlements_out'] = -self.amount
+        return values
+
+
+class DailyAccountRollup(models.Model):
+    """
+    REPORTING TABLE - DERIVED
+    
+    Per-account, per-day totals of Transaction rows, maintained incrementally
+    by Transaction.save()/delete(). Report views read these small rows instead
+    of every transaction. Rebuild with the backfill_daily_rollups command.
+    """
+    # The report charts count RECORD_PAYMENT only (SETTLEMENT_SHARE is not a payment there)
+    PAYMENT_TYPES = ('RECORD_PAYMENT',)
+    VALUE_FIELDS = ('turnover', 'trade_pnl', 'settlements_in', 'settlements_out', 'tx_count')
+    
+    account = models.ForeignKey(
+        ClientExchangeAccount,
+        on_delete=models.CASCADE,
+        related_name='daily_rollups'
+    )
+    day = models.DateField()
+    turnover = models.BigIntegerField(default=0, help_text="Σ|ExchangeBalanceAfter − ExchangeBalanceBefore| of TRADE transactions")
+    trade_pnl = models.BigIntegerField(default=0, help_text="Σ(ExchangeBalanceAfter − ExchangeBalanceBefore) of TRADE transactions")
+    settlements_in = models.BigIntegerField(default=0, help_text="Payments received from client (positive RECORD_PAYMENT amounts)")
+    settlements_out = models.BigIntegerField(default=0, help_text="Payments made to client (negative RECORD_PAYMENT amounts, stored positive)")
+    tx_count = models.IntegerField(default=0, help_text="Number of transactions on this day")
+    
+    class Meta:
+        unique_together = [['account', 'day']]
+        ordering = ['-day', 'account']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.account} - {self.day}"
+    
+    @classmethod
+    def apply_transaction(cls, tx, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) a transaction's contribution.
+        """
+        values = tx.rollup_values()
+        rollup, _ = cls.objects.get_or_create(
+            account_id=tx.client_exchange_id,
+            day=tx.rollup_day(),
+        )
+        cls.objects.filter(pk=rollup.pk).update(**{
+            field: models.F(field) + sign * value
+            for field, value in values.items()
+            if value
+        })
+
+
+class SyncTombstone(models.Model):
+    """
+    DELETION LOG - DELTA SYNC
+    
+    One row per deleted client, account, transaction or settlement, so the
+    mobile delta sync (core.sync) can tell devices what to remove. Only the
+    deleted object itself is recorded: a deleted client implies its accounts
+    and their transactions/settlements, a deleted account its own rows.
+    Prune with the prune_sync_tombstones command.
+    """
+    KIND_CHOICES = [
+        ('client', 'Client'),
+        ('account', 'Client Exchange Account'),
+        ('transaction', 'Transaction'),
+        ('settlement', 'Settlement'),
+    ]
+    
+    user = models.ForeignKey('CustomUser', on_delete=models.CASCADE, related_name='sync_tombstones')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id}"
 
 
 class EmailOTP(TimeStampedModel):
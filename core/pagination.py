@@ -0,0 +1,166 @@
+"""
+Keyset (cursor) pagination for transaction lists.
+
+Transactions are listed newest first, ordered by (created_at, id). A cursor
+holds the (created_at, id) of the row a page starts after, so every page is
+a single indexed range query no matter how deep it is, and rows added while
+scrolling do not shift later pages.
+
+Used by the web transaction list and TransactionViewSet.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(transaction, reverse=False):
+    """Opaque cursor positioned at a transaction; reverse=True pages towards newer rows."""
+    data = {'c': transaction.created_at.isoformat(), 'i': transaction.pk, 'r': int(reverse)}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns: tuple (created_at, id, reverse)
+    Raises: InvalidCursor
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data['c']), int(data['i']), bool(data['r'])
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+
+class KeysetPage:
+    """One page of transactions with the cursors of its neighbours."""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_page(transactions, cursor=None, page_size=100):
+    """
+    Fetch one page of a (filtered) transaction queryset, newest first.
+
+    Args:
+        transactions: Transaction queryset with any filters applied
+        cursor: Token from a previous page's next/previous cursor, or None for the first page
+        page_size: Rows per page
+
+    Returns:
+        KeysetPage
+    Raises:
+        InvalidCursor
+    """
+    reverse = False
+    if cursor:
+        created_at, pk, reverse = decode_cursor(cursor)
+        if reverse:
+            transactions = transactions.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            )
+        else:
+            transactions = transactions.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+    ordering = ('created_at', 'id') if reverse else ('-created_at', '-id')
+    # One extra row tells whether there is another page in this direction
+    rows = list(transactions.order_by(*ordering)[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage(rows)
+
+    # Coming from a cursor there is always a page back the way we came
+    has_next = has_more if not reverse else True
+    has_previous = has_more if reverse else bool(cursor)
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if has_next else None,
+        previous_cursor=encode_cursor(rows[0], reverse=True) if has_previous else None,
+    )
+
+
+class TransactionCursorPagination(BasePagination):
+    """
+    DRF pagination over keyset_page().
+
+    The response body stays a plain list of transactions (as before), and the
+    neighbouring pages are advertised in the Link header:
+        Link: <...?cursor=...>; rel="next", <...?cursor=...>; rel="prev"
+    
+    Paging is opt-in: without ?cursor= or ?page_size= every row is returned,
+    as existing clients (the Android export and search) expect.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 500
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        self.request = request
+        try:
+            self.page = keyset_page(
+                queryset,
+                cursor=request.query_params.get(self.cursor_query_param),
+                page_size=self.get_page_size(request),
+            )
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        links = []
+        for rel, cursor in (('next', self.page.next_cursor), ('prev', self.page.previous_cursor)):
+            url = self._link(cursor)
+            if url:
+                links.append(f'<{url}>; rel="{rel}"')
+        headers = {'Link': ', '.join(links)} if links else None
+        return Response(data, headers=headers)
+
+
+def page_query_string(params, cursor):
+    """Query string for a web list page: current filters plus the cursor."""
+    query = params.copy()
+    query.pop('cursor', None)
+    if cursor:
+        query['cursor'] = cursor
+    return query.urlencode()
@@ -0,0 +1,145 @@
+"""
+Pending Payments engine.
+
+Builds the pending payments rows (Client_PnL, share %, locked InitialFinalShare
+and cycle-scoped settled total) for all accounts of a user in a single query.
+Settled amounts are read from the account's settlement ledger columns, and
+nothing is written back.
+
+Used by the Pending Payments page, its CSV export and the mobile API.
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ClientExchangeAccount
+
+
+def pending_accounts(user, search_query=""):
+    """All accounts of a user for the pending engine."""
+    accounts = ClientExchangeAccount.objects.filter(
+        client__user=user
+    ).select_related("client", "exchange")
+
+    if search_query:
+        accounts = accounts.filter(
+            Q(client__name__icontains=search_query) |
+            Q(client__code__icontains=search_query) |
+            Q(exchange__name__icontains=search_query) |
+            Q(exchange__code__icontains=search_query)
+        )
+
+    return accounts
+
+
+def pending_row(account, now=None):
+    """
+    Pending payments row of one account.
+    
+    Row keys: client, exchange, account, client_pnl, amount_owed,
+    my_share_amount, remaining_amount, share_percentage, show_na
+    """
+    client_pnl = account.compute_client_pnl()
+    # Read-only: lock changes are persisted on mutating paths only
+    state = account.preview_settlement_state(now=now)
+    
+    initial_final_share = state['initial_final_share']
+    # Use initial locked share for display
+    final_share = initial_final_share if initial_final_share > 0 else account.compute_my_share()
+    
+    return {
+        "client": account.client,
+        "exchange": account.exchange,
+        "account": account,
+        "client_pnl": client_pnl,
+        "amount_owed": abs(client_pnl),
+        "my_share_amount": final_share,
+        # Raw remaining is always >= 0; the PnL sign decides the section
+        "remaining_amount": state['remaining'] if client_pnl != 0 else 0,
+        "share_percentage": account.get_share_percentage(client_pnl),
+        "show_na": client_pnl == 0 or final_share == 0,
+    }
+
+
+def build_pending_lists(accounts):
+    """
+    Build the "Clients Owe You" and "You Owe Clients" lists.
+
+    Args:
+        accounts: Queryset from pending_accounts()
+
+    Returns:
+        tuple (clients_owe_list, you_owe_list) of row dicts, in queryset order.
+        Neutral accounts (PnL = 0) appear in clients_owe_list with show_na=True.
+    """
+    now = timezone.now()
+    clients_owe_list = []
+    you_owe_list = []
+
+    for account in accounts:
+        row = pending_row(account, now=now)
+        if row["client_pnl"] > 0:
+            you_owe_list.append(row)
+        else:
+            clients_owe_list.append(row)
+
+    return clients_owe_list, you_owe_list
+
+
+PENDING_CSV_HEADER = [
+    'Client',
+    'U_CODE',
+    'Master',
+    'OPENING POINTS',
+    'AVL.POINTS(CLOSING POINTS)',
+    'PROFIT(+)/LOSS(-)',
+    'MY SHARE',
+    'MY%',
+]
+
+
+def pending_csv_rows(accounts, section="all", chunk_size=500):
+    """
+    CSV rows of the pending payments export, matching the Pending Payments table.
+
+    Accounts are read in chunks and only the sort key and CSV values of each
+    row are kept, so no model instances are held while sorting.
+
+    Args:
+        accounts: Queryset from pending_accounts()
+        section: "clients-owe", "you-owe" or "all"
+
+    Yields:
+        CSV rows: Clients Owe You first, then You Owe Clients,
+        each largest share first
+    """
+    now = timezone.now()
+    clients_owe = []
+    you_owe = []
+
+    for account in accounts.iterator(chunk_size=chunk_size):
+        row = pending_row(account, now=now)
+        csv_row = (
+            row["client"].name or '',
+            row["client"].code or '',
+            row["exchange"].name or '',
+            int(account.funding),
+            int(account.exchange_balance),
+            'N.A' if row["show_na"] else int(row["client_pnl"]),
+            'N.A' if row["show_na"] else int(row["remaining_amount"]),
+            row["share_percentage"],
+        )
+        target = you_owe if row["client_pnl"] > 0 else clients_owe
+        target.append((pending_sort_key(row), csv_row))
+
+    for name, entries in (("clients-owe", clients_owe), ("you-owe", you_owe)):
+        if section in ("all", name):
+            entries.sort(key=lambda entry: entry[0], reverse=True)
+            for _, csv_row in entries:
+                yield csv_row
+
+
+def pending_sort_key(row):
+    """Sort key for pending rows: largest share first, N.A rows last."""
+    if row["show_na"]:
+        return 0
+    return abs(row["my_share_amount"])
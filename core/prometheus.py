@@ -0,0 +1,209 @@
+"""
+Prometheus text exposition of the portal's metrics, served at /metrics.
+
+Request metrics come from core.instrumentation: the live numbers of the
+process serving the scrape plus, with METRICS_DIR set, the last files
+written by every other worker. Domain gauges (accounts, pending totals,
+table rows) are read from the database and cached for
+METRICS_DOMAIN_CACHE_TIMEOUT seconds, so frequent scrapes stay cheap.
+"""
+import glob
+import json
+import math
+import os
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from .instrumentation import process_metrics_path, process_snapshot
+from .models import ClientExchangeAccount, Settlement, Transaction
+from .pending import pending_row
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'broker_portal'
+DOMAIN_GAUGES_CACHE_KEY = 'prometheus_domain_gauges'
+
+# instrumentation counter name → (help text, labelled); exported as <name>_total
+COUNTERS = {
+    'http_requests': ('Requests by view name and status code.', True),
+    'rate_limit_rejections': ('Requests rejected by RateLimitMiddleware.', False),
+    'settlement_operations': ('Settlement payments recorded.', False),
+    'log_records_dropped': ('Log records dropped because the log queue was full.', False),
+}
+
+
+def worker_snapshots():
+    """Snapshots of this process and of every other worker in METRICS_DIR."""
+    snapshots = [process_snapshot()]
+    own_path = process_metrics_path()
+    if own_path is None:
+        return snapshots
+
+    for path in glob.glob(os.path.join(os.path.dirname(own_path), 'metrics-*.json')):
+        if path == own_path:
+            continue
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Removed or unreadable file: skip that worker for this scrape
+            continue
+    return snapshots
+
+
+def merge_snapshots(snapshots):
+    """
+    Add up worker snapshots.
+
+    Returns:
+        tuple (histograms by view, Counter of (name, labels) → count)
+    """
+    histograms = {}
+    counters = Counter()
+    for snapshot in snapshots:
+        for view, histogram in snapshot['histograms'].items():
+            merged = histograms.get(view)
+            if merged is None:
+                histograms[view] = {
+                    **histogram,
+                    'buckets': [list(bucket) for bucket in histogram['buckets']],
+                    'query_buckets': [list(bucket) for bucket in histogram['query_buckets']],
+                }
+                continue
+            for key in ('buckets', 'query_buckets'):
+                for bucket, (bound, count) in zip(merged[key], histogram[key]):
+                    bucket[1] += count
+            for key in ('count', 'total_ms', 'queries', 'db_ms'):
+                merged[key] += histogram[key]
+        for name, labels, value in snapshot['counters']:
+            counters[name, tuple(tuple(pair) for pair in labels)] += value
+    return histograms, counters
+
+
+def table_rows(model):
+    """Row count of a table; the planner's estimate on PostgreSQL, where COUNT(*) is a full scan."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1: never analyzed
+        if row and row[0] >= 0:
+            return row[0]
+    return model.objects.count()
+
+
+def compute_domain_gauges():
+    """
+    Returns:
+        dict with accounts (username → count), pending ((username,
+        direction) → remaining amount) and rows (table → row count)
+    """
+    accounts = Counter()
+    pending = defaultdict(int)
+    now = timezone.now()
+    queryset = ClientExchangeAccount.objects.select_related('client__user', 'exchange')
+    for account in queryset.iterator(chunk_size=500):
+        user = account.client.user
+        username = user.username if user else ''
+        accounts[username] += 1
+        row = pending_row(account, now=now)
+        direction = 'you_owe' if row['client_pnl'] > 0 else 'clients_owe'
+        pending[username, direction] += row['remaining_amount']
+
+    return {
+        'accounts': dict(accounts),
+        'pending': dict(pending),
+        'rows': {
+            model._meta.db_table: table_rows(model) for model in (Transaction, Settlement)
+        },
+    }
+
+
+def domain_gauges():
+    gauges = cache.get(DOMAIN_GAUGES_CACHE_KEY)
+    if gauges is None:
+        gauges = compute_domain_gauges()
+        cache.set(
+            DOMAIN_GAUGES_CACHE_KEY,
+            gauges,
+            getattr(settings, 'METRICS_DOMAIN_CACHE_TIMEOUT', 60),
+        )
+    return gauges
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, value, **labels):
+    label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in sorted(labels.items()))
+    if label_text:
+        label_text = '{' + label_text + '}'
+    return f'{PREFIX}_{name}{label_text} {value}'
+
+
+def _header(name, metric_type, help_text):
+    return [f'# HELP {PREFIX}_{name} {help_text}', f'# TYPE {PREFIX}_{name} {metric_type}']
+
+
+def _bound(bound, scale=1):
+    return '+Inf' if math.isinf(bound) else f'{bound / scale:g}'
+
+
+def render_metrics():
+    """The full /metrics page."""
+    histograms, counters = merge_snapshots(worker_snapshots())
+    views = sorted(histograms)
+    lines = []
+
+    lines += _header('http_request_duration_seconds', 'histogram', 'Request latency by view name.')
+    for view in views:
+        histogram = histograms[view]
+        for bound, count in histogram['buckets']:
+            lines.append(_sample('http_request_duration_seconds_bucket', count, view=view, le=_bound(bound, 1000)))
+        lines.append(_sample('http_request_duration_seconds_sum', histogram['total_ms'] / 1000, view=view))
+        lines.append(_sample('http_request_duration_seconds_count', histogram['count'], view=view))
+
+    lines += _header('db_queries_per_request', 'histogram', 'SQL queries per request by view name.')
+    for view in views:
+        histogram = histograms[view]
+        for bound, count in histogram['query_buckets']:
+            lines.append(_sample('db_queries_per_request_bucket', count, view=view, le=_bound(bound)))
+        lines.append(_sample('db_queries_per_request_sum', histogram['queries'], view=view))
+        lines.append(_sample('db_queries_per_request_count', histogram['count'], view=view))
+
+    lines += _header('db_duration_seconds_total', 'counter', 'Time spent in SQL queries by view name.')
+    for view in views:
+        lines.append(_sample('db_duration_seconds_total', histograms[view]['db_ms'] / 1000, view=view))
+
+    for name, (help_text, labelled) in COUNTERS.items():
+        lines += _header(f'{name}_total', 'counter', help_text)
+        samples = sorted(
+            (labels, value) for (counter, labels), value in counters.items() if counter == name
+        )
+        if not samples and not labelled:
+            # Unlabelled counters start at 0, so rate() and alerts work before the first event
+            samples = [((), 0)]
+        for labels, value in samples:
+            lines.append(_sample(f'{name}_total', value, **dict(labels)))
+
+    gauges = domain_gauges()
+    lines += _header('accounts', 'gauge', 'Client exchange accounts per user.')
+    for username, count in sorted(gauges['accounts'].items()):
+        lines.append(_sample('accounts', count, user=username))
+
+    lines += _header('pending_amount', 'gauge', 'Remaining settlement share per user and direction.')
+    for (username, direction), amount in sorted(gauges['pending'].items()):
+        lines.append(_sample('pending_amount', amount, user=username, direction=direction))
+
+    lines += _header('table_rows', 'gauge', 'Rows per table (estimated on PostgreSQL).')
+    for table, count in sorted(gauges['rows'].items()):
+        lines.append(_sample('table_rows', count, table=table))
+
+    return '\n'.join(lines) + '\n'
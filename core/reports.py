@@ -0,0 +1,189 @@
+"""
+Report aggregation helpers.
+
+Report views read DailyAccountRollup rows (one row per account per day)
+instead of walking every Transaction in Python.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Abs, Coalesce
+
+from .models import ClientExchangeReportConfig, DailyAccountRollup
+
+
+ROLLUP_FIELDS = DailyAccountRollup.VALUE_FIELDS
+
+
+def _empty_totals():
+    return {field: 0 for field in ROLLUP_FIELDS}
+
+
+def _sums():
+    return {field: Coalesce(Sum(field), Value(0)) for field in ROLLUP_FIELDS}
+
+
+def rollups_for(user, client_id=None, exchange_id=None, search_query=None,
+                start_date=None, end_date=None):
+    """
+    Rollup rows of a user's accounts, with the usual report filters.
+
+    Args:
+        start_date / end_date: Inclusive calendar days (date objects)
+    """
+    rollups = DailyAccountRollup.objects.filter(account__client__user=user)
+
+    if client_id:
+        rollups = rollups.filter(account__client_id=client_id)
+    if exchange_id:
+        rollups = rollups.filter(account__exchange_id=exchange_id)
+    if search_query:
+        rollups = rollups.filter(
+            Q(account__client__name__icontains=search_query) |
+            Q(account__client__code__icontains=search_query) |
+            Q(account__exchange__name__icontains=search_query)
+        )
+    if start_date:
+        rollups = rollups.filter(day__gte=start_date)
+    if end_date:
+        rollups = rollups.filter(day__lte=end_date)
+
+    return rollups
+
+
+def rollup_totals(rollups):
+    """Totals over rollup rows: dict of turnover, trade_pnl, settlements_in/out, tx_count."""
+    return rollups.aggregate(**_sums())
+
+
+def rollup_totals_by(rollups, key):
+    """
+    Totals grouped by `key` (e.g. 'day' or 'account__client__name').
+
+    Returns: dict {key value: totals dict}
+    """
+    rows = rollups.order_by().values(key).annotate(**_sums())
+    return {row.pop(key): row for row in rows}
+
+
+def sum_days(totals_by_day, start_date, end_date):
+    """Add up per-day totals (from rollup_totals_by(..., 'day')) for an inclusive day range."""
+    totals = _empty_totals()
+    current = start_date
+    while current <= end_date:
+        day_totals = totals_by_day.get(current)
+        if day_totals:
+            for field in ROLLUP_FIELDS:
+                totals[field] += day_totals[field]
+        current += timedelta(days=1)
+    return totals
+
+
+def profit_split(payments, total_profit):
+    """
+    Split Your Total Profit into My Profit and Friend Profit.
+    
+    Weighted average of each account's report config, weighted by |amount|:
+        My Profit = Your Total Profit × Σ(|amount| × my_own_pct / my_pct) / Σ|amount|
+        Friend Profit = Your Total Profit × Σ(|amount| × friend_pct / my_pct) / Σ|amount|
+    Payments of accounts with my_pct = 0 or without a report config are skipped.
+    If no payment carries a weight, everything goes to My Profit.
+    
+    The sums come from one query grouped by percentage combination, so the cost
+    does not depend on the number of payments.
+    
+    Args:
+        payments: Transaction queryset of payment rows
+        total_profit: Your Total Profit (signed sum of the payments)
+    
+    Returns:
+        dict with my_profit, friend_profit, tx_count, skipped_no_config, skipped_zero_pct
+    """
+    rows = payments.order_by().values(
+        "client_exchange__my_percentage",
+        "client_exchange__report_config__my_own_percentage",
+        "client_exchange__report_config__friend_percentage",
+    ).annotate(
+        weight=Sum(Abs("amount")),
+        count=Count("id"),
+    )
+    
+    split = {
+        "my_profit": Decimal(0),
+        "friend_profit": Decimal(0),
+        "tx_count": 0,
+        "skipped_no_config": 0,
+        "skipped_zero_pct": 0,
+    }
+    total_weighted_my_own = Decimal(0)
+    total_weighted_friend = Decimal(0)
+    total_weighted_amount = Decimal(0)
+    
+    for row in rows:
+        split["tx_count"] += row["count"]
+        my_total_pct = Decimal(str(row["client_exchange__my_percentage"]))
+        my_own_pct = row["client_exchange__report_config__my_own_percentage"]
+        friend_pct = row["client_exchange__report_config__friend_percentage"]
+        
+        if my_total_pct == 0:
+            split["skipped_zero_pct"] += row["count"]
+            continue
+        # Both percentages are required, so NULL means no report config row
+        if my_own_pct is None:
+            split["skipped_no_config"] += row["count"]
+            continue
+        
+        weight = Decimal(row["weight"] or 0)
+        total_weighted_my_own += weight * (Decimal(str(my_own_pct)) / my_total_pct)
+        total_weighted_friend += weight * (Decimal(str(friend_pct)) / my_total_pct)
+        total_weighted_amount += weight
+    
+    if total_weighted_amount > 0:
+        # Split total profit proportionally (works for both positive and negative)
+        split["my_profit"] = total_profit * (total_weighted_my_own / total_weighted_amount)
+        split["friend_profit"] = total_profit * (total_weighted_friend / total_weighted_amount)
+    elif total_profit != 0:
+        # No report configs found, all goes to me
+        split["my_profit"] = total_profit
+    
+    return split
+
+
+def account_share_split(accounts):
+    """
+    Client PnL and My Share over a set of accounts, with My Share split into
+    My Own / Friend shares by each account's report config.
+    
+    Each account's share is computed once and all report configs are loaded
+    with one query. Accounts without a config count fully as My Own share.
+    
+    Args:
+        accounts: ClientExchangeAccount queryset or list
+    
+    Returns:
+        dict with total_pnl, total_my_share, my_own_share, friend_share
+    """
+    configs = {
+        config.client_exchange_id: config
+        for config in ClientExchangeReportConfig.objects.filter(client_exchange__in=accounts)
+    }
+    
+    split = {"total_pnl": 0, "total_my_share": 0, "my_own_share": 0, "friend_share": 0}
+    for account in accounts:
+        my_share = account.compute_my_share()
+        split["total_pnl"] += account.compute_client_pnl()
+        split["total_my_share"] += my_share
+        
+        config = configs.get(account.pk)
+        if config is None:
+            split["my_own_share"] += my_share
+        elif my_share > 0:
+            total_config_pct = float(config.my_own_percentage + config.friend_percentage)
+            if total_config_pct > 0:
+                split["my_own_share"] += int((my_share * float(config.my_own_percentage)) / total_config_pct)
+                split["friend_share"] += int((my_share * float(config.friend_percentage)) / total_config_pct)
+            else:
+                split["my_own_share"] += my_share
+    
+    return split
@@ -1,50 +1,118 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Client, Exchange, ClientExchangeAccount, Transaction
+from .models import Client, Exchange, ClientExchangeAccount, Settlement, Transaction
 
-class ClientSerializer(serializers.ModelSerializer):
+
+def _split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for GET requests: ?fields=id,name returns only those
+    fields. Fields listed in expandable_fields are costly to compute and
+    are left out of a ?fields= selection unless named there or in
+    ?expand=. Without ?fields= every field is returned as before.
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # Writes keep every field, or their input would be dropped
+        if request is None or request.method != 'GET' or 'fields' not in request.query_params:
+            return
+
+        requested = _split_param(request.query_params['fields'])
+        expand = _split_param(request.query_params.get('expand', ''))
+        unknown = sorted(set(requested + expand) - set(self.fields))
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+        for name in list(self.fields):
+            if name not in requested and name not in expand:
+                self.fields.pop(name)
+
+
+class ClientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Client
         fields = ['id', 'name', 'code', 'referred_by', 'is_company_client']
 
-class ExchangeSerializer(serializers.ModelSerializer):
+class ExchangeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Exchange
         fields = ['id', 'name', 'version_name', 'code']
 
-class ClientExchangeAccountSerializer(serializers.ModelSerializer):
+def account_computed_fields(account, names, now=None):
+    """Computed fields of one account (any of pnl, my_share, remaining_amount)."""
+    computed = {}
+    if 'pnl' in names:
+        try:
+            computed['pnl'] = account.compute_client_pnl()
+        except Exception as e:
+            computed['pnl'] = 0
+    if 'my_share' in names:
+        try:
+            computed['my_share'] = account.compute_my_share()
+        except Exception as e:
+            computed['my_share'] = 0
+    if 'remaining_amount' in names:
+        try:
+            computed['remaining_amount'] = account.preview_settlement_state(now=now)['remaining']
+        except Exception as e:
+            computed['remaining_amount'] = 0
+    return computed
+
+
+class ClientExchangeAccountListSerializer(serializers.ListSerializer):
+    """Fills the requested computed fields for a whole page in one pass."""
+
+    def to_representation(self, data):
+        accounts = list(data.all() if hasattr(data, 'all') else data)
+        names = [name for name in self.child.expandable_fields if name in self.child.fields]
+        if names:
+            now = timezone.now()
+            self.child.computed = {
+                account.pk: account_computed_fields(account, names, now=now) for account in accounts
+            }
+        return super().to_representation(accounts)
+
+
+class ClientExchangeAccountSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     client_name = serializers.CharField(source='client.name', read_only=True)
     exchange_name = serializers.CharField(source='exchange.name', read_only=True)
     pnl = serializers.SerializerMethodField()
     my_share = serializers.SerializerMethodField()
     remaining_amount = serializers.SerializerMethodField()
 
+    expandable_fields = ('pnl', 'my_share', 'remaining_amount')
+    # pk → computed fields, set by the list serializer
+    computed = None
+
+    def _computed(self, obj, name):
+        if self.computed is not None and obj.pk in self.computed:
+            return self.computed[obj.pk][name]
+        return account_computed_fields(obj, [name])[name]
+
     def get_pnl(self, obj):
-        try:
-            return obj.compute_client_pnl()
-        except Exception as e:
-            return 0
+        return self._computed(obj, 'pnl')
 
     def get_my_share(self, obj):
-        try:
-            return obj.compute_my_share()
-        except Exception as e:
-            return 0
+        return self._computed(obj, 'my_share')
 
     def get_remaining_amount(self, obj):
-        try:
-            return obj.get_remaining_settlement_amount()['remaining']
-        except Exception as e:
-            return 0
+        return self._computed(obj, 'remaining_amount')
 
     class Meta:
         model = ClientExchangeAccount
+        list_serializer_class = ClientExchangeAccountListSerializer
         fields = [
             'id', 'client', 'client_name', 'exchange', 'exchange_name',
             'funding', 'exchange_balance', 'pnl', 'my_share', 'remaining_amount',
             'loss_share_percentage', 'profit_share_percentage'
         ]
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     type_display = serializers.CharField(source='get_type_display', read_only=True)
     client_name = serializers.CharField(source='client_exchange.client.name', read_only=True)
     exchange_name = serializers.CharField(source='client_exchange.exchange.name', read_only=True)
@@ -56,3 +124,8 @@ class TransactionSerializer(serializers.ModelSerializer):
             'date', 'type', 'type_display', 'amount',
             'funding_before', 'funding_after', 'exchange_balance_before', 'exchange_balance_after', 'sequence_no', 'notes'
         ]
+
+class SettlementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Settlement
+        fields = ['id', 'client_exchange', 'amount', 'date', 'notes']
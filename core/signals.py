@@ -0,0 +1,107 @@
+"""
+Signal handlers keeping derived, per-user caches and data versions (ETags)
+in step with model writes, recording deletions for the mobile delta sync,
+and counting settlement operations for /metrics.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .etags import bump_data_version
+from .instrumentation import increment
+from .metrics import invalidate_dashboard_metrics
+from .models import (
+    Client,
+    ClientExchangeAccount,
+    ClientExchangeReportConfig,
+    Exchange,
+    Settlement,
+    SyncTombstone,
+    Transaction,
+)
+
+
+def _user_data_changed(user_id):
+    invalidate_dashboard_metrics(user_id)
+    bump_data_version(user_id)
+
+
+def _invalidate_client_owner(client_id):
+    user_id = Client.objects.filter(pk=client_id).values_list('user_id', flat=True).first()
+    if user_id:
+        _user_data_changed(user_id)
+
+
+def _invalidate_account_owner(account_id):
+    # Accounts removed in a cascade are covered by their client's signal
+    user_id = ClientExchangeAccount.objects.filter(
+        pk=account_id
+    ).values_list('client__user_id', flat=True).first()
+    if user_id:
+        _user_data_changed(user_id)
+
+
+@receiver([post_save, post_delete], sender=Client)
+def client_changed(sender, instance, **kwargs):
+    if instance.user_id:
+        _user_data_changed(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=ClientExchangeAccount)
+def account_changed(sender, instance, **kwargs):
+    _invalidate_client_owner(instance.client_id)
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Settlement)
+@receiver([post_save, post_delete], sender=ClientExchangeReportConfig)
+def account_activity_changed(sender, instance, **kwargs):
+    _invalidate_account_owner(instance.client_exchange_id)
+
+
+@receiver([post_save, post_delete], sender=Exchange)
+def exchange_changed(sender, instance, **kwargs):
+    # Every user sees every exchange
+    bump_data_version(None)
+
+
+@receiver(post_save, sender=Settlement)
+def settlement_recorded(sender, instance, created, **kwargs):
+    # Counted once committed; bulk_create() (sample data) sends no signal
+    if created:
+        transaction.on_commit(lambda: increment('settlement_operations'))
+
+
+def _deleted_directly(sender, origin):
+    """False for rows removed in a cascade, which the parent's tombstone covers."""
+    if isinstance(origin, sender):
+        return True
+    return getattr(origin, 'model', None) is sender
+
+
+def _tombstone(user_id, kind, object_id):
+    if user_id:
+        SyncTombstone.objects.create(user_id=user_id, kind=kind, object_id=object_id)
+
+
+@receiver(post_delete, sender=Client)
+def client_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(sender, origin):
+        _tombstone(instance.user_id, 'client', instance.pk)
+
+
+@receiver(post_delete, sender=ClientExchangeAccount)
+def account_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(sender, origin):
+        user_id = Client.objects.filter(pk=instance.client_id).values_list('user_id', flat=True).first()
+        _tombstone(user_id, 'account', instance.pk)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Settlement)
+def account_row_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(sender, origin):
+        user_id = ClientExchangeAccount.objects.filter(
+            pk=instance.client_exchange_id
+        ).values_list('client__user_id', flat=True).first()
+        _tombstone(user_id, sender.__name__.lower(), instance.pk)
@@ -0,0 +1,151 @@
+"""
+Delta sync for the mobile app.
+
+A device sends the cursor of its previous sync and gets back only the
+clients, accounts, transactions and settlements changed since then (by
+updated_at), the ids of the deleted ones (SyncTombstone) and a new cursor.
+Without a cursor, or with one older than the tombstone retention, it gets
+a full snapshot instead and must replace its local data.
+
+Each kind is read in (updated_at, id) order, at most SYNC_PAGE_SIZE rows
+per call; has_more asks the device to call again with the new cursor.
+Kinds that were read to the end restart SYNC_CURSOR_LAG seconds in the
+past, so rows committed late by slow transactions are still picked up.
+A row can therefore arrive twice: devices upsert the changed rows by id,
+then remove the deleted ones.
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Client, ClientExchangeAccount, Settlement, SyncTombstone, Transaction
+from .pagination import InvalidCursor
+from .serializers import (
+    ClientExchangeAccountSerializer,
+    ClientSerializer,
+    SettlementSerializer,
+    TransactionSerializer,
+)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# SyncTombstone.kind → response key
+DELETED_KINDS = {
+    'client': 'clients',
+    'account': 'accounts',
+    'transaction': 'transactions',
+    'settlement': 'settlements',
+}
+
+
+def sync_sources(user):
+    """Response key → (queryset of the user's rows, serializer, timestamp field)."""
+    return {
+        'clients': (Client.objects.filter(user=user), ClientSerializer, 'updated_at'),
+        'accounts': (
+            ClientExchangeAccount.objects.filter(client__user=user).select_related('client', 'exchange'),
+            ClientExchangeAccountSerializer,
+            'updated_at',
+        ),
+        'transactions': (
+            Transaction.objects.filter(client_exchange__client__user=user).select_related(
+                'client_exchange__client', 'client_exchange__exchange'
+            ),
+            TransactionSerializer,
+            'updated_at',
+        ),
+        'settlements': (
+            Settlement.objects.filter(client_exchange__client__user=user),
+            SettlementSerializer,
+            'updated_at',
+        ),
+        'deleted': (SyncTombstone.objects.filter(user=user), None, 'deleted_at'),
+    }
+
+
+def encode_sync_cursor(positions):
+    """Opaque cursor of each kind's (timestamp, id) position."""
+    data = {kind: [moment.isoformat(), pk] for kind, (moment, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor):
+    """
+    Returns: dict of kind → (timestamp, id)
+    Raises: InvalidCursor
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return {
+            kind: (datetime.fromisoformat(data[kind][0]), int(data[kind][1]))
+            for kind in ('clients', 'accounts', 'transactions', 'settlements', 'deleted')
+        }
+    except (TypeError, ValueError, KeyError, IndexError, AttributeError):
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+
+def _changed_since(queryset, field, position, limit):
+    moment, pk = position
+    return list(
+        queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk}))
+        .order_by(field, 'id')[:limit]
+    )
+
+
+def sync_changes(user, cursor=None, page_size=None, now=None):
+    """
+    Changes of a user's data since a sync cursor.
+
+    Returns:
+        dict with cursor (for the next call), full (True: a snapshot that
+        replaces local data), has_more, the serialized clients, accounts,
+        transactions and settlements, and deleted ({kind: [ids]})
+    Raises:
+        InvalidCursor
+    """
+    if now is None:
+        now = timezone.now()
+    if page_size is None:
+        page_size = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+    retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+    caught_up = (now - timedelta(seconds=getattr(settings, 'SYNC_CURSOR_LAG', 30)), 0)
+
+    sources = sync_sources(user)
+    positions = decode_sync_cursor(cursor) if cursor else None
+    # Deletions older than the retention may be pruned already
+    full = positions is None or positions['deleted'][0] < now - retention
+    if full:
+        positions = dict.fromkeys(sources, (EPOCH, 0))
+
+    result = {'full': full, 'has_more': False}
+    new_positions = {}
+    for kind, (queryset, serializer, field) in sources.items():
+        if kind == 'deleted' and full:
+            # A snapshot has nothing to delete
+            rows = []
+        else:
+            rows = _changed_since(queryset, field, positions[kind], page_size + 1)
+
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            result['has_more'] = True
+            new_positions[kind] = (getattr(rows[-1], field), rows[-1].pk)
+        else:
+            # Read to the end: go back over the lag window next time
+            new_positions[kind] = caught_up
+
+        if kind == 'deleted':
+            deleted = {key: [] for key in DELETED_KINDS.values()}
+            for tombstone in rows:
+                deleted[DELETED_KINDS[tombstone.kind]].append(tombstone.object_id)
+            result['deleted'] = deleted
+        else:
+            result[kind] = serializer(rows, many=True).data
+
+    result['cursor'] = encode_sync_cursor(new_positions)
+    return result
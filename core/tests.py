@@ -18,21 +18,32 @@ Test Coverage:
 10. Concurrent Payments
 """
 
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db import transaction
+import json
+import logging
 import math
+from decimal import Decimal
 from datetime import timedelta
 
 from .models import (
     Client,
     Exchange,
     ClientExchangeAccount,
+    ClientExchangeReportConfig,
+    DailyAccountRollup,
     Settlement,
     Transaction,
 )
+from .metrics import get_dashboard_metrics, metrics_cache_key
+from .pagination import keyset_page
+from .pending import build_pending_lists, pending_accounts, pending_csv_rows, pending_sort_key
+from .reports import account_share_split, profit_split
 
 
 class PendingPaymentsPnLCalculationTests(TestCase):
@@ -1449,3 +1460,1982 @@ class PendingPaymentsIntegrationTests(TestCase):
         self.assertEqual(total_settled, 9)
 
 
+class PendingPaymentsEngineTests(TestCase):
+    """
+    Test Suite 11: Pending Payments Engine
+    
+    Set-based engine must match the per-account locked share logic
+    and run in a constant number of queries.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='engineuser', password='testpass')
+        self.client_obj = Client.objects.create(name='Engine Client', code='EC1', user=self.user)
+    
+    def _create_account(self, name, funding, exchange_balance, **kwargs):
+        exchange = Exchange.objects.create(name=name, code=name.upper())
+        account = ClientExchangeAccount.objects.create(
+            client=self.client_obj,
+            exchange=exchange,
+            funding=funding,
+            exchange_balance=exchange_balance,
+            **kwargs
+        )
+        # Start from an open cycle, as after funding
+        account.close_cycle()
+        return account
+    
+    def test_engine_matches_account_methods(self):
+        """Test engine rows match lock_initial_share_if_needed + get_remaining_settlement_amount"""
+        loss = self._create_account('loss', 100, 10, loss_share_percentage=10)
+        profit = self._create_account('profit', 50, 100, profit_share_percentage=20)
+        self._create_account('neutral', 100, 100, loss_share_percentage=10)
+        
+        # Locked loss cycle with a partial payment
+        loss.lock_initial_share_if_needed()
+        Settlement.objects.create(client_exchange=loss, amount=4, date=timezone.now())
+        
+        clients_owe, you_owe = build_pending_lists(pending_accounts(self.user))
+        
+        self.assertEqual([row['account'].id for row in you_owe], [profit.id])
+        rows = {row['account'].id: row for row in clients_owe + you_owe}
+        self.assertTrue(rows[clients_owe[-1]['account'].id]['show_na'])
+        
+        for account in ClientExchangeAccount.objects.filter(client=self.client_obj):
+            info = account.get_remaining_settlement_amount()
+            row = rows[account.id]
+            if account.compute_client_pnl() == 0:
+                self.assertEqual(row['remaining_amount'], 0)
+            else:
+                self.assertEqual(row['remaining_amount'], info['remaining'])
+                self.assertEqual(row['my_share_amount'], info['initial_final_share'])
+        
+        self.assertEqual(rows[loss.id]['remaining_amount'], 5)
+        self.assertEqual(rows[profit.id]['remaining_amount'], 10)
+    
+    def test_engine_does_not_persist_locks(self):
+        """Test engine reports the would-be locked share without writing it"""
+        account = self._create_account('fresh', 100, 10, loss_share_percentage=10)
+        
+        clients_owe, _ = build_pending_lists(pending_accounts(self.user))
+        
+        self.assertEqual(clients_owe[0]['remaining_amount'], 9)
+        account.refresh_from_db()
+        self.assertIsNone(account.locked_initial_final_share)
+        self.assertIsNone(account.cycle_start_date)
+    
+    def test_engine_query_count_is_constant(self):
+        """Test query count does not grow with number of accounts"""
+        for i in range(3):
+            account = self._create_account(f'ex{i}', 100, 10 + i, loss_share_percentage=10)
+            account.lock_initial_share_if_needed()
+            Settlement.objects.create(client_exchange=account, amount=1, date=timezone.now())
+        
+        with self.assertNumQueries(1):
+            build_pending_lists(pending_accounts(self.user))
+        
+        for i in range(3, 9):
+            account = self._create_account(f'ex{i}', 100, 10 + i, loss_share_percentage=10)
+            account.lock_initial_share_if_needed()
+        
+        with self.assertNumQueries(1):
+            build_pending_lists(pending_accounts(self.user))
+
+
+class PendingPaymentsReadOnlySettlementTests(TestCase):
+    """
+    Test Suite 12: Read-only Settlement Computation
+    
+    get_remaining_settlement_amount() must never write;
+    lock_initial_share_if_needed() persists the previewed state.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='readonlyuser', password='testpass')
+        self.client_obj = Client.objects.create(name='Read Client', user=self.user)
+        self.exchange = Exchange.objects.create(name='Read Exchange')
+        self.account = ClientExchangeAccount.objects.create(
+            client=self.client_obj,
+            exchange=self.exchange,
+            funding=100,
+            exchange_balance=10,
+            loss_share_percentage=10,
+        )
+        self.account.close_cycle()
+    
+    def test_get_remaining_does_not_write(self):
+        """Test remaining is computed from the previewed lock without saving"""
+        with self.assertNumQueries(0):
+            settlement_info = self.account.get_remaining_settlement_amount()
+        
+        self.assertEqual(settlement_info['initial_final_share'], 9)
+        self.assertEqual(settlement_info['remaining'], 9)
+        self.assertIsNone(self.account.locked_initial_final_share)
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.locked_initial_final_share)
+    
+    def test_preview_matches_persisted_lock(self):
+        """Test lock_initial_share_if_needed persists the previewed state"""
+        state = self.account.preview_settlement_state()
+        self.assertTrue(state['changed'])
+        
+        self.account.lock_initial_share_if_needed()
+        self.account.refresh_from_db()
+        
+        self.assertEqual(self.account.locked_initial_final_share, state['locked_initial_final_share'])
+        self.assertEqual(self.account.locked_initial_pnl, state['locked_initial_pnl'])
+        self.assertEqual(self.account.locked_initial_funding, state['locked_initial_funding'])
+        self.assertFalse(self.account.preview_settlement_state()['changed'])
+    
+    def test_lock_is_idempotent(self):
+        """Test locking an already locked cycle does not write again"""
+        self.account.lock_initial_share_if_needed()
+        
+        with self.assertNumQueries(0):
+            self.account.lock_initial_share_if_needed()
+
+
+class PendingPaymentsSettlementLedgerTests(TestCase):
+    """
+    Test Suite 13: Settlement Ledger Columns
+    
+    settled_total / cycle_settled_total must match SUM(Settlement)
+    and remaining must be computed without querying settlements.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='ledgeruser', password='testpass')
+        self.client_obj = Client.objects.create(name='Ledger Client', user=self.user)
+        self.exchange = Exchange.objects.create(name='Ledger Exchange')
+        self.account = ClientExchangeAccount.objects.create(
+            client=self.client_obj,
+            exchange=self.exchange,
+            funding=100,
+            exchange_balance=10,
+            loss_share_percentage=10,
+        )
+        self.account.close_cycle()
+        self.account.lock_initial_share_if_needed()
+    
+    def test_settlement_updates_ledger(self):
+        """Test settlements in and before the cycle update the right totals"""
+        Settlement.objects.create(client_exchange=self.account, amount=3, date=timezone.now())
+        Settlement.objects.create(
+            client_exchange=self.account,
+            amount=5,
+            date=self.account.cycle_start_date - timedelta(days=1)
+        )
+        
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.settled_total, 8)
+        self.assertEqual(self.account.cycle_settled_total, 3)
+        
+        with self.assertNumQueries(0):
+            settlement_info = self.account.get_remaining_settlement_amount()
+        self.assertEqual(settlement_info['remaining'], 6)
+    
+    def test_settlement_delete_updates_ledger(self):
+        """Test deleting a settlement removes it from the ledger"""
+        settlement = Settlement.objects.create(client_exchange=self.account, amount=4, date=timezone.now())
+        settlement.delete()
+        
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.settled_total, 0)
+        self.assertEqual(self.account.cycle_settled_total, 0)
+    
+    def test_close_cycle_resets_cycle_total(self):
+        """Test close_cycle resets the cycle total but keeps the all-time total"""
+        Settlement.objects.create(client_exchange=self.account, amount=4, date=timezone.now())
+        self.account.close_cycle()
+        
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.cycle_settled_total, 0)
+        self.assertEqual(self.account.settled_total, 4)
+    
+    def test_stale_full_save_keeps_ledger(self):
+        """Test a full save of an instance loaded before a settlement does not undo it"""
+        stale = ClientExchangeAccount.objects.get(pk=self.account.pk)
+        Settlement.objects.create(client_exchange=self.account, amount=4, date=timezone.now())
+        
+        stale.funding += 50
+        stale.save()
+        
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.funding, 150)
+        self.assertEqual(self.account.settled_total, 4)
+        self.assertEqual(self.account.cycle_settled_total, 4)
+    
+    def test_edited_settlement_moves_ledger(self):
+        """Test editing a settlement's amount and date replaces its old values in the ledger"""
+        settlement = Settlement.objects.create(client_exchange=self.account, amount=4, date=timezone.now())
+        
+        settlement.amount = 6
+        settlement.save()
+        self.account.refresh_from_db()
+        self.assertEqual((self.account.settled_total, self.account.cycle_settled_total), (6, 6))
+        
+        settlement.date = self.account.cycle_start_date - timedelta(days=1)
+        settlement.save()
+        self.account.refresh_from_db()
+        self.assertEqual((self.account.settled_total, self.account.cycle_settled_total), (6, 0))
+    
+    def test_rebuild_command_fixes_stale_totals(self):
+        """Test rebuild_settlement_totals restores totals from Settlement rows"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        
+        Settlement.objects.create(client_exchange=self.account, amount=4, date=timezone.now())
+        ClientExchangeAccount.objects.filter(pk=self.account.pk).update(settled_total=0, cycle_settled_total=0)
+        
+        with self.assertRaises(CommandError):
+            call_command('rebuild_settlement_totals', '--check', stdout=StringIO())
+        
+        call_command('rebuild_settlement_totals', stdout=StringIO())
+        
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.settled_total, 4)
+        self.assertEqual(self.account.cycle_settled_total, 4)
+
+
+class DailyAccountRollupTests(TestCase):
+    """
+    Test Suite 14: Daily Report Rollups
+    
+    DailyAccountRollup must match the transactions it summarises,
+    both when maintained incrementally and when rebuilt.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='rollupuser', password='testpass')
+        self.client_obj = Client.objects.create(name='Rollup Client', user=self.user)
+        self.exchange = Exchange.objects.create(name='Rollup Exchange')
+        self.account = ClientExchangeAccount.objects.create(
+            client=self.client_obj,
+            exchange=self.exchange,
+            funding=100,
+            exchange_balance=100,
+        )
+        self.now = timezone.now()
+    
+    def _trade(self, before, after, date=None):
+        return Transaction.objects.create(
+            client_exchange=self.account,
+            date=date or self.now,
+            type='TRADE',
+            amount=after - before,
+            exchange_balance_before=before,
+            exchange_balance_after=after,
+        )
+    
+    def _snapshot(self):
+        return sorted(
+            DailyAccountRollup.objects.values_list(
+                'account_id', 'day', 'turnover', 'trade_pnl',
+                'settlements_in', 'settlements_out', 'tx_count'
+            )
+        )
+    
+    def test_transactions_update_rollup(self):
+        """Test trades and payments are added to the day's rollup"""
+        self._trade(100, 80)
+        self._trade(80, 130)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='RECORD_PAYMENT', amount=7)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='RECORD_PAYMENT', amount=-3)
+        
+        rollup = DailyAccountRollup.objects.get(account=self.account, day=timezone.localdate(self.now))
+        self.assertEqual(rollup.turnover, 70)
+        self.assertEqual(rollup.trade_pnl, 30)
+        self.assertEqual(rollup.settlements_in, 7)
+        self.assertEqual(rollup.settlements_out, 3)
+        self.assertEqual(rollup.tx_count, 4)
+    
+    def test_share_settlements_stay_out_of_payment_columns(self):
+        """Test SETTLEMENT_SHARE is not counted as a payment, as in the original report charts"""
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='SETTLEMENT_SHARE', amount=-4)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='SETTLEMENT_SHARE', amount=6)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='RECORD_PAYMENT', amount=2)
+        
+        rollup = DailyAccountRollup.objects.get(account=self.account, day=timezone.localdate(self.now))
+        self.assertEqual((rollup.settlements_in, rollup.settlements_out, rollup.tx_count), (2, 0, 3))
+    
+    def test_edit_and_delete_update_rollup(self):
+        """Test editing or deleting a transaction moves its contribution"""
+        trade = self._trade(100, 80)
+        trade.exchange_balance_after = 90
+        trade.date = self.now - timedelta(days=2)
+        trade.save()
+        
+        old_day = DailyAccountRollup.objects.get(account=self.account, day=timezone.localdate(self.now))
+        new_day = DailyAccountRollup.objects.get(account=self.account, day=timezone.localdate(trade.date))
+        self.assertEqual((old_day.turnover, old_day.tx_count), (0, 0))
+        self.assertEqual((new_day.turnover, new_day.trade_pnl, new_day.tx_count), (10, -10, 1))
+        
+        trade.delete()
+        new_day.refresh_from_db()
+        self.assertEqual((new_day.turnover, new_day.trade_pnl, new_day.tx_count), (0, 0, 0))
+    
+    def test_backfill_matches_incremental_rollups(self):
+        """Test backfill_daily_rollups rebuilds the same totals"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self._trade(100, 60)
+        self._trade(60, 75, date=self.now - timedelta(days=1))
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='SETTLEMENT_SHARE', amount=-4)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='FUNDING_MANUAL', amount=50)
+        expected = self._snapshot()
+        
+        DailyAccountRollup.objects.all().delete()
+        call_command('backfill_daily_rollups', stdout=StringIO())
+        
+        self.assertEqual(self._snapshot(), expected)
+    
+    def test_turnover_queryset_matches_rollup(self):
+        """Test Transaction.objects.turnover() agrees with the rollup"""
+        yesterday = self.now - timedelta(days=1)
+        self._trade(100, 60)
+        self._trade(60, 75, date=yesterday)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='TRADE', amount=5)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='RECORD_PAYMENT', amount=9)
+        
+        transactions = Transaction.objects.filter(client_exchange=self.account)
+        self.assertEqual(transactions.turnover(), {'turnover': 55, 'trade_pnl': -25})
+        
+        with self.assertNumQueries(1):
+            breakdown = transactions.turnover_breakdown()
+        self.assertEqual(breakdown['total'], {'turnover': 55, 'trade_pnl': -25})
+        self.assertEqual(breakdown['by_client'], {'Rollup Client': {'turnover': 55, 'trade_pnl': -25}})
+        self.assertEqual(breakdown['by_day'][timezone.localdate(yesterday)], {'turnover': 15, 'trade_pnl': 15})
+        
+        for rollup in DailyAccountRollup.objects.all():
+            self.assertEqual(breakdown['by_day'][rollup.day]['turnover'], rollup.turnover)
+            self.assertEqual(breakdown['by_day'][rollup.day]['trade_pnl'], rollup.trade_pnl)
+
+    def test_turnover_per_account(self):
+        """Test turnover('client_exchange') gives every account's turnover from one query"""
+        other = ClientExchangeAccount.objects.create(
+            client=self.client_obj, exchange=Exchange.objects.create(name='Other Rollup Exchange'),
+        )
+        self._trade(100, 60)
+        Transaction.objects.create(
+            client_exchange=other, date=self.now, type='TRADE', amount=8,
+            exchange_balance_before=0, exchange_balance_after=8,
+        )
+
+        with self.assertNumQueries(1):
+            rows = {
+                row['client_exchange']: row['turnover']
+                for row in Transaction.objects.filter(
+                    client_exchange__in=self.client_obj.exchange_accounts.all()
+                ).turnover('client_exchange')
+            }
+        self.assertEqual(rows, {self.account.pk: 40, other.pk: 8})
+
+
+    def test_performance_groups_by_day(self):
+        """Test Transaction.objects.performance() per-day pnl, settlements and counts"""
+        yesterday = self.now - timedelta(days=1)
+        self._trade(100, 60)
+        self._trade(60, 75, date=yesterday)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='RECORD_PAYMENT', amount=9)
+        Transaction.objects.create(client_exchange=self.account, date=self.now, type='FUNDING_MANUAL', amount=50)
+        
+        rows = {
+            row['day']: (row['pnl'], row['settlements'], row['tx_count'])
+            for row in Transaction.objects.all().performance('day')
+        }
+        self.assertEqual(rows, {
+            timezone.localdate(self.now): (-40, 9, 3),
+            timezone.localdate(yesterday): (15, 0, 1),
+        })
+
+class ReportProfitSplitTests(TestCase):
+    """
+    Test Suite 15: My Profit / Friend Profit Split
+    
+    Your Total Profit is split by report config percentages,
+    weighted by |payment amount|, in a single query.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='splituser', password='testpass')
+        self.client_obj = Client.objects.create(name='Split Client', user=self.user)
+        self.now = timezone.now()
+    
+    def _account(self, name, my_percentage, my_own=None, friend=None):
+        account = ClientExchangeAccount.objects.create(
+            client=self.client_obj,
+            exchange=Exchange.objects.create(name=name),
+            my_percentage=my_percentage,
+        )
+        if my_own is not None:
+            ClientExchangeReportConfig.objects.create(
+                client_exchange=account,
+                my_own_percentage=my_own,
+                friend_percentage=friend,
+            )
+        return account
+    
+    def _pay(self, account, amount):
+        Transaction.objects.create(client_exchange=account, date=self.now, type='RECORD_PAYMENT', amount=amount)
+    
+    def test_weighted_split(self):
+        """Test split ratios are weighted by |amount| and skipped rows are counted"""
+        shared = self._account('Shared', 10, my_own=4, friend=6)
+        own = self._account('Own', 20, my_own=20, friend=0)
+        zero_pct = self._account('Zero', 0)
+        no_config = self._account('NoConfig', 10)
+        self._pay(shared, 100)
+        self._pay(shared, -50)
+        self._pay(own, 30)
+        self._pay(zero_pct, 7)
+        self._pay(no_config, -2)
+        
+        payments = Transaction.objects.filter(type='RECORD_PAYMENT')
+        with self.assertNumQueries(1):
+            split = profit_split(payments, 85)
+        
+        # Weighted My Own = 150 × 0.4 + 30 × 1 = 90, Friend = 150 × 0.6 = 90, Σ|amount| = 180
+        self.assertEqual(split['my_profit'], Decimal('42.5'))
+        self.assertEqual(split['friend_profit'], Decimal('42.5'))
+        self.assertEqual(split['tx_count'], 5)
+        self.assertEqual(split['skipped_zero_pct'], 1)
+        self.assertEqual(split['skipped_no_config'], 1)
+    
+    def test_no_config_goes_to_my_profit(self):
+        """Test profit without any report config is all My Profit"""
+        self._pay(self._account('NoConfig', 10), 40)
+        
+        split = profit_split(Transaction.objects.all(), 40)
+        self.assertEqual(split['my_profit'], 40)
+        self.assertEqual(split['friend_profit'], 0)
+    
+    def test_account_share_split(self):
+        """Test My Share is split by report config with two queries"""
+        shared = self._account('Shared', 10, my_own=4, friend=6)
+        unconfigured = self._account('NoConfig', 20)
+        ClientExchangeAccount.objects.filter(pk=shared.pk).update(funding=100, exchange_balance=40, loss_share_percentage=10)
+        ClientExchangeAccount.objects.filter(pk=unconfigured.pk).update(funding=100, exchange_balance=50, loss_share_percentage=20)
+        
+        with self.assertNumQueries(2):
+            split = account_share_split(ClientExchangeAccount.objects.filter(client=self.client_obj))
+        
+        # Shared: share 6 → My Own int(6 × 4/10) = 2, Friend int(6 × 6/10) = 3
+        self.assertEqual(split, {
+            'total_pnl': -110,
+            'total_my_share': 16,
+            'my_own_share': 12,
+            'friend_share': 3,
+        })
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class DashboardMetricsCacheTests(TestCase):
+    """
+    Test Suite 16: Dashboard Metrics Cache
+    
+    Dashboard totals are served from the cache and dropped
+    whenever the user's accounts, transactions or settlements change.
+    Only with a cache shared by all workers.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='metricsuser', password='testpass')
+        self.client_obj = Client.objects.create(name='Metrics Client', user=self.user)
+        self.account = ClientExchangeAccount.objects.create(
+            client=self.client_obj,
+            exchange=Exchange.objects.create(name='Metrics Exchange'),
+            funding=100,
+            exchange_balance=40,
+            loss_share_percentage=10,
+        )
+    
+    def test_metrics_are_cached(self):
+        """Test the second read is served from the cache"""
+        metrics = get_dashboard_metrics(self.user)
+        self.assertEqual(metrics['total_client_pnl'], -60)
+        self.assertEqual(metrics['total_my_share'], 6)
+        self.assertEqual(metrics['total_accounts'], 1)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_metrics(self.user), metrics)
+    
+    def test_writes_invalidate_metrics(self):
+        """Test account, transaction and settlement writes drop the cached metrics"""
+        get_dashboard_metrics(self.user)
+        self.account.exchange_balance = 160
+        self.account.save()
+        self.assertEqual(get_dashboard_metrics(self.user)['total_my_share'], 0)
+        
+        Transaction.objects.create(
+            client_exchange=self.account,
+            date=timezone.now(),
+            type='TRADE',
+            amount=20,
+            exchange_balance_before=140,
+            exchange_balance_after=160,
+        )
+        self.assertEqual(get_dashboard_metrics(self.user)['total_turnover'], 20)
+        
+        Settlement.objects.create(client_exchange=self.account, amount=1, date=timezone.now())
+        self.assertIsNone(cache.get(metrics_cache_key(self.user.pk)))
+    
+    def test_warm_command_fills_cache(self):
+        """Test warm_dashboard_metrics stores metrics for users with clients"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        call_command('warm_dashboard_metrics', stdout=StringIO())
+
+        self.assertEqual(cache.get(metrics_cache_key(self.user.pk))['total_funding'], 100)
+
+    def test_per_process_cache_is_bypassed(self):
+        """Test with one LocMem cache per worker a write on one shows on another"""
+        def worker(name):
+            return override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': name,
+            }})
+
+        with override_settings(CACHE_IS_SHARED=False):
+            with worker('worker-b'):
+                self.assertEqual(get_dashboard_metrics(self.user)['total_exchange_balance'], 40)
+            with worker('worker-a'):
+                self.account.exchange_balance = 70
+                self.account.save()
+            with worker('worker-b'):
+                self.assertEqual(get_dashboard_metrics(self.user)['total_exchange_balance'], 70)
+
+    def test_dashboard_queries_do_not_grow_with_clients(self):
+        """Test the exchange-filtered dashboard does no per-client work"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .views import dashboard
+
+        def capture():
+            request = RequestFactory().get('/', {'exchange': self.account.exchange_id})
+            request.user = self.user
+            request.session = {}
+            get_dashboard_metrics(self.user)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(dashboard(request).status_code, 200)
+            return len(queries)
+
+        few_clients = capture()
+        for i in range(10):
+            ClientExchangeAccount.objects.create(
+                client=Client.objects.create(name=f'Metrics Client {i}', user=self.user),
+                exchange=self.account.exchange,
+                funding=100,
+                exchange_balance=40,
+            )
+        self.assertEqual(capture(), few_clients)
+
+
+class RateLimitMiddlewareTests(TestCase):
+    """
+    Test Suite 17: Rate Limiting
+    
+    Requests are counted with atomic cache operations in a
+    sliding window shared by every worker using the same cache.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        from .middleware import RateLimitMiddleware
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = RateLimitMiddleware(lambda request: None)
+    
+    def _status(self, middleware=None, ip='10.0.0.1'):
+        response = (middleware or self.middleware).process_request(self.factory.get('/', REMOTE_ADDR=ip))
+        return response.status_code if response else 200
+    
+    @override_settings(RATE_LIMIT_REQUESTS=3, RATE_LIMIT_WINDOW=60)
+    def test_requests_over_limit_are_rejected(self):
+        """Test the request after the limit gets 429, other IPs are unaffected"""
+        self.assertEqual([self._status() for _ in range(4)], [200, 200, 200, 429])
+        self.assertEqual(self._status(ip='10.0.0.2'), 200)
+    
+    def test_limit_is_shared_through_cache_backend(self):
+        """Test two middleware instances (workers) share one counter"""
+        import tempfile
+        from .middleware import RateLimitMiddleware
+        
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cache_dir,
+            }},
+            RATE_LIMIT_REQUESTS=2,
+            RATE_LIMIT_WINDOW=60,
+        ):
+            other_worker = RateLimitMiddleware(lambda request: None)
+            self.assertEqual(self._status(), 200)
+            self.assertEqual(self._status(other_worker), 200)
+            self.assertEqual(self._status(other_worker), 429)
+    
+    def test_rejected_requests_are_not_counted(self):
+        """Test a client that stops after 429s is allowed again once the window slides"""
+        from .middleware import rate_limit_hit
+        
+        # Three allowed requests, then five rejected ones in the same window
+        hits = [rate_limit_hit('rate_limit:test', 3, 60, now=600 + i) for i in range(8)]
+        self.assertEqual(hits, [True] * 3 + [False] * 5)
+        
+        # Halfway into the next window only the 3 allowed requests weigh in
+        self.assertTrue(rate_limit_hit('rate_limit:test', 3, 60, now=690))
+        self.assertFalse(rate_limit_hit('rate_limit:test', 3, 60, now=691))
+
+
+class TransactionKeysetPaginationTests(TestCase):
+    """
+    Test Suite 18: Transaction Keyset Pagination
+    
+    Pages are keyed on (created_at, id), newest first, and
+    next/previous cursors walk the full list with the filters applied.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='pageuser', password='testpass')
+        self.client_obj = Client.objects.create(name='Page Client', user=self.user)
+        self.account = ClientExchangeAccount.objects.create(
+            client=self.client_obj,
+            exchange=Exchange.objects.create(name='Page Exchange'),
+        )
+        now = timezone.now()
+        for i in range(7):
+            tx = Transaction.objects.create(
+                client_exchange=self.account,
+                date=now,
+                type='TRADE' if i % 2 else 'FUNDING_MANUAL',
+                amount=i,
+            )
+            # Pairs of rows share a created_at so ties are broken by id
+            Transaction.objects.filter(pk=tx.pk).update(created_at=now - timedelta(minutes=i // 2))
+        self.ordered_ids = list(
+            Transaction.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+    
+    def test_cursors_walk_all_pages(self):
+        """Test next cursors reach every row once and previous cursors walk back"""
+        transactions = Transaction.objects.all()
+        pages = [keyset_page(transactions, page_size=3)]
+        while pages[-1].next_cursor:
+            pages.append(keyset_page(transactions, cursor=pages[-1].next_cursor, page_size=3))
+        
+        self.assertEqual([tx.pk for page in pages for tx in page], self.ordered_ids)
+        self.assertIsNone(pages[0].previous_cursor)
+        
+        back = keyset_page(transactions, cursor=pages[-1].previous_cursor, page_size=3)
+        self.assertEqual([tx.pk for tx in back], [tx.pk for tx in pages[-2]])
+        first = keyset_page(transactions, cursor=back.previous_cursor, page_size=3)
+        self.assertEqual([tx.pk for tx in first], [tx.pk for tx in pages[0]])
+        self.assertIsNone(first.previous_cursor)
+    
+    def test_api_pages_with_filters(self):
+        """Test the transactions API pages through filtered rows via the Link header"""
+        import re
+        
+        self.client.force_login(self.user)
+        trade_ids = [pk for pk in self.ordered_ids if Transaction.objects.get(pk=pk).type == 'TRADE']
+        
+        url = '/api/transactions/?type=TRADE&page_size=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.json())
+            match = re.search(r'<([^>]+)>; rel="next"', response.get('Link', ''))
+            url = match.group(1) if match else None
+        
+        self.assertEqual(seen, trade_ids)
+    
+    def test_api_without_paging_params_returns_everything(self):
+        """Test clients that send no cursor or page_size still get every row"""
+        from .pagination import TransactionCursorPagination
+        
+        self.client.force_login(self.user)
+        default_size = TransactionCursorPagination.page_size
+        TransactionCursorPagination.page_size = 3
+        try:
+            response = self.client.get('/api/transactions/')
+            paged = self.client.get('/api/transactions/?cursor=')
+        finally:
+            TransactionCursorPagination.page_size = default_size
+        
+        self.assertEqual([item['id'] for item in response.json()], self.ordered_ids)
+        self.assertFalse(response.has_header('Link'))
+        self.assertEqual(len(paged.json()), 3)
+    
+    def test_invalid_cursor_returns_404(self):
+        """Test a malformed cursor is rejected by the API"""
+        self.client.force_login(self.user)
+        response = self.client.get('/api/transactions/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class StreamingCsvExportTests(TestCase):
+    """
+    Test Suite 19: Streaming CSV Exports
+    
+    Exports are streamed row by row and keep the order of the
+    Pending Payments table.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='csvuser', password='testpass')
+        self.client_obj = Client.objects.create(name='Csv Client', code='CSV1', user=self.user)
+        for i, balance in enumerate([40, 250, 100, 900, 100]):
+            ClientExchangeAccount.objects.create(
+                client=self.client_obj,
+                exchange=Exchange.objects.create(name=f'Csv Exchange {i}'),
+                funding=100 * (i + 1),
+                exchange_balance=balance,
+                loss_share_percentage=10,
+                profit_share_percentage=10,
+                my_percentage=10,
+            )
+    
+    def test_rows_follow_pending_lists_order(self):
+        """Test export rows match build_pending_lists sorted by share, clients-owe first"""
+        clients_owe, you_owe = build_pending_lists(pending_accounts(self.user))
+        expected = []
+        for rows in (clients_owe, you_owe):
+            rows.sort(key=pending_sort_key, reverse=True)
+            expected.extend(row["exchange"].name for row in rows)
+        
+        rows = list(pending_csv_rows(pending_accounts(self.user)))
+        self.assertEqual([row[2] for row in rows], expected)
+        
+        you_owe_rows = list(pending_csv_rows(pending_accounts(self.user), section='you-owe'))
+        self.assertEqual([row[2] for row in you_owe_rows], expected[len(clients_owe):])
+    
+    def test_pending_export_is_streamed(self):
+        """Test the pending export responds with a streamed CSV attachment"""
+        self.client.force_login(self.user)
+        response = self.client.get('/pending/export/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Client')
+        self.assertEqual(len(lines), 1 + ClientExchangeAccount.objects.count())
+
+
+class TransactionSequenceTests(TestCase):
+    """
+    Test Suite 20: Transaction Sequence Numbers
+    
+    sequence_no comes from the account's next_sequence_no counter,
+    and repair_transaction_sequences renumbers broken accounts.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='sequser', password='testpass')
+        self.account = ClientExchangeAccount.objects.create(
+            client=Client.objects.create(name='Seq Client', user=self.user),
+            exchange=Exchange.objects.create(name='Seq Exchange'),
+        )
+    
+    def _create(self, **kwargs):
+        return Transaction.objects.create(
+            client_exchange=self.account, date=timezone.now(), type='FEE', amount=1, **kwargs
+        )
+    
+    def test_sequence_numbers_follow_counter(self):
+        """Test inserts are numbered 1..n and stale account saves keep the counter"""
+        stale = ClientExchangeAccount.objects.get(pk=self.account.pk)
+        numbers = [self._create().sequence_no for _ in range(3)]
+        self.assertEqual(numbers, [1, 2, 3])
+        
+        stale.funding = 50
+        stale.save()
+        self.assertEqual(self._create().sequence_no, 4)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.next_sequence_no, 5)
+        self.assertEqual(self.account.funding, 50)
+    
+    def test_assign_sequence_numbers_for_bulk_create(self):
+        """Test the bulk allocator reserves one block per account"""
+        self._create()
+        transactions = [
+            Transaction(client_exchange=self.account, date=timezone.now(), type='FEE', amount=i)
+            for i in range(3)
+        ]
+        with transaction.atomic():
+            Transaction.objects.bulk_create(Transaction.assign_sequence_numbers(transactions))
+        
+        self.assertEqual([tx.sequence_no for tx in transactions], [2, 3, 4])
+        self.assertEqual(self._create().sequence_no, 5)
+    
+    def test_repair_command_renumbers_duplicates_and_gaps(self):
+        """Test repair_transaction_sequences restores 1..n and the counter"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        
+        first, second, third = self._create(), self._create(), self._create()
+        Transaction.objects.filter(pk=second.pk).update(sequence_no=1)
+        Transaction.objects.filter(pk=third.pk).update(sequence_no=7)
+        
+        with self.assertRaises(CommandError):
+            call_command('repair_transaction_sequences', '--check', stdout=StringIO())
+        
+        call_command('repair_transaction_sequences', stdout=StringIO())
+        
+        numbers = dict(Transaction.objects.values_list('pk', 'sequence_no'))
+        self.assertEqual(numbers, {first.pk: 1, second.pk: 2, third.pk: 3})
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.next_sequence_no, 4)
+        call_command('repair_transaction_sequences', '--check', stdout=StringIO())
+
+
+class QueryPlanTests(TestCase):
+    """
+    Test Suite 21: Query Plans
+    
+    The hot report and ledger queries are served by indexes
+    (check_query_plans), and unindexed filters are reported.
+    """
+    
+    def test_hot_queries_use_indexes(self):
+        """Test check_query_plans passes on the current index set"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        out = StringIO()
+        call_command('check_query_plans', '--accounts', '6', '--days', '10', stdout=out)
+        
+        self.assertIn('All hot queries use an index', out.getvalue())
+        self.assertFalse(Transaction.objects.exists())
+    
+    def test_unindexed_filter_is_reported(self):
+        """Test a filter without an index shows up as a full scan"""
+        from .management.commands.check_query_plans import query_plan
+        
+        scans, _ = query_plan(Transaction.objects.filter(notes='x'))
+        self.assertEqual(scans, [Transaction._meta.db_table])
+        
+        scans, indexes = query_plan(Settlement.objects.filter(client_exchange_id=1, date__gte=timezone.now()))
+        self.assertEqual(scans, [])
+        self.assertTrue(indexes)
+
+
+class SampleDataGeneratorTests(TestCase):
+    """
+    Test Suite 22: Sample Data Generator
+    
+    Bulk generated history keeps balance chains, sequence numbers,
+    settlement ledgers and daily rollups consistent.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self.user = get_user_model().objects.create_user(username='genuser', password='testpass')
+        call_command(
+            'generate_sample_data', '--user-id', str(self.user.pk),
+            '--clients', '4', '--accounts-per-client', '2', '--days', '40',
+            '--trades-per-day', '1.5', '--settlement-rate', '0.3', '--seed', '5',
+            '--batch-size', '50', stdout=StringIO(),
+        )
+    
+    def test_balance_chains_are_unbroken(self):
+        """Test before/after values chain per account and end at the account balances"""
+        accounts = ClientExchangeAccount.objects.filter(client__user=self.user)
+        self.assertEqual(accounts.count(), 8)
+        self.assertTrue(Settlement.objects.exists())
+        
+        for account in accounts:
+            funding, balance = 0, 0
+            for tx in account.transactions.order_by('sequence_no'):
+                self.assertEqual((tx.funding_before, tx.exchange_balance_before), (funding, balance))
+                funding, balance = tx.funding_after, tx.exchange_balance_after
+            self.assertEqual((funding, balance), (account.funding, account.exchange_balance))
+    
+    def test_derived_data_is_consistent(self):
+        """Test sequences, settlement totals and rollups need no repair"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        call_command('repair_transaction_sequences', '--check', stdout=StringIO())
+        call_command('rebuild_settlement_totals', '--check', stdout=StringIO())
+        
+        fields = ('account_id', 'day', 'turnover', 'trade_pnl', 'settlements_in', 'settlements_out', 'tx_count')
+        generated = sorted(DailyAccountRollup.objects.values_list(*fields))
+        call_command('backfill_daily_rollups', stdout=StringIO())
+        self.assertEqual(sorted(DailyAccountRollup.objects.values_list(*fields)), generated)
+    
+    def test_same_seed_is_rejected(self):
+        """Test a second run with the same seed does not collide on client codes"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        
+        with self.assertRaises(CommandError):
+            call_command('generate_sample_data', '--clients', '1', '--seed', '5', stdout=StringIO())
+
+
+class BenchmarkSuiteTests(TestCase):
+    """
+    Test Suite 23: Endpoint Benchmarks
+    
+    run_scale() measures every hot endpoint and compare() flags
+    regressions against a baseline.
+    """
+    
+    def test_small_scale_measures_every_endpoint(self):
+        """Test a small benchmark run covers all endpoints and rolls back its data"""
+        from .benchmarks import run_scale
+        
+        results = run_scale('small', repeat=1)
+        
+        self.assertIn('record_payment', results)
+        self.assertIn('api_reports_summary', results)
+        for name in ('dashboard', 'pending_summary', 'export_pending_csv', 'transaction_list',
+                     'mobile_dashboard_summary', 'api_pending_payments'):
+            self.assertEqual(results[name]['status'], 200, name)
+            self.assertGreater(results[name]['queries'], 0)
+        self.assertFalse(Transaction.objects.exists())
+    
+    def test_compare_flags_regressions(self):
+        """Test query growth always fails and time/memory only beyond the tolerance"""
+        from .benchmarks import compare
+        
+        baseline = {'small': {'dashboard': {'status': 200, 'wall_ms': 100, 'queries': 5, 'peak_kib': 1000}}}
+        within = {'small': {'dashboard': {'status': 200, 'wall_ms': 120, 'queries': 5, 'peak_kib': 1100}}}
+        slower = {'small': {'dashboard': {'status': 200, 'wall_ms': 200, 'queries': 6, 'peak_kib': 1000}}}
+        
+        self.assertEqual(compare(within, baseline, tolerance=0.25), [])
+        regressions = compare(slower, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(any('queries 5 → 6' in message for message in regressions))
+        self.assertEqual(compare(slower, {}, tolerance=0.25), [])
+        
+        crashed = {'small': {'dashboard': {'status': 500, 'wall_ms': 10, 'queries': 2, 'peak_kib': 100}}}
+        self.assertEqual(compare(crashed, crashed, tolerance=0.25), ['small/dashboard: status 500'])
+    
+    def test_failed_request_fails_the_run(self):
+        """Test run_scale raises instead of timing an error page"""
+        from . import benchmarks
+        
+        requests = benchmarks.benchmark_requests
+        benchmarks.benchmark_requests = lambda account: [('missing', 'get', '/no-such-page/', None)]
+        try:
+            with self.assertRaisesMessage(benchmarks.BenchmarkError, 'missing (404)'):
+                benchmarks.run_scale('small', repeat=1)
+        finally:
+            benchmarks.benchmark_requests = requests
+
+
+class ViewQueryBudgetTests(TestCase):
+    """
+    Test Suite 24: Per-View Query Budgets
+    
+    Every named URL in core/urls.py is requested for users with 1, 10 and
+    100 accounts: a GET, or the request in REQUESTS for endpoints that
+    change data or need parameters. Each must succeed, and its query count
+    must not depend on the number of accounts, unless the view has an
+    explicit budget below.
+    """
+    
+    ACCOUNT_COUNTS = (1, 10, 100)
+    
+    # Views whose query count still grows with the number of accounts:
+    # the most queries allowed at any fixture size. Lower as they are fixed.
+    QUERY_BUDGETS = {
+        'client_list': 110,
+        'report_overview': 120,
+    }
+    
+    # Views that fail on every request in the current tree, so a query count
+    # would only measure up to the error. Remove an entry once its view is fixed.
+    BROKEN_VIEWS = {
+        'report_daily': "its template reverses the unregistered 'reports' URL namespace",
+        'report_weekly': "its template reverses the unregistered 'reports' URL namespace",
+        'report_monthly': "its template reverses the unregistered 'reports' URL namespace",
+        'report_custom': "its template reverses the unregistered 'reports' URL namespace",
+        'report_client': 'the URL passes pk but the view takes client_pk',
+        'report_exchange': 'the URL passes pk but the view takes exchange_pk',
+        'report_time_travel': 'its template looks up the missing as_of variable',
+        'transaction_detail': 'it subtracts the unset balances of payment rows and uses undefined client_net_before',
+    }
+    
+    # Endpoints that change data or need parameters are measured with this
+    # request instead of a bare GET: (method, data or a function of the
+    # fixture objects)
+    REQUESTS = {
+        'api-custom-reports': ('get', lambda objects: {
+            'from_date': (timezone.now() - timedelta(days=30)).date().isoformat(),
+            'to_date': timezone.now().date().isoformat(),
+        }),
+        'api-login': ('post', lambda objects: {
+            'username': objects['client'].user.username, 'password': 'testpass',
+        }),
+        'api-funding': ('post', {'amount': 100}),
+        'api-balance': ('post', {'amount': 900}),
+        'api-payment': ('post', {'amount': 5}),
+        'api-batch': ('post', lambda objects: {'operations': [
+            {'op': 'funding', 'account_id': objects['account'].pk, 'amount': 100},
+            {'op': 'payment', 'account_id': objects['account'].pk, 'amount': 5},
+        ]}),
+        'api-link-account': ('post', lambda objects: {
+            'client': objects['client'].pk, 'exchange': objects['spare_exchange'].pk, 'my_percentage': '10',
+        }),
+        'api-create-exchange': ('post', {'name': 'Budget Exchange New'}),
+        'api-edit-transaction': ('post', {'amount': 7}),
+        'api-delete-transaction': ('delete', {}),
+        'api-delete-exchange': ('delete', {}),
+        'api-account-settings': ('post', {'profit_share': 5, 'loss_share': 5}),
+        'api-client-delete-mobile': ('delete', {}),
+        'resend_otp': ('post', {}),
+        'add_funding': ('post', {'amount': '100'}),
+        'update_balance': ('post', {'new_balance': '900'}),
+        'record_payment': ('post', {'amount': '5'}),
+    }
+    
+    # URL name fragment → fixture object used for a <pk> argument
+    PK_OBJECTS = (
+        ('transaction', 'transaction'),
+        ('client_exchange', 'account'),
+        ('account', 'account'),
+        ('client', 'client'),
+        ('exchange', 'exchange'),
+    )
+    
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test fixtures: one user per account count"""
+        exchanges = [Exchange.objects.create(name=f'Budget Exchange {i}') for i in range(3)]
+        cls.users = {}
+        for count in cls.ACCOUNT_COUNTS:
+            user = get_user_model().objects.create_user(username=f'budget{count}', password='testpass')
+            for i in range(count):
+                account = ClientExchangeAccount.objects.create(
+                    client=Client.objects.create(name=f'Budget Client {count}-{i}', user=user),
+                    exchange=exchanges[i % len(exchanges)],
+                    funding=1000,
+                    exchange_balance=1000,
+                    loss_share_percentage=10,
+                    profit_share_percentage=10,
+                    my_percentage=10,
+                    locked_initial_final_share=None,
+                    locked_initial_pnl=None,
+                )
+                Transaction.objects.create(
+                    client_exchange=account, date=timezone.now(), type='TRADE', amount=-200,
+                    exchange_balance_before=1000, exchange_balance_after=800,
+                )
+                account.exchange_balance = 800
+                account.save()
+                account.lock_initial_share_if_needed()
+                Settlement.objects.create(client_exchange=account, amount=5, date=timezone.now())
+                Transaction.objects.create(
+                    client_exchange=account, date=timezone.now(), type='RECORD_PAYMENT', amount=5,
+                )
+            cls.users[count] = user
+        cls.spare_exchange = Exchange.objects.create(name='Budget Exchange Unlinked')
+    
+    @classmethod
+    def url_patterns(cls):
+        """Named URL patterns of core.urls, router routes included, once per name."""
+        from django.urls import URLResolver
+        from . import urls as core_urls
+        
+        seen = set()
+        pending = list(core_urls.urlpatterns)
+        while pending:
+            pattern = pending.pop(0)
+            if isinstance(pattern, URLResolver):
+                # DRF's browsable API login/logout pages are not ours
+                if 'rest_framework' not in str(pattern.urlconf_name):
+                    pending[:0] = pattern.url_patterns
+            elif pattern.name and pattern.name not in seen:
+                seen.add(pattern.name)
+                yield pattern
+    
+    def fixture_objects(self, user):
+        account = ClientExchangeAccount.objects.filter(client__user=user).order_by('pk').first()
+        return {
+            'account': account,
+            'client': account.client,
+            'exchange': account.exchange,
+            'spare_exchange': self.spare_exchange,
+            'transaction': account.transactions.order_by('-created_at', '-id').first(),
+        }
+    
+    def url_for(self, pattern, objects):
+        from django.urls import reverse
+        
+        account = objects['account']
+        kwargs = {}
+        for arg in pattern.pattern.regex.groupindex:
+            if arg == 'account_id':
+                kwargs[arg] = account.pk
+            elif arg == 'pk':
+                name = next(obj for fragment, obj in self.PK_OBJECTS if fragment in pattern.name)
+                kwargs[arg] = objects[name].pk
+        return reverse(pattern.name, kwargs=kwargs)
+    
+    def capture(self, pattern, user):
+        """
+        Status and queries of one request to a view, run in a rolled back
+        transaction (writes, and some views write on GET).
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        objects = self.fixture_objects(user)
+        url = self.url_for(pattern, objects)
+        method, data = self.REQUESTS.get(pattern.name, ('get', None))
+        kwargs = {}
+        if callable(data):
+            data = data(objects)
+        if method != 'get' and pattern.name.startswith('api-'):
+            data, kwargs = json.dumps(data), {'content_type': 'application/json'}
+        
+        self.client.force_login(user)
+        cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(url, data, **kwargs)
+            transaction.set_rollback(True)
+        return response.status_code, [query['sql'] for query in queries]
+    
+    def growth_report(self, small, large):
+        """Fingerprints that run more often on the larger fixture, most repeated first."""
+        from collections import Counter
+        from .instrumentation import fingerprint
+        
+        before = Counter(fingerprint(sql) for sql in small)
+        after = Counter(fingerprint(sql) for sql in large)
+        grown = sorted(
+            ((after[sql] - before[sql], sql) for sql in after if after[sql] > before[sql]),
+            reverse=True,
+        )
+        return '\n'.join(f'  +{extra}x {sql[:300]}' for extra, sql in grown[:10])
+    
+    def test_query_counts_do_not_grow_with_accounts(self):
+        """Test every view succeeds and runs a constant number of queries or stays in its budget"""
+        for pattern in self.url_patterns():
+            with self.subTest(view=pattern.name):
+                if pattern.name in self.BROKEN_VIEWS:
+                    self.skipTest(f'{pattern.name}: {self.BROKEN_VIEWS[pattern.name]}')
+                
+                queries = {}
+                for count, user in self.users.items():
+                    status_code, queries[count] = self.capture(pattern, user)
+                    if pattern.name in self.REQUESTS:
+                        self.assertLess(status_code, 400, f'{pattern.name}: the request failed')
+                    else:
+                        self.assertLess(status_code, 500, f'{pattern.name}: the view failed')
+                        self.assertNotEqual(
+                            status_code, 405, f'{pattern.name}: does not take GET, add it to REQUESTS',
+                        )
+                counts = {count: len(sqls) for count, sqls in queries.items()}
+                smallest, largest = self.ACCOUNT_COUNTS[0], self.ACCOUNT_COUNTS[-1]
+                report = self.growth_report(queries[smallest], queries[largest])
+                
+                budget = self.QUERY_BUDGETS.get(pattern.name)
+                if budget is None:
+                    self.assertEqual(
+                        len(set(counts.values())), 1,
+                        f'{pattern.name}: query count grows with accounts {counts}\n{report}',
+                    )
+                else:
+                    self.assertLessEqual(
+                        max(counts.values()), budget,
+                        f'{pattern.name}: over its budget of {budget} queries {counts}\n{report}',
+                    )
+
+
+class RequestInstrumentationTests(TestCase):
+    """
+    Test Suite 25: Request Instrumentation
+    
+    RequestLoggingMiddleware measures every request, sends a Server-Timing
+    header, logs slow requests and feeds the per-view latency histograms.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        from .instrumentation import reset_process_metrics
+        
+        reset_process_metrics()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='instrumented', password='testpass')
+        self.client.force_login(self.user)
+    
+    def test_server_timing_header_and_histogram(self):
+        """Test a request reports its timings and lands in its view's histogram"""
+        from .instrumentation import latency_histograms
+        
+        response = self.client.get('/pending/')
+        
+        self.assertEqual(response.status_code, 200)
+        header = response['Server-Timing']
+        self.assertRegex(header, r'total;dur=[\d.]+')
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(header, r'cache;desc="\d+ hits, [1-9]\d* misses"')
+        
+        self.client.get('/pending/')
+        histogram = latency_histograms()['pending_summary']
+        self.assertEqual(histogram['count'], 2)
+        self.assertEqual(histogram['buckets'][-1], (float('inf'), 2))
+        self.assertGreater(histogram['queries'], 0)
+    
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_server_timing_header_can_be_disabled(self):
+        """Test SERVER_TIMING_ENABLED=False drops the header"""
+        response = self.client.get('/pending/')
+        
+        self.assertNotIn('Server-Timing', response)
+    
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_top_queries(self):
+        """Test requests over SLOW_REQUEST_MS are logged with their query fingerprints"""
+        with self.assertLogs('core.requests', level='WARNING') as logs:
+            self.client.get('/pending/')
+        
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('SLOW REQUEST: GET /pending/ pending_summary', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+    
+    def test_cache_hits_and_misses_are_counted(self):
+        """Test cache reads are counted while a request is measured, and not after"""
+        from django.core.cache import caches
+        from .instrumentation import RequestMetrics
+        
+        cache.set('instrumented', 1)
+        metrics = RequestMetrics()
+        metrics.start()
+        self.assertEqual(cache.get('instrumented'), 1)
+        self.assertEqual(cache.get('absent', 'default'), 'default')
+        self.assertEqual(cache.get_many(['instrumented', 'absent']), {'instrumented': 1})
+        metrics.stop()
+        cache.get('instrumented')
+        
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (2, 2))
+        self.assertNotIn('get', vars(caches['default']))
+    
+    def test_fingerprint_groups_repeated_queries(self):
+        """Test queries differing only in literals share a fingerprint"""
+        from .instrumentation import fingerprint
+        
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a' AND pk IN (1, 2, 3)"),
+            fingerprint("SELECT * FROM t WHERE id = 22 AND name = 'b''c' AND pk IN (4, 5)"),
+        )
+
+
+class PrometheusMetricsTests(TestCase):
+    """
+    Test Suite 26: Prometheus /metrics Endpoint
+    
+    Request histograms and counters from every worker, plus domain gauges,
+    in the Prometheus text format, for staff only.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        from rest_framework.authtoken.models import Token
+        from .instrumentation import reset_process_metrics
+        
+        reset_process_metrics()
+        cache.clear()
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='scraper', password='testpass', is_staff=True)
+        self.token = Token.objects.create(user=self.staff)
+        self.user = User.objects.create_user(username='broker', password='testpass')
+        self.account = ClientExchangeAccount.objects.create(
+            client=Client.objects.create(name='Metrics Client', user=self.user),
+            exchange=Exchange.objects.create(name='Metrics Exchange'),
+            funding=100,
+            exchange_balance=10,
+            loss_share_percentage=10,
+            locked_initial_final_share=None,
+            locked_initial_pnl=None,
+        )
+        Transaction.objects.create(
+            client_exchange=self.account, date=timezone.now(), type='TRADE', amount=-90,
+            exchange_balance_before=100, exchange_balance_after=10,
+        )
+        # Lock share: Share=9
+        self.account.lock_initial_share_if_needed()
+    
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+    
+    def test_staff_only(self):
+        """Test anonymous and non-staff users cannot read the metrics"""
+        self.assertIn(self.client.get('/metrics').status_code, (401, 403))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+    
+    def test_request_and_domain_metrics(self):
+        """Test request histograms, status counters and domain gauges are exported"""
+        self.client.force_login(self.user)
+        self.client.get('/pending/')
+        self.client.get('/pending/')
+        self.client.logout()
+        
+        body = self.scrape()
+        
+        self.assertIn('broker_portal_http_request_duration_seconds_count{view="pending_summary"} 2', body)
+        self.assertIn('broker_portal_http_request_duration_seconds_bucket{le="+Inf",view="pending_summary"} 2', body)
+        self.assertIn('broker_portal_http_requests_total{status="200",view="pending_summary"} 2', body)
+        self.assertIn('broker_portal_db_queries_per_request_count{view="pending_summary"} 2', body)
+        self.assertIn('broker_portal_rate_limit_rejections_total 0', body)
+        self.assertIn('broker_portal_accounts{user="broker"} 1', body)
+        self.assertIn('broker_portal_pending_amount{direction="clients_owe",user="broker"} 9', body)
+        self.assertIn('broker_portal_table_rows{table="core_transaction"} 1', body)
+    
+    @override_settings(RATE_LIMIT_REQUESTS=1)
+    def test_rate_limit_and_settlement_counters(self):
+        """Test rate limit rejections and committed settlements are counted"""
+        self.client.get('/login/')
+        self.client.get('/login/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Settlement.objects.create(client_exchange=self.account, amount=5, date=timezone.now())
+        
+        with override_settings(RATE_LIMIT_ENABLED=False):
+            body = self.scrape()
+        
+        self.assertIn('broker_portal_rate_limit_rejections_total 1', body)
+        self.assertIn('broker_portal_settlement_operations_total 1', body)
+    
+    def test_worker_files_are_added_up(self):
+        """Test metrics written by other workers to METRICS_DIR are merged in"""
+        import json
+        import os
+        import tempfile
+        from .instrumentation import flush_process_metrics, increment
+        
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            increment('rate_limit_rejections', 3)
+            flush_process_metrics(force=True)
+            # A second worker with the same numbers
+            with open(os.path.join(directory, 'metrics-999999.json'), 'w') as f:
+                with open(os.path.join(directory, f'metrics-{os.getpid()}.json')) as own:
+                    f.write(own.read())
+            with open(os.path.join(directory, 'metrics-999998.json'), 'w') as f:
+                f.write('{"trunc')
+            
+            body = self.scrape()
+            
+            self.assertIn('broker_portal_rate_limit_rejections_total 6', body)
+            with open(os.path.join(directory, f'metrics-{os.getpid()}.json')) as f:
+                snapshot = json.load(f)
+            self.assertEqual(snapshot['counters'], [['rate_limit_rejections', [], 3]])
+
+
+class LoggingPipelineTests(TestCase):
+    """
+    Test Suite 27: Queued JSON Logging
+    
+    Log records go through a bounded queue to a background listener, carry
+    the request context and are written as JSON lines.
+    """
+    
+    class CaptureHandler(logging.Handler):
+        """Keeps formatted records; optionally blocks until released."""
+        
+        def __init__(self, gate=None):
+            super().__init__()
+            self.lines = []
+            self.records = []
+            self.gate = gate
+        
+        def emit(self, record):
+            if self.gate is not None:
+                self.gate.wait(5)
+            self.records.append(record)
+            self.lines.append(self.format(record))
+    
+    def test_records_are_written_as_json_with_request_context(self):
+        """Test queued records reach the handlers as JSON with request id, user and view"""
+        from .log import BoundedQueueHandler, JsonFormatter, clear_request_context, set_request_context
+        
+        target = self.CaptureHandler()
+        target.setFormatter(JsonFormatter())
+        handler = BoundedQueueHandler([target], queue_size=100)
+        log = logging.getLogger('core.tests.pipeline')
+        log.addHandler(handler)
+        try:
+            set_request_context(request_id='abc123', user_id=7, view='pending_summary')
+            log.warning('Payment of %s rejected', 50)
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                log.exception('Failed')
+        finally:
+            clear_request_context()
+            log.removeHandler(handler)
+            handler.close()
+        
+        first, second = [json.loads(line) for line in target.lines]
+        self.assertEqual(first['message'], 'Payment of 50 rejected')
+        self.assertEqual(first['level'], 'WARNING')
+        self.assertEqual(first['logger'], 'core.tests.pipeline')
+        self.assertEqual((first['request_id'], first['user_id'], first['view']), ('abc123', 7, 'pending_summary'))
+        self.assertIn('ValueError: boom', second['exc_info'])
+    
+    def test_full_queue_drops_records_without_blocking(self):
+        """Test a full queue drops new records, counts them and reports the drop"""
+        import threading
+        import time
+        from .instrumentation import counters, reset_process_metrics
+        from .log import BoundedQueueHandler
+        
+        reset_process_metrics()
+        release = threading.Event()
+        target = self.CaptureHandler(release)
+        handler = BoundedQueueHandler([target], queue_size=2)
+        record = logging.LogRecord('core.tests', logging.WARNING, __file__, 0, 'line %s', (1,), None)
+        
+        handler.handle(record)
+        # Wait for the listener to take the first record and block on it
+        deadline = time.monotonic() + 5
+        while handler.queue.qsize() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        started = time.monotonic()
+        for _ in range(5):
+            handler.handle(record)
+        self.assertLess(time.monotonic() - started, 1)
+        
+        release.set()
+        handler.close()
+        # The record being written when the queue filled, then the drop report
+        self.assertEqual(target.lines, ['line 1', 'Log queue full: dropped 3 record(s)', 'line 1', 'line 1'])
+        self.assertEqual(counters()['log_records_dropped', ()], 3)
+    
+    def test_request_id_header_and_log_context(self):
+        """Test requests get an X-Request-ID and their log records carry it"""
+        from .log import RequestContextFilter
+        
+        user = get_user_model().objects.create_user(username='logged', password='testpass')
+        self.client.force_login(user)
+        capture = self.CaptureHandler()
+        capture.addFilter(RequestContextFilter())
+        request_log = logging.getLogger('core.requests')
+        request_log.addHandler(capture)
+        try:
+            response = self.client.get('/pending/')
+            echoed = self.client.get('/pending/', HTTP_X_REQUEST_ID='lb-1234.5')
+            replaced = self.client.get('/pending/', HTTP_X_REQUEST_ID='bad id\n')
+        finally:
+            request_log.removeHandler(capture)
+        
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+        self.assertEqual(echoed['X-Request-ID'], 'lb-1234.5')
+        self.assertRegex(replaced['X-Request-ID'], r'^[0-9a-f]{32}$')
+        self.assertEqual(capture.records[0].request_id, response['X-Request-ID'])
+        self.assertEqual(capture.records[0].user_id, user.pk)
+        self.assertEqual(capture.records[0].view, 'pending_summary')
+
+
+@override_settings(SYNC_CURSOR_LAG=0)
+class DeltaSyncTests(TestCase):
+    """
+    Test Suite 28: Mobile Delta Sync
+    
+    /api/sync/ returns the rows changed or deleted since the device's
+    cursor, in pages, with a full snapshot for new or stale devices.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='syncer', password='testpass')
+        other = get_user_model().objects.create_user(username='other', password='testpass')
+        exchange = Exchange.objects.create(name='Sync Exchange')
+        self.client_obj = Client.objects.create(name='Sync Client', user=self.user)
+        self.account = ClientExchangeAccount.objects.create(
+            client=self.client_obj, exchange=exchange, funding=100, exchange_balance=10,
+        )
+        self.transactions = [
+            Transaction.objects.create(client_exchange=self.account, date=timezone.now(), type='TRADE', amount=-i)
+            for i in range(1, 4)
+        ]
+        ClientExchangeAccount.objects.create(
+            client=Client.objects.create(name='Other Client', user=other), exchange=exchange,
+        )
+        self.client.force_login(self.user)
+    
+    def sync(self, cursor=None):
+        response = self.client.get('/api/sync/', {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    @staticmethod
+    def ids(rows):
+        return sorted(row['id'] for row in rows)
+    
+    def test_full_sync_then_only_changes(self):
+        """Test the first sync is a snapshot and later ones only carry changed rows"""
+        first = self.sync()
+        
+        self.assertTrue(first['full'])
+        self.assertFalse(first['has_more'])
+        self.assertEqual(self.ids(first['clients']), [self.client_obj.pk])
+        self.assertEqual(self.ids(first['accounts']), [self.account.pk])
+        self.assertEqual(self.ids(first['transactions']), self.ids([{'id': tx.pk} for tx in self.transactions]))
+        
+        self.assertEqual(self.sync(first['cursor'])['transactions'], [])
+        
+        tx = self.transactions[0]
+        tx.notes = 'edited'
+        tx.save()
+        Settlement.objects.create(client_exchange=self.account, amount=5, date=timezone.now())
+        delta = self.sync(first['cursor'])
+        
+        self.assertFalse(delta['full'])
+        self.assertEqual([row['notes'] for row in delta['transactions']], ['edited'])
+        self.assertEqual(len(delta['settlements']), 1)
+        # The settlement moved the account's ledger, so the account is re-sent
+        self.assertEqual(self.ids(delta['accounts']), [self.account.pk])
+        self.assertEqual(delta['clients'], [])
+    
+    def test_deletions_are_reported_once_per_root(self):
+        """Test deleted rows come back as tombstones, cascaded children covered by their parent"""
+        cursor = self.sync()['cursor']
+        deleted_tx = self.transactions[0].pk
+        self.transactions[0].delete()
+        delta = self.sync(cursor)
+        self.assertEqual(delta['deleted']['transactions'], [deleted_tx])
+        
+        cursor = delta['cursor']
+        deleted_client = self.client_obj.pk
+        self.client_obj.delete()
+        delta = self.sync(cursor)
+        
+        self.assertEqual(delta['deleted'], {
+            'clients': [deleted_client],
+            'accounts': [],
+            'transactions': [],
+            'settlements': [],
+        })
+    
+    def test_pages_cover_every_row(self):
+        """Test a small page size splits the sync and the pages add up to everything"""
+        from .sync import sync_changes
+        
+        seen, cursor, calls = [], None, 0
+        while True:
+            page = sync_changes(self.user, cursor, page_size=2)
+            seen += [row['id'] for row in page['transactions']]
+            cursor, calls = page['cursor'], calls + 1
+            if not page['has_more']:
+                break
+        
+        self.assertEqual(calls, 2)
+        self.assertEqual(sorted(set(seen)), sorted(tx.pk for tx in self.transactions))
+    
+    def test_invalid_and_expired_cursors(self):
+        """Test a garbled cursor is rejected and one past the retention gets a snapshot"""
+        from datetime import timedelta
+        from .sync import encode_sync_cursor
+        
+        self.assertEqual(self.client.get('/api/sync/', {'cursor': 'garbage'}).status_code, 400)
+        
+        long_ago = (timezone.now() - timedelta(days=365), 0)
+        stale = encode_sync_cursor(dict.fromkeys(
+            ('clients', 'accounts', 'transactions', 'settlements', 'deleted'), long_ago
+        ))
+        self.assertTrue(self.sync(stale)['full'])
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class ConditionalGetTests(TestCase):
+    """
+    Test Suite 29: Conditional GET
+    
+    The mobile read APIs send an ETag derived from the user's data version
+    and answer a matching If-None-Match with 304 until that data changes.
+    Only with a cache shared by all workers; otherwise every poll gets a 200.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='poller', password='testpass')
+        self.other = get_user_model().objects.create_user(username='other', password='testpass')
+        self.exchange = Exchange.objects.create(name='ETag Exchange')
+        self.account = ClientExchangeAccount.objects.create(
+            client=Client.objects.create(name='ETag Client', user=self.user),
+            exchange=self.exchange, funding=100, exchange_balance=10,
+        )
+        self.other_account = ClientExchangeAccount.objects.create(
+            client=Client.objects.create(name='Other Client', user=self.other),
+            exchange=self.exchange, funding=100, exchange_balance=10,
+        )
+        self.client.force_login(self.user)
+    
+    def etag(self, url='/api/mobile-dashboard/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+    
+    def test_matching_etag_gets_304(self):
+        """Test a repeated poll with the ETag gets an empty 304 without running the view"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        etag = self.etag()
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/mobile-dashboard/', HTTP_IF_NONE_MATCH=etag)
+        
+        # Only the session and user lookups, none of the portal's tables
+        self.assertFalse([q for q in queries if 'core_' in q['sql']])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(
+            self.client.get('/api/mobile-dashboard/', HTTP_IF_NONE_MATCH='"stale"').status_code, 200
+        )
+    
+    def test_own_write_changes_etag(self):
+        """Test a transaction of the user changes the ETag and another user's does not"""
+        etag = self.etag('/api/pending-payments/')
+        
+        Transaction.objects.create(
+            client_exchange=self.other_account, date=timezone.now(), type='TRADE', amount=-5,
+        )
+        self.assertEqual(self.etag('/api/pending-payments/'), etag)
+        
+        Transaction.objects.create(
+            client_exchange=self.account, date=timezone.now(), type='TRADE', amount=-5,
+        )
+        response = self.client.get('/api/pending-payments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_exchange_write_changes_every_etag(self):
+        """Test an exchange change invalidates the ETags of all users"""
+        etag = self.etag('/api/exchanges/')
+        
+        self.exchange.name = 'Renamed Exchange'
+        self.exchange.save()
+        
+        self.assertNotEqual(self.etag('/api/exchanges/'), etag)
+    
+    def test_viewset_list_and_retrieve(self):
+        """Test the REST list and detail endpoints answer 304 too"""
+        for url in ('/api/clients/', f'/api/accounts/{self.account.pk}/'):
+            etag = self.etag(url)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        # ETags are per URL
+        self.assertNotEqual(self.etag('/api/clients/'), self.etag('/api/transactions/'))
+    
+    @override_settings(GZIP_API_RESPONSES=True, GZIP_MIN_SIZE=100)
+    def test_gzipped_response_etag_gets_304(self):
+        """Test the weakened ETag of a gzipped response still matches on the next poll"""
+        for i in range(10):
+            Client.objects.create(name=f'Gzip Client {i}', code=f'GZ{i}', user=self.user)
+        
+        response = self.client.get('/api/clients/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        
+        response = self.client.get(
+            '/api/clients/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+    
+    def test_per_process_cache_sends_no_etag(self):
+        """Test with one LocMem cache per worker a write on one is never answered 304 by another"""
+        def worker(name):
+            return override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': name,
+            }})
+        
+        with worker('worker-b'):
+            etag = self.etag('/api/pending-payments/')
+        
+        with override_settings(CACHE_IS_SHARED=False):
+            with worker('worker-a'):
+                Transaction.objects.create(
+                    client_exchange=self.account, date=timezone.now(), type='TRADE', amount=-5,
+                )
+            with worker('worker-b'):
+                response = self.client.get('/api/pending-payments/', HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class SparseFieldsetTests(TestCase):
+    """
+    Test Suite 30: Sparse Fieldsets
+    
+    ?fields= limits the viewset responses to the named fields; the computed
+    account fields are only filled when asked for, for a page at a time.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='sparse', password='testpass')
+        client = Client.objects.create(name='Sparse Client', user=self.user)
+        self.accounts = [
+            ClientExchangeAccount.objects.create(
+                client=client, exchange=Exchange.objects.create(name=f'Sparse Exchange {balance}'),
+                funding=100, exchange_balance=balance,
+                loss_share_percentage=10, locked_initial_final_share=None, locked_initial_pnl=None,
+            )
+            for balance in (10, 40)
+        ]
+        self.client.force_login(self.user)
+    
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['results'] if isinstance(data, dict) and 'results' in data else data
+    
+    def test_default_response_is_unchanged(self):
+        """Test a request without ?fields= still gets every field, computed ones included"""
+        rows = {row['id']: row for row in self.get('/api/accounts/')}
+        
+        self.assertEqual(rows[self.accounts[0].pk]['remaining_amount'], 9)
+        self.assertEqual(rows[self.accounts[1].pk]['my_share'], 6)
+        self.assertEqual(rows[self.accounts[1].pk]['pnl'], -60)
+    
+    def test_fields_and_expand(self):
+        """Test ?fields= selects columns and computed fields need naming or ?expand="""
+        rows = self.get('/api/accounts/', fields='id,funding')
+        self.assertEqual([set(row) for row in rows], [{'id', 'funding'}] * 2)
+        
+        rows = self.get('/api/accounts/', fields='id', expand='remaining_amount')
+        self.assertEqual(
+            sorted((row['id'], row['remaining_amount']) for row in rows),
+            [(self.accounts[0].pk, 9), (self.accounts[1].pk, 6)],
+        )
+        
+        row = self.get(f'/api/accounts/{self.accounts[0].pk}/', fields='pnl')
+        self.assertEqual(row, {'pnl': -90})
+        self.assertEqual(set(self.get('/api/clients/', fields='name')[0]), {'name'})
+    
+    def test_unknown_field_is_rejected(self):
+        """Test a misspelt field name is a 400, not a silently empty response"""
+        response = self.client.get('/api/accounts/', {'fields': 'id,remaining'})
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('remaining', response.json()['fields'])
+    
+    def test_list_computes_once_per_page(self):
+        """Test the list serializer fills the computed fields for every row up front"""
+        from .serializers import ClientExchangeAccountSerializer
+        
+        serializer = ClientExchangeAccountSerializer(ClientExchangeAccount.objects.all(), many=True)
+        data = serializer.data
+        
+        self.assertEqual(set(serializer.child.computed), {account.pk for account in self.accounts})
+        self.assertEqual(sorted(row['remaining_amount'] for row in data), [6, 9])
+
+
+class FastJSONTests(TestCase):
+    """
+    Test Suite 31: Fast JSON Rendering
+    
+    FastJSONRenderer/FastJSONParser must be drop-in replacements for DRF's
+    JSON classes; ApiGZipMiddleware compresses large JSON responses on request.
+    """
+    
+    def test_renderer_matches_drf(self):
+        """Test Decimal, date, datetime and odd keys render byte for byte like JSONRenderer"""
+        from datetime import date, datetime, timezone as dt_timezone
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        
+        data = {
+            'share': Decimal('12.50'),
+            'day': date(2026, 1, 2),
+            'at': datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'naive': datetime(2026, 1, 2, 3, 4, 5),
+            7: ['café  ', None, True, -12345678901],
+        }
+        
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        self.assertEqual(
+            FastJSONRenderer().render({'a': 1}, 'application/json; indent=2'),
+            JSONRenderer().render({'a': 1}, 'application/json; indent=2'),
+        )
+    
+    def test_parser(self):
+        """Test JSON bodies parse, and malformed ones are a ParseError"""
+        from io import BytesIO
+        from rest_framework.exceptions import ParseError
+        from .renderers import FastJSONParser
+        
+        self.assertEqual(FastJSONParser().parse(BytesIO(b'{"amount": "1,000"}')), {'amount': '1,000'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"amount": '))
+    
+    def test_api_response_uses_fast_renderer(self):
+        """Test the API answers JSON through the configured renderer"""
+        user = get_user_model().objects.create_user(username='renderer', password='testpass')
+        self.client.force_login(user)
+        
+        response = self.client.get('/api/pending-payments/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(type(response.accepted_renderer).__name__, 'FastJSONRenderer')
+        self.assertEqual(response.json()['currency'], 'INR')
+    
+    def test_gzip_is_opt_in_and_json_only(self):
+        """Test only JSON responses above the threshold are gzipped, and only when enabled"""
+        import gzip
+        
+        user = get_user_model().objects.create_user(username='gzipper', password='testpass')
+        for i in range(10):
+            Client.objects.create(name=f'Gzip Client {i}', code=f'GZ{i}', user=user)
+        self.client.force_login(user)
+        
+        def get(url):
+            return self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertFalse(get('/api/clients/').has_header('Content-Encoding'))
+        with override_settings(GZIP_API_RESPONSES=True, GZIP_MIN_SIZE=100):
+            response = get('/api/clients/')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(len(json.loads(gzip.decompress(response.content))), 10)
+            # HTML pages carry the CSRF token and stay uncompressed
+            self.assertFalse(get('/pending/').has_header('Content-Encoding'))
+        with override_settings(GZIP_API_RESPONSES=True, GZIP_MIN_SIZE=10 ** 6):
+            self.assertFalse(get('/api/clients/').has_header('Content-Encoding'))
+    
+    def test_serialization_benchmark(self):
+        """Test the renderer benchmark covers both payloads with identical output"""
+        from .benchmarks import serialization_benchmark
+        
+        results = serialization_benchmark(rows=50, repeat=1)
+        
+        self.assertEqual(set(results), {'pending_payments', 'transactions'})
+        for result in results.values():
+            self.assertTrue(result['identical'])
+            self.assertLess(result['gzip_bytes'], result['bytes'])
+
+
+class BatchOperationTests(TestCase):
+    """
+    Test Suite 32: Batch Mutations
+    
+    /api/batch/ runs funding, balance and payment operations in order in
+    one transaction, all or nothing or with a savepoint per operation.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.user = get_user_model().objects.create_user(username='batcher', password='testpass')
+        client = Client.objects.create(name='Batch Client', user=self.user)
+        self.first, self.second = [
+            ClientExchangeAccount.objects.create(
+                client=client, exchange=Exchange.objects.create(name=f'Batch Exchange {i}'),
+                funding=100, exchange_balance=10, loss_share_percentage=10,
+                locked_initial_final_share=None, locked_initial_pnl=None,
+            )
+            for i in range(2)
+        ]
+        self.client.force_login(self.user)
+    
+    def batch(self, operations, mode=None):
+        data = {'operations': operations}
+        if mode:
+            data['mode'] = mode
+        return self.client.post('/api/batch/', data, content_type='application/json')
+    
+    def test_operations_run_in_order(self):
+        """Test every operation runs, in order, and reports what its endpoint would"""
+        response = self.batch([
+            {'op': 'funding', 'account_id': self.first.pk, 'amount': '1,000'},
+            {'op': 'balance', 'account_id': self.first.pk, 'amount': 900},
+            {'op': 'payment', 'account_id': self.second.pk, 'amount': 5},
+        ])
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [200, 200, 200])
+        self.assertEqual(data['results'][0]['body']['new_balance'], 1010)
+        self.assertEqual(data['results'][2]['body']['remaining_amount'], 4)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.funding, self.first.exchange_balance), (1100, 900))
+        self.assertEqual(
+            list(Transaction.objects.filter(client_exchange=self.first).order_by('sequence_no').values_list('type', flat=True)),
+            ['FUNDING', 'UPDATE_BALANCE'],
+        )
+        self.assertEqual(Settlement.objects.filter(client_exchange=self.second).count(), 1)
+    
+    def test_atomic_batch_rolls_back_on_failure(self):
+        """Test a failing operation undoes the whole batch and skips the rest"""
+        response = self.batch([
+            {'op': 'funding', 'account_id': self.first.pk, 'amount': 50},
+            {'op': 'payment', 'account_id': self.second.pk, 'amount': 500},
+            {'op': 'balance', 'account_id': self.second.pk, 'amount': 0},
+        ])
+        
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertFalse(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [200, 400, 424])
+        self.assertIn('cannot exceed remaining', data['results'][1]['body']['error'])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.funding, 100)
+        self.assertFalse(Transaction.objects.exists())
+    
+    def test_savepoint_batch_keeps_successful_operations(self):
+        """Test savepoint mode only rolls back the failed operation"""
+        response = self.batch([
+            {'op': 'funding', 'account_id': self.first.pk, 'amount': 50},
+            {'op': 'payment', 'account_id': self.second.pk, 'amount': 500},
+            {'op': 'balance', 'account_id': self.second.pk, 'amount': 0},
+        ], mode='savepoint')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], [200, 400, 200])
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.funding, self.second.exchange_balance), (150, 0))
+        self.assertFalse(Settlement.objects.exists())
+    
+    def test_invalid_batches_run_nothing(self):
+        """Test malformed batches and other users' accounts are rejected before anything runs"""
+        other = get_user_model().objects.create_user(username='not-mine', password='testpass')
+        foreign = ClientExchangeAccount.objects.create(
+            client=Client.objects.create(name='Foreign', user=other),
+            exchange=Exchange.objects.create(name='Foreign Exchange'),
+        )
+        
+        response = self.batch([
+            {'op': 'funding', 'account_id': self.first.pk, 'amount': 50},
+            {'op': 'funding', 'account_id': foreign.pk, 'amount': 50},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['account_ids'], [foreign.pk])
+        
+        self.assertEqual(self.batch([{'op': 'delete', 'account_id': self.first.pk}]).status_code, 400)
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.batch([{'op': 'funding', 'account_id': self.first.pk}], mode='eventual').status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
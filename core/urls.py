@@ -17,10 +17,12 @@ urlpatterns = [
     path('api/login/', api_views.api_login, name='api-login'),
     path('api/mobile-dashboard/', api_views.mobile_dashboard_summary, name='api-mobile-dashboard'),
     path('api/pending-payments/', api_views.api_pending_payments, name='api-pending-payments'),
+    path('api/sync/', api_views.api_sync, name='api-sync'),
     path('api/pending/export/', api_views.api_export_pending_csv, name='api-pending-export'),
     path('api/accounts/<int:account_id>/funding/', api_views.api_add_funding, name='api-funding'),
     path('api/accounts/<int:account_id>/balance/', api_views.api_update_balance, name='api-balance'),
     path('api/accounts/<int:account_id>/payment/', api_views.api_record_payment, name='api-payment'),
+    path('api/batch/', api_views.api_batch, name='api-batch'),
     path('api/accounts/link/', api_views.api_link_exchange, name='api-link-account'),
     path('api/reports-summary/', api_views.api_reports_summary, name='api-reports-summary'),
     path('api/exchanges/create/', api_views.api_create_exchange, name='api-create-exchange'),
@@ -30,6 +32,7 @@ urlpatterns = [
     path('api/accounts/<int:account_id>/settings/', api_views.api_update_account_settings, name='api-account-settings'),
     path('api/accounts/<int:account_id>/report-config/', api_views.api_account_report_config, name='api-account-report-config'),
     path('api/clients/<int:pk>/delete/', api_views.api_delete_client, name='api-client-delete-mobile'),
+    path('metrics', api_views.prometheus_metrics, name='metrics'),  # Prometheus scrape (staff token)
     path('', include(router.urls)),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     path('api/token-auth/', include('rest_framework.urls')), # Simplified for token login later
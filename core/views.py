@@ -9,7 +9,6 @@ from django.contrib.auth.decorators import login_required
 User = get_user_model()
 from django.db.models import Q, Sum, Count, F
 from django.db.models.functions import Abs
-from django.core.exceptions import FieldError
 from django.db import transaction as db_transaction
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
@@ -36,6 +35,12 @@ from .models import (
     EmailOTP,
     )
 from .forms import SignupForm, OTPVerificationForm
+from .exports import stream_csv_response
+from .filters import filter_transactions
+from .metrics import get_dashboard_metrics
+from .pagination import InvalidCursor, keyset_page, page_query_string
+from .pending import PENDING_CSV_HEADER, build_pending_lists, pending_accounts, pending_csv_rows, pending_sort_key
+from .reports import profit_split, rollup_totals, rollup_totals_by, rollups_for, sum_days
 
 # TODO: core.utils.money module removed - add back if needed
 # Placeholder functions
@@ -53,6 +58,9 @@ def round_capital(value):
 
 AUTO_CLOSE_THRESHOLD = Decimal("0.01")
 
+# Rows per page of the transaction list
+TRANSACTION_PAGE_SIZE = 200
+
 
 def calculate_share_split(total_share, my_share_pct, friend_share_pct):
     """Placeholder - replace with actual implementation"""
@@ -86,9 +94,8 @@ def get_settlement_info_for_display(client_exchange):
     Get settlement information for display purposes.
     
     This helper function encapsulates the common pattern of:
-    1. Locking share if needed
-    2. Getting remaining settlement amount
-    3. Extracting relevant values
+    1. Getting remaining settlement amount (read-only, locks are not persisted)
+    2. Extracting relevant values
     
     Args:
         client_exchange: ClientExchangeAccount instance
@@ -97,7 +104,6 @@ def get_settlement_info_for_display(client_exchange):
         dict: Contains 'initial_final_share', 'remaining_amount', 'overpaid_amount', 
               'final_share', 'show_na', 'share_pct'
     """
-    client_exchange.lock_initial_share_if_needed()
     settlement_info = client_exchange.get_remaining_settlement_amount()
     initial_final_share = settlement_info['initial_final_share']
     remaining_amount = settlement_info['remaining']
@@ -698,16 +704,15 @@ def dashboard(request):
 
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = transactions_qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    # Read from pre-aggregated daily rollups instead of every TRADE row
+    # Unfiltered totals come from the per-user metrics cache
+    metrics = get_dashboard_metrics(request.user)
+    if client_id or exchange_id or search_query:
+        total_turnover = rollup_totals(
+            rollups_for(request.user, client_id=client_id, exchange_id=exchange_id, search_query=search_query)
+        )["turnover"]
+    else:
+        total_turnover = metrics["total_turnover"]
     your_profit = 0  # Computed from accounts, not transactions
     # Company profit removed - no longer applicable
     company_profit = Decimal(0)
@@ -769,76 +774,19 @@ def dashboard(request):
                         has_transactions = True
                         current_balance += get_exchange_balance(ce)
     
-    if client_type_filter:
-        # Filtered by client type
-
-        filtered_clients = clients_qs
-
-        for client in filtered_clients:
-            if exchange_id:
-
-                # Specific exchange selected
-                client_exchange = client.exchange_accounts.filter(exchange_id=exchange_id).first()
-
-
-                if client_exchange:
-                    if Transaction.objects.filter(client_exchange=client_exchange).exists():
-                        has_transactions = True
-
-
-                        current_balance += get_exchange_balance(client_exchange)
-        
-        # TODO: Fix else block logic - structure needs to be corrected
-        # else:
-
-
-
-                # All exchanges
-            # TODO: Fix indentation - client_exchanges = client.exchange_accounts.all()
-
-
-        # TODO: Fix indentation - for ce in client_exchanges:
-
-
-            # TODO: Fix indentation - if Transaction.objects.filter(client_exchange=ce).exists():
-
-
-                # TODO: Fix indentation - has_transactions = True
-
-
-
-                # TODO: Fix indentation - current_balance += get_exchange_balance(ce)
-
-
-
-
     # Get all accounts for the current user
     all_accounts = ClientExchangeAccount.objects.filter(client__user=request.user).select_related("client", "exchange")
     
-    # Calculate totals from accounts
-    total_funding = sum(account.funding for account in all_accounts)
-    total_exchange_balance = sum(account.exchange_balance for account in all_accounts)
-    total_client_pnl = sum(account.compute_client_pnl() for account in all_accounts)
-    
-    # FINANCIAL INTERPRETATION: Apply sign to Total My Share
-    # - If client_pnl < 0 (LOSS): Client owes you → share is POSITIVE
-    # - If client_pnl > 0 (PROFIT): You owe client → share is NEGATIVE
-    total_my_share = Decimal(0)
-    for account in all_accounts:
-        client_pnl = account.compute_client_pnl()
-        share_amount = account.compute_my_share()
-        if client_pnl < 0:
-            # LOSS CASE: Client owes you → share is POSITIVE
-            total_my_share += share_amount
-        elif client_pnl > 0:
-            # PROFIT CASE: You owe client → share is NEGATIVE
-            total_my_share -= share_amount
-        # If client_pnl == 0, share is 0, so no change
+    # Totals from accounts (signed Total My Share: client owes you → positive)
+    total_funding = metrics["total_funding"]
+    total_exchange_balance = metrics["total_exchange_balance"]
+    total_client_pnl = metrics["total_client_pnl"]
+    total_my_share = metrics["total_my_share"]
     
     # Count totals
-    total_clients = Client.objects.filter(user=request.user).count()
+    total_clients = metrics["total_clients"]
     total_exchanges = Exchange.objects.count()
-    total_accounts = all_accounts.count()
+    total_accounts = metrics["total_accounts"]
     
     # Get recent accounts (last 10 updated)
     recent_accounts = all_accounts.order_by("-updated_at")[:10]
@@ -1471,7 +1419,6 @@ def transaction_list(request):
                 pk=client_exchange_id,
                 client__user=request.user
             )
-            transactions = transactions.filter(client_exchange_id=client_exchange_id)
             # Pre-select client and exchange in dropdowns
             client_id = str(selected_client_exchange_obj.client_id)
             exchange_id = str(selected_client_exchange_obj.exchange_id)
@@ -1480,50 +1427,22 @@ def transaction_list(request):
             client_exchange_id = None
             selected_client_exchange_obj = None
     
-    if client_id and not client_exchange_id:
-        transactions = transactions.filter(client_exchange__client_id=client_id)
-
-    if exchange_id and not client_exchange_id:
-        transactions = transactions.filter(client_exchange__exchange_id=exchange_id)
-
-    if start_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            transactions = transactions.filter(date__gte=start_date)
-        except ValueError:
-            pass
-
-    if end_date_str:
-        try:
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-            transactions = transactions.filter(date__lte=end_date)
-        except ValueError:
-            pass
-
-    if tx_type:
-        # Filter transactions by type
-        # Map FUNDING_MANUAL to also include legacy FUNDING transactions
-        if tx_type == 'FUNDING_MANUAL':
-            transactions = transactions.filter(type__in=['FUNDING_MANUAL', 'FUNDING'])
-        else:
-            transactions = transactions.filter(type=tx_type)
-
-
-    if search_query:
-        transactions = transactions.filter(
-            Q(client_exchange__client__name__icontains=search_query) |
-            Q(client_exchange__client__code__icontains=search_query) |
-            Q(client_exchange__exchange__name__icontains=search_query) |
-            Q(client_exchange__exchange__code__icontains=search_query) |
-            Q(notes__icontains=search_query)
-        )
+    transactions = filter_transactions(
+        transactions,
+        client_id=client_id,
+        exchange_id=exchange_id,
+        client_exchange_id=client_exchange_id,
+        tx_type=tx_type,
+        start_date=start_date_str,
+        end_date=end_date_str,
+        search_query=search_query,
+    )
     
-    # Order by created_at DESC, id DESC (Strict chronological order)
+    # Newest first (created_at DESC, id DESC), one keyset page at a time
     try:
-        transactions = transactions.order_by("-created_at", "-id")[:200]
-    except (FieldError, AttributeError):
-        # Fallback if field not found
-        transactions = transactions.order_by("-id")[:200]
+        page = keyset_page(transactions, cursor=request.GET.get("cursor"), page_size=TRANSACTION_PAGE_SIZE)
+    except InvalidCursor:
+        page = keyset_page(transactions, page_size=TRANSACTION_PAGE_SIZE)
     
     # Filter clients based on client_type for the dropdown
     # All clients are now my clients - no filter needed
@@ -1537,7 +1456,9 @@ def transaction_list(request):
             client_id = None
     
     return render(request, "core/transactions/list.html", {
-        "transactions": transactions,
+        "transactions": page,
+        "next_page_query": page_query_string(request.GET, page.next_cursor) if page.next_cursor else None,
+        "previous_page_query": page_query_string(request.GET, page.previous_cursor) if page.previous_cursor else None,
         "all_clients": all_clients_qs.order_by("name"),
         "all_exchanges": Exchange.objects.all().order_by("name"),
         "selected_client": int(client_id) if client_id else None,
@@ -1634,24 +1555,6 @@ def pending_summary(request):
         end_date = today
         date_range_label = f"Today ({today.strftime('%B %d, %Y')})"
     
-    # Get all active client exchanges
-    client_exchanges = ClientExchangeAccount.objects.filter(
-        client__user=request.user,
-    ).select_related("client", "exchange").all()
-    
-    # Filter by search query if provided
-    if search_query:
-        client_exchanges = client_exchanges.filter(
-            Q(client__name__icontains=search_query) |
-            Q(client__code__icontains=search_query) |
-            Q(exchange__name__icontains=search_query) |
-            Q(exchange__code__icontains=search_query)
-        )
-    
-    # Filter by client type if specified
-    # All clients are now my clients - no filter needed
-    # client_exchanges already contains all clients
-    
     # TODO: SystemSettings model removed - add back if needed
     # settings = SystemSettings.load()
     settings = None  # Placeholder
@@ -1665,159 +1568,14 @@ def pending_summary(request):
 
         combine_shares = combine_shares_param.lower() == "true"
     
+    # Build both sections in a constant number of queries (see core/pending.py)
+    # Clients Need To Pay Me / I Need To Pay Clients
+    client_exchanges = pending_accounts(request.user, search_query)
+    clients_owe_list, you_owe_list = build_pending_lists(client_exchanges)
     
-    # Separate lists
-    clients_owe_list = []  # Clients Need To Pay Me
-    you_owe_list = []  # I Need To Pay Clients
-    
-    for client_exchange in client_exchanges:
-        # Compute Client_PnL using PIN-TO-PIN formula
-        client_pnl = client_exchange.compute_client_pnl()
-        
-        # Determine if client owes you or you owe client
-        is_loss_case = client_pnl < 0  # Client owes you (loss)
-        is_profit_case = client_pnl > 0  # You owe client (profit)
-        is_neutral_case = client_pnl == 0  # Neutral (funding == exchange_balance)
-        
-        # Handle neutral case (PnL = 0): Show with N.A
-        if is_neutral_case:
-            # Client MUST always appear in pending list, even when PnL = 0
-            # Show in "Clients Owe You" section with N.A
-            client_exchange.lock_initial_share_if_needed()
-            settlement_info = client_exchange.get_remaining_settlement_amount()
-            initial_final_share = settlement_info['initial_final_share']
-            remaining_amount = 0  # No remaining when PnL = 0
-            
-            # Use initial locked share for display
-            final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-            
-            # MASKED SHARE SETTLEMENT SYSTEM: Client MUST always appear in pending list
-            # When PnL = 0, always show N.A
-            show_na = True
-            
-            # Use helper method to get appropriate share percentage
-            share_pct = client_exchange.get_share_percentage(client_pnl)
-            
-            # Add to list with N.A
-            clients_owe_list.append({
-                "client": client_exchange.client,
-                "exchange": client_exchange.exchange,
-                "account": client_exchange,
-                "client_pnl": client_pnl,  # Will be 0
-                "amount_owed": 0,  # No amount owed when PnL = 0
-                "my_share_amount": final_share,  # Final share (will show as N.A)
-                "remaining_amount": remaining_amount,  # Remaining = 0 (will show as N.A)
-                "share_percentage": share_pct,
-                "show_na": show_na,  # Flag for N.A display
-            })
-            continue
-        
-        if is_loss_case:
-            # This is the "Clients Owe You" section
-            
-            # CRITICAL FIX: Lock share and use locked share for remaining calculation
-            client_exchange.lock_initial_share_if_needed()
-            settlement_info = client_exchange.get_remaining_settlement_amount()
-            initial_final_share = settlement_info['initial_final_share']
-            remaining_amount = settlement_info['remaining']
-            overpaid_amount = settlement_info['overpaid']
-            
-            # Use initial locked share for display
-            final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-            
-            # MASKED SHARE SETTLEMENT SYSTEM: Client MUST always appear in pending list
-            # If FinalShare = 0, show N.A instead of filtering out
-            show_na = (final_share == 0)
-            
-            # Calculate values using MASKED SHARE formulas
-            funding = Decimal(client_exchange.funding)
-            exchange_balance = Decimal(client_exchange.exchange_balance)
-            total_loss = abs(client_pnl)  # Client_PnL is negative, so abs gives loss amount
-            
-            # Use helper method to get appropriate share percentage
-            share_pct = client_exchange.get_share_percentage(client_pnl)
-            
-            # Add to list (ALWAYS, even if FinalShare = 0)
-            # CRITICAL FIX (FAIL CASE 2): Remaining display sign based on PnL direction
-            display_remaining = calculate_display_remaining(client_pnl, remaining_amount)
-            # Store absolute value for display (always positive)
-            remaining_display = abs(display_remaining) if display_remaining else 0
-            
-            # FINANCIAL INTERPRETATION: Client PnL < 0 (LOSS) → Client owes you → DisplayRemaining is POSITIVE
-            clients_owe_list.append({
-                "client": client_exchange.client,
-                "exchange": client_exchange.exchange,
-                "account": client_exchange,
-                "client_pnl": client_pnl,  # Masked in template
-                "amount_owed": total_loss,  # Amount owed = total loss (masked in template)
-                "my_share_amount": final_share,  # Final share (floor rounded)
-                "remaining_amount": remaining_display,  # Absolute value for display (always positive)
-                "share_percentage": share_pct,
-                "show_na": show_na,  # Flag for N.A display
-                })
-            continue
-        
-        if is_profit_case:
-            # This is the "You Owe Clients" section
-            
-            # CRITICAL FIX: Lock share and use locked share for remaining calculation
-            client_exchange.lock_initial_share_if_needed()
-            settlement_info = client_exchange.get_remaining_settlement_amount()
-            initial_final_share = settlement_info['initial_final_share']
-            remaining_amount = settlement_info['remaining']
-            overpaid_amount = settlement_info['overpaid']
-            
-            # Use initial locked share for display
-            final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-            
-            # MASKED SHARE SETTLEMENT SYSTEM: Client MUST always appear in pending list
-            # If FinalShare = 0, show N.A instead of filtering out
-            show_na = (final_share == 0)
-            
-            # Calculate values using MASKED SHARE formulas
-            funding = Decimal(client_exchange.funding)
-            exchange_balance = Decimal(client_exchange.exchange_balance)
-            unpaid_profit = client_pnl  # Client_PnL is positive (profit)
-            
-            # Use helper method to get appropriate share percentage
-            share_pct = client_exchange.get_share_percentage(client_pnl)
-            
-            # Add to list (ALWAYS, even if FinalShare = 0)
-            # CRITICAL FIX (FAIL CASE 2): Remaining display sign based on PnL direction
-            display_remaining = calculate_display_remaining(client_pnl, remaining_amount)
-            # Store absolute value for display (always positive)
-            remaining_display = abs(display_remaining) if display_remaining else 0
-            
-            # FINANCIAL INTERPRETATION: Client PnL > 0 (PROFIT) → You owe client → DisplayRemaining is NEGATIVE
-            you_owe_list.append({
-                "client": client_exchange.client,
-                "exchange": client_exchange.exchange,
-                "account": client_exchange,
-                "client_pnl": client_pnl,  # Masked in template
-                "amount_owed": unpaid_profit,  # Amount you owe = profit (masked in template)
-                "my_share_amount": final_share,  # Final share (floor rounded)
-                "remaining_amount": remaining_display,  # Absolute value for display (always positive)
-                "share_percentage": share_pct,
-                "show_na": show_na,  # Flag for N.A display
-            })
-            continue
-    
-    # Sort lists by amount (descending)
-    # Sort by Final Share or amount_owed, handling N.A cases
-    def get_sort_key(item):
-        if item.get("show_na", False):
-            return 0  # N.A items sort to bottom
-        if "my_share_amount" in item:
-            return abs(item["my_share_amount"])
-        elif "amount_owed" in item:
-            return abs(item["amount_owed"])
-        elif "client_pnl" in item:
-            return abs(item["client_pnl"])
-        else:
-            return 0
-    
-    clients_owe_list.sort(key=get_sort_key, reverse=True)
-    you_owe_list.sort(key=get_sort_key, reverse=True)
+    # Sort lists by Final Share (descending), N.A rows last
+    clients_owe_list.sort(key=pending_sort_key, reverse=True)
+    you_owe_list.sort(key=pending_sort_key, reverse=True)
     
     # Calculate totals (using remaining amounts for settlement tracking)
     total_clients_owe = sum(item.get("amount_owed", 0) for item in clients_owe_list)
@@ -1857,221 +1615,17 @@ def export_pending_csv(request):
     Export pending payments report as CSV.
     Export format mirrors Pending Payments UI table exactly.
     """
-    import csv
-    
     # Get search query if any
     search_query = request.GET.get("search", "").strip()
     section = request.GET.get("section", "all")  # "clients-owe", "you-owe", or "all"
     
-    # Get all client exchanges for the user
-    client_exchanges = ClientExchangeAccount.objects.filter(
-        client__user=request.user
-    ).select_related("client", "exchange")
-    
-    # Apply search filter if provided
-    if search_query:
-        client_exchanges = client_exchanges.filter(
-            Q(client__name__icontains=search_query) |
-            Q(client__code__icontains=search_query) |
-            Q(exchange__name__icontains=search_query) |
-            Q(exchange__code__icontains=search_query)
-        )
-    
-    # Use EXACT same data building logic as pending_summary
-    clients_owe_list = []
-    you_owe_list = []
-    
-    for client_exchange in client_exchanges:
-        # Compute Client_PnL using PIN-TO-PIN formula
-        client_pnl = client_exchange.compute_client_pnl()
-        
-        # Determine if client owes you or you owe client
-        is_loss_case = client_pnl < 0  # Client owes you (loss)
-        is_profit_case = client_pnl > 0  # You owe client (profit)
-        is_neutral_case = client_pnl == 0  # Neutral (funding == exchange_balance)
-        
-        # Handle neutral case (PnL = 0): Show with N.A
-        if is_neutral_case:
-            # Client MUST always appear in pending list, even when PnL = 0
-            # Show in "Clients Owe You" section with N.A
-            client_exchange.lock_initial_share_if_needed()
-            settlement_info = client_exchange.get_remaining_settlement_amount()
-            initial_final_share = settlement_info['initial_final_share']
-            remaining_amount = 0  # No remaining when PnL = 0
-            
-            # Use initial locked share for display
-            final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-            
-            # MASKED SHARE SETTLEMENT SYSTEM: Client MUST always appear in pending list
-            # When PnL = 0, always show N.A
-            show_na = True
-            
-            # Use helper method to get appropriate share percentage
-            share_pct = client_exchange.get_share_percentage(client_pnl)
-            
-            # Add to list with N.A
-            clients_owe_list.append({
-                "client": client_exchange.client,
-                "exchange": client_exchange.exchange,
-                "account": client_exchange,
-                "client_pnl": client_pnl,  # Will be 0
-                "amount_owed": 0,  # No amount owed when PnL = 0
-                "my_share_amount": final_share,  # Final share (will show as N.A)
-                "remaining_amount": remaining_amount,  # Remaining = 0 (will show as N.A)
-                "share_percentage": share_pct,
-                "show_na": show_na,  # Flag for N.A display
-            })
-            continue
-        
-        if is_loss_case:
-            # This is the "Clients Owe You" section
-            # CRITICAL FIX: Lock share and use locked share for remaining calculation
-            client_exchange.lock_initial_share_if_needed()
-            settlement_info = client_exchange.get_remaining_settlement_amount()
-            initial_final_share = settlement_info['initial_final_share']
-            remaining_amount = settlement_info['remaining']
-            overpaid_amount = settlement_info['overpaid']
-            
-            # Use initial locked share for display
-            final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-            
-            # MASKED SHARE SETTLEMENT SYSTEM: Client MUST always appear in pending list
-            # If FinalShare = 0, show N.A instead of filtering out
-            show_na = (final_share == 0)
-            
-            total_loss = abs(client_pnl)  # Client_PnL is negative, so abs gives loss amount
-            
-            # Use helper method to get appropriate share percentage
-            share_pct = client_exchange.get_share_percentage(client_pnl)
-            
-            # Add to list (ALWAYS, even if FinalShare = 0)
-            # CRITICAL FIX (FAIL CASE 2): Remaining display sign based on PnL direction
-            display_remaining = calculate_display_remaining(client_pnl, remaining_amount)
-            # Store absolute value for display (always positive)
-            remaining_display = abs(display_remaining) if display_remaining else 0
-            
-            clients_owe_list.append({
-                "client": client_exchange.client,
-                "exchange": client_exchange.exchange,
-                "account": client_exchange,
-                "client_pnl": client_pnl,
-                "amount_owed": total_loss,
-                "my_share_amount": final_share,
-                "remaining_amount": remaining_display,  # Absolute value for display (always positive)
-                "share_percentage": share_pct,
-                "show_na": show_na,  # Flag for N.A display
-                })
-            continue
-        
-        if is_profit_case:
-            # This is the "You Owe Clients" section
-            # CRITICAL FIX: Lock share and use locked share for remaining calculation
-            client_exchange.lock_initial_share_if_needed()
-            settlement_info = client_exchange.get_remaining_settlement_amount()
-            initial_final_share = settlement_info['initial_final_share']
-            remaining_amount = settlement_info['remaining']
-            overpaid_amount = settlement_info['overpaid']
-            
-            # Use initial locked share for display
-            final_share = initial_final_share if initial_final_share > 0 else client_exchange.compute_my_share()
-            
-            # MASKED SHARE SETTLEMENT SYSTEM: Client MUST always appear in pending list
-            # If FinalShare = 0, show N.A instead of filtering out
-            show_na = (final_share == 0)
-            
-            unpaid_profit = client_pnl  # Client_PnL is positive (profit)
-            
-            # Use helper method to get appropriate share percentage
-            share_pct = client_exchange.get_share_percentage(client_pnl)
-            
-            # Add to list (ALWAYS, even if FinalShare = 0)
-            # CRITICAL FIX (FAIL CASE 2): Remaining display sign based on PnL direction
-            display_remaining = calculate_display_remaining(client_pnl, remaining_amount)
-            # Store absolute value for display (always positive)
-            remaining_display = abs(display_remaining) if display_remaining else 0
-            
-            # FINANCIAL INTERPRETATION: Client PnL > 0 (PROFIT) → You owe client → DisplayRemaining is NEGATIVE
-            you_owe_list.append({
-                "client": client_exchange.client,
-                "exchange": client_exchange.exchange,
-                "account": client_exchange,
-                "client_pnl": client_pnl,
-                "amount_owed": unpaid_profit,
-                "my_share_amount": final_share,
-                "remaining_amount": remaining_display,  # Absolute value for display (always positive)
-                "share_percentage": share_pct,
-                "show_na": show_na,  # Flag for N.A display
-            })
-            continue
-    
-    # Sort lists by amount (descending)
-    # Sort by Final Share or amount_owed, handling N.A cases
-    def get_csv_sort_key(item):
-        if item.get("show_na", False):
-            return 0  # N.A items sort to bottom
-        if "my_share_amount" in item:
-            return abs(item["my_share_amount"])
-        elif "amount_owed" in item:
-            return abs(item["amount_owed"])
-        elif "client_pnl" in item:
-            return abs(item["client_pnl"])
-        else:
-            return 0
-    
-    clients_owe_list.sort(key=get_csv_sort_key, reverse=True)
-    you_owe_list.sort(key=get_csv_sort_key, reverse=True)
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
+    # Use EXACT same row logic as pending_summary, streamed to the client
     filename = f"pending_payments_{date.today().strftime('%Y%m%d')}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    writer = csv.writer(response)
-    
-    # Write header row - Matching table column order: Client, U_CODE, Master, OPENING POINTS, AVL.POINTS(CLOSING POINTS), PROFIT(+)/LOSS(-), MY SHARE, MY%
-    headers = [
-        'Client',
-        'U_CODE',
-        'Master',
-        'OPENING POINTS',
-        'AVL.POINTS(CLOSING POINTS)',
-        'PROFIT(+)/LOSS(-)',
-        'MY SHARE',
-        'MY%'
-    ]
-    writer.writerow(headers)
-    
-    # Write Clients Owe You section (if requested)
-    if section in ["all", "clients-owe"]:
-        for item in clients_owe_list:
-            row_data = [
-                item["client"].name or '',
-                item["client"].code or '',
-                item["exchange"].name or '',
-                int(item["account"].funding),
-                int(item["account"].exchange_balance),
-                'N.A' if item.get("show_na", False) else int(item["client_pnl"]),
-                'N.A' if item.get("show_na", False) else int(item.get("remaining_amount", 0)),
-                item.get("share_percentage", item["account"].my_percentage)
-            ]
-            writer.writerow(row_data)
-    
-    # Write You Owe Clients section (if requested)
-    if section in ["all", "you-owe"]:
-        for item in you_owe_list:
-            row_data = [
-                item["client"].name or '',
-                item["client"].code or '',
-                item["exchange"].name or '',
-                int(item["account"].funding),
-                int(item["account"].exchange_balance),
-                'N.A' if item.get("show_na", False) else int(item["client_pnl"]),
-                'N.A' if item.get("show_na", False) else int(item.get("remaining_amount", 0)),
-                item.get("share_percentage", item["account"].my_percentage)
-            ]
-            writer.writerow(row_data)
-    
-    return response
+    return stream_csv_response(
+        filename,
+        PENDING_CSV_HEADER,
+        pending_csv_rows(pending_accounts(request.user, search_query), section),
+    )
 
 
 @login_required
@@ -2214,16 +1768,16 @@ def report_overview(request):
     # Overall totals (filtered by time travel if applicable)
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = base_qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
+    # Per-day totals come from the pre-aggregated daily rollups (one grouped query)
+    base_rollups = rollups_for(
+        request.user,
+        client_id=client_id,
+        exchange_id=exchange_id,
+        start_date=date_filter.get("date__gte"),
+        end_date=date_filter.get("date__lte"),
     )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    rollups_by_day = rollup_totals_by(base_rollups, "day")
+    total_turnover = sum(day_totals["turnover"] for day_totals in rollups_by_day.values())
     
     # 📘 YOUR TOTAL PROFIT Calculation (CORRECTNESS LOGIC)
     # 
@@ -2318,67 +1872,9 @@ def report_overview(request):
     # Formula: My Profit = Your Total Profit × (weighted My Own % / weighted My Total %)
     #          Friend Profit = Your Total Profit × (weighted Friend % / weighted My Total %)
     
-    my_profit_total = Decimal(0)
-    friend_profit_total = Decimal(0)
-    
-    # Calculate weighted average percentages based on payment amounts
-    total_weighted_my_own = Decimal(0)
-    total_weighted_friend = Decimal(0)
-    total_weighted_amount = Decimal(0)
-    
-    # Use the same payment_qs queryset from Your Total Profit calculation
-    payment_transactions = payment_qs.select_related(
-        'client_exchange', 
-        'client_exchange__report_config'
-    )
-    
-    tx_count = 0
-    skipped_no_config = 0
-    skipped_zero_pct = 0
-    
-    for tx in payment_transactions:
-        tx_count += 1
-        payment_amount = Decimal(str(tx.amount))  # Can be positive or negative
-        account = tx.client_exchange
-        my_total_pct = Decimal(str(account.my_percentage))
-        
-        if my_total_pct == 0:
-            skipped_zero_pct += 1
-            continue
-        
-        report_config = getattr(account, 'report_config', None)
-        
-        if report_config:
-            my_own_pct = Decimal(str(report_config.my_own_percentage))
-            friend_pct = Decimal(str(report_config.friend_percentage))
-            
-            # Weight by absolute payment amount
-            weight = abs(payment_amount)
-            weighted_my_own_contrib = weight * (my_own_pct / my_total_pct)
-            weighted_friend_contrib = weight * (friend_pct / my_total_pct)
-            total_weighted_my_own += weighted_my_own_contrib
-            total_weighted_friend += weighted_friend_contrib
-            total_weighted_amount += weight
-        else:
-            skipped_no_config += 1
-    
-    # Split Your Total Profit using weighted average percentages
-    if total_weighted_amount > 0:
-        # Calculate weighted average ratios
-        weighted_my_own_ratio = total_weighted_my_own / total_weighted_amount
-        weighted_friend_ratio = total_weighted_friend / total_weighted_amount
-        
-        # Split total profit proportionally (works for both positive and negative)
-        my_profit_total = your_total_profit * weighted_my_own_ratio
-        friend_profit_total = your_total_profit * weighted_friend_ratio
-    elif your_total_profit == 0:
-        # No profit/loss, so no split needed
-        my_profit_total = Decimal(0)
-        friend_profit_total = Decimal(0)
-    else:
-        # No report configs found, all goes to me
-        my_profit_total = your_total_profit
-        friend_profit_total = Decimal(0)
+    split = profit_split(payment_qs, your_total_profit)
+    my_profit_total = split["my_profit"]
+    friend_profit_total = split["friend_profit"]
     
     # Verify: My Profit + Friend Profit should equal Your Total Profit (within rounding)
     # This ensures the split is correct
@@ -2400,38 +1896,12 @@ def report_overview(request):
     
     daily_data = defaultdict(lambda: {"profit": 0, "loss": 0, "turnover": 0})
     
-    # Daily turnover from TRADE transactions (exchange balance movement)
-    daily_trades = base_qs.filter(
-        type='TRADE',
-        date__gte=start_date,
-        date__lte=end_date
-    ).exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    
-    for tx in daily_trades:
-        tx_date = tx.date
-        turnover_amount = abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        daily_data[tx_date]["turnover"] += float(turnover_amount)
-    
-    # Daily profit/loss from RECORD_PAYMENT transactions (CORRECTNESS LOGIC)
-    daily_payments = base_qs.filter(
-        type='RECORD_PAYMENT',
-        date__gte=start_date,
-        date__lte=end_date
-    ).values("date").annotate(
-        profit_sum=Sum("amount")
-    )
-    
-    for item in daily_payments:
-        tx_date = item['date']
-        profit_amount = float(item["profit_sum"] or 0)
-        if profit_amount > 0:
-            daily_data[tx_date]["profit"] += profit_amount
-        elif profit_amount < 0:
-            daily_data[tx_date]["loss"] += abs(profit_amount)
+    # Daily turnover (TRADE) and profit/loss (RECORD_PAYMENT) from daily rollups
+    for day, day_totals in rollups_by_day.items():
+        if start_date <= day <= end_date:
+            daily_data[day]["turnover"] += float(day_totals["turnover"])
+            daily_data[day]["profit"] += float(day_totals["settlements_in"])
+            daily_data[day]["loss"] += float(day_totals["settlements_out"])
     
     # Create sorted date list and data arrays
     # Only include dates up to end_date
@@ -2507,31 +1977,11 @@ def report_overview(request):
         
         monthly_labels.insert(0, month_date.strftime("%b %Y"))
         
-        # Get transactions for this month (filtered by time travel if applicable)
-        month_transactions = base_qs.filter(
-            date__gte=month_date,
-            date__lte=month_end
-        )
-        
-        # Monthly profit/loss from RECORD_PAYMENT transactions (CORRECTNESS LOGIC)
-        month_payments = month_transactions.filter(type='RECORD_PAYMENT')
-        month_profit_val = month_payments.filter(amount__gt=0).aggregate(
-            total=Sum("amount")
-        )["total"] or 0
-        month_loss_val = abs(month_payments.filter(amount__lt=0).aggregate(
-            total=Sum("amount")
-        )["total"] or 0)
-        
-        # Turnover from TRADE transactions (exchange balance movement)
-        month_trade_qs = month_transactions.filter(type='TRADE').exclude(
-            exchange_balance_before__isnull=True
-        ).exclude(
-            exchange_balance_after__isnull=True
-        )
-        month_turnover_val = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in month_trade_qs
-        ) or 0
+        # Monthly profit/loss (RECORD_PAYMENT) and turnover (TRADE) from daily rollups
+        month_totals = sum_days(rollups_by_day, month_date, month_end)
+        month_profit_val = month_totals["settlements_in"]
+        month_loss_val = month_totals["settlements_out"]
+        month_turnover_val = month_totals["turnover"]
         
         monthly_profit.insert(0, float(month_profit_val))
         monthly_loss.insert(0, float(month_loss_val))
@@ -2557,30 +2007,11 @@ def report_overview(request):
         week_start = week_end - timedelta(days=6)
         weekly_labels.insert(0, f"Week {4-i} ({week_start.strftime('%b %d')} - {week_end.strftime('%b %d')})")
         
-        week_transactions = base_qs.filter(
-            date__gte=week_start,
-            date__lte=week_end
-        )
-        
-        # Weekly profit/loss from RECORD_PAYMENT transactions, turnover from TRADE transactions (CORRECTNESS LOGIC)
-        week_payments = week_transactions.filter(type='RECORD_PAYMENT')
-        week_profit_val = week_payments.filter(amount__gt=0).aggregate(
-            total=Sum("amount")
-        )["total"] or 0
-        week_loss_val = abs(week_payments.filter(amount__lt=0).aggregate(
-            total=Sum("amount")
-        )["total"] or 0)
-        
-        # Turnover from TRADE transactions (exchange balance movement)
-        week_trade_qs = week_transactions.filter(type='TRADE').exclude(
-            exchange_balance_before__isnull=True
-        ).exclude(
-            exchange_balance_after__isnull=True
-        )
-        week_turnover_val = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in week_trade_qs
-        ) or 0
+        # Weekly profit/loss (RECORD_PAYMENT) and turnover (TRADE) from daily rollups
+        week_totals = sum_days(rollups_by_day, week_start, week_end)
+        week_profit_val = week_totals["settlements_in"]
+        week_loss_val = week_totals["settlements_out"]
+        week_turnover_val = week_totals["turnover"]
         
         weekly_profit.insert(0, float(week_profit_val))
         weekly_loss.insert(0, float(week_loss_val))
@@ -2713,19 +2144,16 @@ def time_travel_report(request):
 
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    # Totals come from the pre-aggregated daily rollups
+    totals = rollup_totals(rollups_for(
+        request.user,
+        start_date=start_date,
+        end_date=end_date if date_range_mode else as_of,
+    ))
+    total_turnover = totals["turnover"]
     
     # Your Total Profit = Sum(RECORD_PAYMENT.amount) - signed sum
-    your_profit = payment_qs.aggregate(total=Sum("amount"))["total"] or Decimal(0)
+    your_profit = Decimal(totals["settlements_in"] - totals["settlements_out"])
     
     company_profit = Decimal(0)
 
@@ -3371,6 +2799,7 @@ def transaction_delete_logic(transaction):
             last_settlement = Settlement.objects.filter(client_exchange=account).order_by('-date', '-id').first()
             if last_settlement:
                 if last_settlement.amount == abs(transaction_amount):
+                    last_settlement.client_exchange = account  # keep the ledger on this instance
                     last_settlement.delete()
         
         # 4. Delete the transaction record
@@ -3389,16 +2818,12 @@ def transaction_delete_logic(transaction):
             account.funding = 0
             account.exchange_balance = 0
         
-        # 6. Reset the PnL cycle. This is CRITICAL.
-        account.locked_initial_final_share = None
-        account.locked_share_percentage = None
-        account.locked_initial_pnl = None
-        account.cycle_start_date = None
-        account.locked_initial_funding = None
-        
-        # 7. Save account changes
+        # 6. Save account changes
         account.save()
         
+        # 7. Reset the PnL cycle. This is CRITICAL.
+        account.close_cycle()
+        
         # 8. Force a fresh re-lock of the share based on the NEW reverted balances
         account.lock_initial_share_if_needed()
 
@@ -3516,16 +2941,9 @@ def report_daily(request):
     
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    # Read from the pre-aggregated daily rollups
+    day_rollups = rollups_for(request.user, start_date=report_date, end_date=report_date)
+    total_turnover = rollup_totals(day_rollups)["turnover"]
     
     # Your Total Profit = Sum(RECORD_PAYMENT.amount) - signed sum
     payment_qs = qs.filter(type='RECORD_PAYMENT')
@@ -3542,67 +2960,9 @@ def report_daily(request):
     # 📘 MY PROFIT AND FRIEND PROFIT Calculation (split from Your Total Profit)
     # Calculate weighted average percentages, then split Your Total Profit
     
-    my_profit_total = Decimal(0)
-    friend_profit_total = Decimal(0)
-    
-    # Calculate weighted average percentages based on payment amounts
-    total_weighted_my_own = Decimal(0)
-    total_weighted_friend = Decimal(0)
-    total_weighted_amount = Decimal(0)
-    
-    # Get payment transactions with report_config for splitting
-    payment_transactions = payment_qs.select_related(
-        'client_exchange', 
-        'client_exchange__report_config'
-    )
-    
-    tx_count = 0
-    skipped_no_config = 0
-    skipped_zero_pct = 0
-    
-    for tx in payment_transactions:
-        tx_count += 1
-        payment_amount = Decimal(str(tx.amount))  # Can be positive or negative
-        account = tx.client_exchange
-        my_total_pct = Decimal(str(account.my_percentage))
-        
-        if my_total_pct == 0:
-            skipped_zero_pct += 1
-            continue
-        
-        report_config = getattr(account, 'report_config', None)
-        
-        if report_config:
-            my_own_pct = Decimal(str(report_config.my_own_percentage))
-            friend_pct = Decimal(str(report_config.friend_percentage))
-            
-            # Weight by absolute payment amount
-            weight = abs(payment_amount)
-            weighted_my_own_contrib = weight * (my_own_pct / my_total_pct)
-            weighted_friend_contrib = weight * (friend_pct / my_total_pct)
-            total_weighted_my_own += weighted_my_own_contrib
-            total_weighted_friend += weighted_friend_contrib
-            total_weighted_amount += weight
-        else:
-            skipped_no_config += 1
-    
-    # Split Your Total Profit using weighted average percentages
-    if total_weighted_amount > 0:
-        # Calculate weighted average ratios
-        weighted_my_own_ratio = total_weighted_my_own / total_weighted_amount
-        weighted_friend_ratio = total_weighted_friend / total_weighted_amount
-        
-        # Split total profit proportionally (works for both positive and negative)
-        my_profit_total = your_total_profit * weighted_my_own_ratio
-        friend_profit_total = your_total_profit * weighted_friend_ratio
-    elif your_total_profit == 0:
-        # No profit/loss, so no split needed
-        my_profit_total = Decimal(0)
-        friend_profit_total = Decimal(0)
-    else:
-        # No report configs found, all goes to me
-        my_profit_total = your_total_profit
-        friend_profit_total = Decimal(0)
+    split = profit_split(payment_qs, your_total_profit)
+    my_profit_total = split["my_profit"]
+    friend_profit_total = split["friend_profit"]
     
     company_profit = Decimal(0)
     
@@ -3641,15 +3001,10 @@ def report_daily(request):
     )
     
     # Turnover from TRADE transactions (exchange balance movement) per client
-    client_trade_qs = trade_qs.values("client_exchange__client__name")
-    client_turnover_map = {}
-    for client_name in client_trade_qs.values_list("client_exchange__client__name", flat=True).distinct():
-        client_trades = trade_qs.filter(client_exchange__client__name=client_name)
-        client_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in client_trades
-        ) or 0
-        client_turnover_map[client_name] = client_turnover
+    client_turnover_map = {
+        client_name: totals["turnover"]
+        for client_name, totals in rollup_totals_by(day_rollups, "account__client__name").items()
+    }
     
     # Combine profit/loss and turnover data
     client_data = []
@@ -3725,16 +3080,10 @@ def report_weekly(request):
     
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    # Read from the pre-aggregated daily rollups
+    week_rollups = rollups_for(request.user, start_date=week_start, end_date=week_end)
+    rollups_by_day = rollup_totals_by(week_rollups, "day")
+    total_turnover = sum(totals["turnover"] for totals in rollups_by_day.values())
     
     # Your Total Profit = Sum(RECORD_PAYMENT.amount) - signed sum
     payment_qs = qs.filter(type='RECORD_PAYMENT')
@@ -3749,67 +3098,9 @@ def report_weekly(request):
     # 📘 MY PROFIT AND FRIEND PROFIT Calculation (split from Your Total Profit)
     # Calculate weighted average percentages, then split Your Total Profit
     
-    my_profit_total = Decimal(0)
-    friend_profit_total = Decimal(0)
-    
-    # Calculate weighted average percentages based on payment amounts
-    total_weighted_my_own = Decimal(0)
-    total_weighted_friend = Decimal(0)
-    total_weighted_amount = Decimal(0)
-    
-    # Get payment transactions with report_config for splitting
-    payment_transactions = payment_qs.select_related(
-        'client_exchange', 
-        'client_exchange__report_config'
-    )
-    
-    tx_count = 0
-    skipped_no_config = 0
-    skipped_zero_pct = 0
-    
-    for tx in payment_transactions:
-        tx_count += 1
-        payment_amount = Decimal(str(tx.amount))  # Can be positive or negative
-        account = tx.client_exchange
-        my_total_pct = Decimal(str(account.my_percentage))
-        
-        if my_total_pct == 0:
-            skipped_zero_pct += 1
-            continue
-        
-        report_config = getattr(account, 'report_config', None)
-        
-        if report_config:
-            my_own_pct = Decimal(str(report_config.my_own_percentage))
-            friend_pct = Decimal(str(report_config.friend_percentage))
-            
-            # Weight by absolute payment amount
-            weight = abs(payment_amount)
-            weighted_my_own_contrib = weight * (my_own_pct / my_total_pct)
-            weighted_friend_contrib = weight * (friend_pct / my_total_pct)
-            total_weighted_my_own += weighted_my_own_contrib
-            total_weighted_friend += weighted_friend_contrib
-            total_weighted_amount += weight
-        else:
-            skipped_no_config += 1
-    
-    # Split Your Total Profit using weighted average percentages
-    if total_weighted_amount > 0:
-        # Calculate weighted average ratios
-        weighted_my_own_ratio = total_weighted_my_own / total_weighted_amount
-        weighted_friend_ratio = total_weighted_friend / total_weighted_amount
-        
-        # Split total profit proportionally (works for both positive and negative)
-        my_profit_total = your_total_profit * weighted_my_own_ratio
-        friend_profit_total = your_total_profit * weighted_friend_ratio
-    elif your_total_profit == 0:
-        # No profit/loss, so no split needed
-        my_profit_total = Decimal(0)
-        friend_profit_total = Decimal(0)
-    else:
-        # No report configs found, all goes to me
-        my_profit_total = your_total_profit
-        friend_profit_total = Decimal(0)
+    split = profit_split(payment_qs, your_total_profit)
+    my_profit_total = split["my_profit"]
+    friend_profit_total = split["friend_profit"]
     
     company_profit = Decimal(0)
     
@@ -3823,27 +3114,14 @@ def report_weekly(request):
     
     for i in range(7):
 
+        current_date = week_start + timedelta(days=i)
         daily_labels.append(current_date.strftime("%a %d"))
         
-        day_qs = qs.filter(date=current_date)
-        # Profit/Loss from RECORD_PAYMENT transactions
-        day_payment_qs = day_qs.filter(type='RECORD_PAYMENT')
-        day_profit = day_payment_qs.filter(amount__gt=0).aggregate(total=Sum("amount"))["total"] or 0
-        day_loss = abs(day_payment_qs.filter(amount__lt=0).aggregate(total=Sum("amount"))["total"] or 0)
-        # Turnover from TRADE transactions (exchange balance movement)
-        day_trade_qs = day_qs.filter(type='TRADE').exclude(
-            exchange_balance_before__isnull=True
-        ).exclude(
-            exchange_balance_after__isnull=True
-        )
-        day_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in day_trade_qs
-        ) or 0
-        
-        daily_profit.append(float(day_profit))
-        daily_loss.append(float(day_loss))
-        daily_turnover.append(float(day_turnover))
+        day_totals = sum_days(rollups_by_day, current_date, current_date)
+        # Profit/Loss from settlement payments, turnover from TRADE transactions
+        daily_profit.append(float(day_totals["settlements_in"]))
+        daily_loss.append(float(day_totals["settlements_out"]))
+        daily_turnover.append(float(day_totals["turnover"]))
     
     # Transaction type breakdown
     type_data = qs.values("type").annotate(
@@ -3882,15 +3160,10 @@ def report_weekly(request):
     )
     
     # Turnover from TRADE transactions per client
-    client_turnover_map = {}
-    client_trade_names = trade_qs.values_list("client_exchange__client__name", flat=True).distinct()
-    for client_name in client_trade_names:
-        client_trades = trade_qs.filter(client_exchange__client__name=client_name)
-        client_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in client_trades
-        ) or 0
-        client_turnover_map[client_name] = client_turnover
+    client_turnover_map = {
+        client_name: totals["turnover"]
+        for client_name, totals in rollup_totals_by(week_rollups, "account__client__name").items()
+    }
     
     client_data = []
     for item in client_payment_data:
@@ -3955,16 +3228,14 @@ def report_monthly(request):
     
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    # Read from the pre-aggregated daily rollups
+    month_rollups = rollups_for(request.user, start_date=month_start, end_date=month_end)
+    rollups_by_day = rollup_totals_by(month_rollups, "day")
+    total_turnover = sum(totals["turnover"] for totals in rollups_by_day.values())
+    client_turnover_map = {
+        client_name: totals["turnover"]
+        for client_name, totals in rollup_totals_by(month_rollups, "account__client__name").items()
+    }
     
     # Your Total Profit = Sum(RECORD_PAYMENT.amount) - signed sum
     payment_qs = qs.filter(type='RECORD_PAYMENT')
@@ -3979,67 +3250,9 @@ def report_monthly(request):
     # 📘 MY PROFIT AND FRIEND PROFIT Calculation (split from Your Total Profit)
     # Calculate weighted average percentages, then split Your Total Profit
     
-    my_profit_total = Decimal(0)
-    friend_profit_total = Decimal(0)
-    
-    # Calculate weighted average percentages based on payment amounts
-    total_weighted_my_own = Decimal(0)
-    total_weighted_friend = Decimal(0)
-    total_weighted_amount = Decimal(0)
-    
-    # Get payment transactions with report_config for splitting
-    payment_transactions = payment_qs.select_related(
-        'client_exchange', 
-        'client_exchange__report_config'
-    )
-    
-    tx_count = 0
-    skipped_no_config = 0
-    skipped_zero_pct = 0
-    
-    for tx in payment_transactions:
-        tx_count += 1
-        payment_amount = Decimal(str(tx.amount))  # Can be positive or negative
-        account = tx.client_exchange
-        my_total_pct = Decimal(str(account.my_percentage))
-        
-        if my_total_pct == 0:
-            skipped_zero_pct += 1
-            continue
-        
-        report_config = getattr(account, 'report_config', None)
-        
-        if report_config:
-            my_own_pct = Decimal(str(report_config.my_own_percentage))
-            friend_pct = Decimal(str(report_config.friend_percentage))
-            
-            # Weight by absolute payment amount
-            weight = abs(payment_amount)
-            weighted_my_own_contrib = weight * (my_own_pct / my_total_pct)
-            weighted_friend_contrib = weight * (friend_pct / my_total_pct)
-            total_weighted_my_own += weighted_my_own_contrib
-            total_weighted_friend += weighted_friend_contrib
-            total_weighted_amount += weight
-        else:
-            skipped_no_config += 1
-    
-    # Split Your Total Profit using weighted average percentages
-    if total_weighted_amount > 0:
-        # Calculate weighted average ratios
-        weighted_my_own_ratio = total_weighted_my_own / total_weighted_amount
-        weighted_friend_ratio = total_weighted_friend / total_weighted_amount
-        
-        # Split total profit proportionally (works for both positive and negative)
-        my_profit_total = your_total_profit * weighted_my_own_ratio
-        friend_profit_total = your_total_profit * weighted_friend_ratio
-    elif your_total_profit == 0:
-        # No profit/loss, so no split needed
-        my_profit_total = Decimal(0)
-        friend_profit_total = Decimal(0)
-    else:
-        # No report configs found, all goes to me
-        my_profit_total = your_total_profit
-        friend_profit_total = Decimal(0)
+    split = profit_split(payment_qs, your_total_profit)
+    my_profit_total = split["my_profit"]
+    friend_profit_total = split["friend_profit"]
     
     company_profit = Decimal(0)
     
@@ -4055,27 +3268,14 @@ def report_monthly(request):
     week_num = 1
     while current_date <= month_end:
 
+        week_end_date = min(current_date + timedelta(days=6), month_end)
         weekly_labels.append(f"Week {week_num} ({current_date.strftime('%d')}-{week_end_date.strftime('%d %b')})")
         
-        week_qs = qs.filter(date__gte=current_date, date__lte=week_end_date)
-        # Profit/Loss from RECORD_PAYMENT transactions
-        week_payment_qs = week_qs.filter(type='RECORD_PAYMENT')
-        week_profit = week_payment_qs.filter(amount__gt=0).aggregate(total=Sum("amount"))["total"] or 0
-        week_loss = abs(week_payment_qs.filter(amount__lt=0).aggregate(total=Sum("amount"))["total"] or 0)
-        # Turnover from TRADE transactions (exchange balance movement)
-        week_trade_qs = week_qs.filter(type='TRADE').exclude(
-            exchange_balance_before__isnull=True
-        ).exclude(
-            exchange_balance_after__isnull=True
-        )
-        week_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in week_trade_qs
-        ) or 0
-        
-        weekly_profit.append(float(week_profit))
-        weekly_loss.append(float(week_loss))
-        weekly_turnover.append(float(week_turnover))
+        week_totals = sum_days(rollups_by_day, current_date, week_end_date)
+        # Profit/Loss from settlement payments, turnover from TRADE transactions
+        weekly_profit.append(float(week_totals["settlements_in"]))
+        weekly_loss.append(float(week_totals["settlements_out"]))
+        weekly_turnover.append(float(week_totals["turnover"]))
         
         current_date = week_end_date + timedelta(days=1)
         week_num += 1
@@ -4110,17 +3310,6 @@ def report_monthly(request):
         profit=Sum("amount", filter=Q(amount__gt=0))
     )
     
-    # Turnover from TRADE transactions (exchange balance movement) per client
-    client_trade_qs = trade_qs.values("client_exchange__client__name")
-    client_turnover_map = {}
-    for client_name in client_trade_qs.values_list("client_exchange__client__name", flat=True).distinct():
-        client_trades = trade_qs.filter(client_exchange__client__name=client_name)
-        client_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in client_trades
-        ) or 0
-        client_turnover_map[client_name] = client_turnover
-    
     # Combine profit and turnover data
     client_data = []
     for item in client_payment_data:
@@ -4150,17 +3339,6 @@ def report_monthly(request):
         net_profit=Sum("amount")
     )
     
-    # Turnover from TRADE transactions per client
-    client_turnover_map = {}
-    client_trade_names = trade_qs.values_list("client_exchange__client__name", flat=True).distinct()
-    for client_name in client_trade_names:
-        client_trades = trade_qs.filter(client_exchange__client__name=client_name)
-        client_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in client_trades
-        ) or 0
-        client_turnover_map[client_name] = client_turnover
-    
     client_data = []
     for item in client_payment_data:
         client_name = item["client_exchange__client__name"]
@@ -4226,16 +3404,7 @@ def report_custom(request):
     
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    total_turnover = qs.turnover()["turnover"]
     
     # Your Total Profit = Sum(RECORD_PAYMENT.amount) - signed sum
     payment_qs = qs.filter(type='RECORD_PAYMENT')
@@ -4250,67 +3419,9 @@ def report_custom(request):
     # 📘 MY PROFIT AND FRIEND PROFIT Calculation (split from Your Total Profit)
     # Calculate weighted average percentages, then split Your Total Profit
     
-    my_profit_total = Decimal(0)
-    friend_profit_total = Decimal(0)
-    
-    # Calculate weighted average percentages based on payment amounts
-    total_weighted_my_own = Decimal(0)
-    total_weighted_friend = Decimal(0)
-    total_weighted_amount = Decimal(0)
-    
-    # Get payment transactions with report_config for splitting
-    payment_transactions = payment_qs.select_related(
-        'client_exchange', 
-        'client_exchange__report_config'
-    )
-    
-    tx_count = 0
-    skipped_no_config = 0
-    skipped_zero_pct = 0
-    
-    for tx in payment_transactions:
-        tx_count += 1
-        payment_amount = Decimal(str(tx.amount))  # Can be positive or negative
-        account = tx.client_exchange
-        my_total_pct = Decimal(str(account.my_percentage))
-        
-        if my_total_pct == 0:
-            skipped_zero_pct += 1
-            continue
-        
-        report_config = getattr(account, 'report_config', None)
-        
-        if report_config:
-            my_own_pct = Decimal(str(report_config.my_own_percentage))
-            friend_pct = Decimal(str(report_config.friend_percentage))
-            
-            # Weight by absolute payment amount
-            weight = abs(payment_amount)
-            weighted_my_own_contrib = weight * (my_own_pct / my_total_pct)
-            weighted_friend_contrib = weight * (friend_pct / my_total_pct)
-            total_weighted_my_own += weighted_my_own_contrib
-            total_weighted_friend += weighted_friend_contrib
-            total_weighted_amount += weight
-        else:
-            skipped_no_config += 1
-    
-    # Split Your Total Profit using weighted average percentages
-    if total_weighted_amount > 0:
-        # Calculate weighted average ratios
-        weighted_my_own_ratio = total_weighted_my_own / total_weighted_amount
-        weighted_friend_ratio = total_weighted_friend / total_weighted_amount
-        
-        # Split total profit proportionally (works for both positive and negative)
-        my_profit_total = your_total_profit * weighted_my_own_ratio
-        friend_profit_total = your_total_profit * weighted_friend_ratio
-    elif your_total_profit == 0:
-        # No profit/loss, so no split needed
-        my_profit_total = Decimal(0)
-        friend_profit_total = Decimal(0)
-    else:
-        # No report configs found, all goes to me
-        my_profit_total = your_total_profit
-        friend_profit_total = Decimal(0)
+    split = profit_split(payment_qs, your_total_profit)
+    my_profit_total = split["my_profit"]
+    friend_profit_total = split["friend_profit"]
     
     company_profit = Decimal(0)
     
@@ -4338,15 +3449,13 @@ def report_custom(request):
 def export_report_csv(request):
 
 
-    """Export report as CSV."""
-    import csv
-    
+    """Export report as CSV (streamed, one chunk of rows at a time)."""
     report_type = request.GET.get("type", "all")
     start_date_str = request.GET.get("start_date")
     end_date_str = request.GET.get("end_date")
     
     if start_date_str and end_date_str:
-
+        start_date = date.fromisoformat(start_date_str)
         end_date = date.fromisoformat(end_date_str)
         qs = Transaction.objects.filter(client_exchange__client__user=request.user, date__gte=start_date, date__lte=end_date)
     else:
@@ -4362,26 +3471,25 @@ def export_report_csv(request):
         pass
 
     
-    qs = qs.select_related("client_exchange", "client_exchange__client", "client_exchange__exchange").order_by("-date", "-created_at")
-    
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="report_{date.today()}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(["Date", "Client", "Exchange", "Type", "Amount", "Exchange Balance After", "Note"])
-    
-    for tx in qs:
-        writer.writerow([
-            tx.date,
-            tx.client_exchange.client.name,
-            tx.client_exchange.exchange.name,
-            tx.get_type_display(),
-            tx.amount,
-            tx.exchange_balance_after or 0,
-            tx.notes or "",
-        ])
-    
-    return response
+    rows = qs.order_by("-date", "-created_at").values_list(
+        "date",
+        "client_exchange__client__name",
+        "client_exchange__exchange__name",
+        "type",
+        "amount",
+        "exchange_balance_after",
+        "notes",
+    )
+    type_labels = dict(Transaction.TRANSACTION_TYPES)
+    
+    return stream_csv_response(
+        f"report_{date.today()}.csv",
+        ["Date", "Client", "Exchange", "Type", "Amount", "Exchange Balance After", "Note"],
+        (
+            [tx_date, client_name, exchange_name, type_labels.get(tx_type, tx_type), amount, balance_after or 0, notes or ""]
+            for tx_date, client_name, exchange_name, tx_type, amount, balance_after, notes in rows.iterator(chunk_size=2000)
+        ),
+    )
 
 
 # Client-specific and Exchange-specific Reports
@@ -4407,16 +3515,7 @@ def report_client(request, client_pk):
 
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    total_turnover = qs.turnover()["turnover"]
     
     # Your Total Profit = Sum(RECORD_PAYMENT.amount) - signed sum
     your_profit = payment_qs.aggregate(total=Sum("amount"))["total"] or Decimal(0)
@@ -4573,9 +3672,7 @@ def exchange_account_detail(request, pk):
     
     # Get recent settlements
     settlements = Settlement.objects.filter(client_exchange=account).order_by("-date", "-created_at")[:10]
-    total_settled = Settlement.objects.filter(client_exchange=account).aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    total_settled = account.settled_total
     
     return render(request, "core/exchanges/account_detail.html", {
         'account': account,
@@ -4636,6 +3733,9 @@ def add_funding(request, account_id):
             
             account.save()
             
+            # Persist the new cycle lock (read paths never write it)
+            account.lock_initial_share_if_needed()
+            
             # Create FUNDING_MANUAL transaction with before/after balances
             Transaction.objects.create(
                 client_exchange=account,
@@ -4708,6 +3808,9 @@ def update_exchange_balance(request, account_id):
             account.exchange_balance = new_balance
             account.save()
             
+            # Persist cycle lock changes (read paths never write them)
+            account.lock_initial_share_if_needed()
+            
             # Create transaction with before/after balances
             Transaction.objects.create(
                 client_exchange=account,
@@ -4781,9 +3884,6 @@ def record_payment(request, account_id):
     client_pnl = account.compute_client_pnl()
     redirect_to = request.GET.get('redirect_to', 'exchange_account_detail')
     
-    # Lock share if needed (ensures share doesn't shrink)
-    account.lock_initial_share_if_needed()
-    
     # Calculate FinalShare using MASKED SHARE SETTLEMENT SYSTEM
     final_share = account.compute_my_share()
     settlement_info = account.get_remaining_settlement_amount()
@@ -5190,16 +4290,8 @@ def report_exchange(request, exchange_pk):
     
     # CORRECTNESS LOGIC: Turnover = Σ(|ExchangeBalanceAfter − ExchangeBalanceBefore|) for TRADE transactions only
     # Turnover measures trading activity, NOT funding or settlements
-    trade_qs = qs.filter(type='TRADE').exclude(
-        exchange_balance_before__isnull=True
-    ).exclude(
-        exchange_balance_after__isnull=True
-    )
-    # Calculate turnover as sum of absolute exchange balance movements from trades
-    total_turnover = sum(
-        abs(tx.exchange_balance_after - tx.exchange_balance_before)
-        for tx in trade_qs
-    ) or 0
+    turnover = qs.turnover_breakdown()
+    total_turnover = turnover["total"]["turnover"]
     
     # Your Total Profit = Sum(RECORD_PAYMENT.amount) - signed sum
     payment_qs = qs.filter(type='RECORD_PAYMENT')
@@ -5250,15 +4342,10 @@ def report_exchange(request, exchange_pk):
     )
     
     # Turnover from TRADE transactions (exchange balance movement) per client
-    client_trade_qs = trade_qs.values("client_exchange__client__name")
-    client_turnover_map = {}
-    for client_name in client_trade_qs.values_list("client_exchange__client__name", flat=True).distinct():
-        client_trades = trade_qs.filter(client_exchange__client__name=client_name)
-        client_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in client_trades
-        ) or 0
-        client_turnover_map[client_name] = client_turnover
+    client_turnover_map = {
+        client_name: totals["turnover"]
+        for client_name, totals in turnover["by_client"].items()
+    }
     
     # Combine profit and turnover data
     client_data = []
@@ -5500,6 +4587,7 @@ def client_balance(request, client_pk):
                 if new_balance != old_balance:
                     client_exchange.exchange_balance = new_balance
                     client_exchange.save()
+                    client_exchange.lock_initial_share_if_needed()
         
         # Redirect to client detail
     from django.shortcuts import redirect
@@ -5544,22 +4632,19 @@ def client_balance(request, client_pk):
     
     exchange_balances = []
     
+    # Turnover from TRADE transactions (exchange balance movement), per account in one query
+    turnover_by_account = {
+        row["client_exchange"]: row["turnover"]
+        for row in Transaction.objects.filter(client_exchange__in=client_exchanges).turnover("client_exchange")
+    }
+    
     for client_exchange in client_exchanges:
 
         
         # Transactions are audit-only - use account balances instead
         # Calculate from account directly
         total_funding = client_exchange.funding
-        # Turnover from TRADE transactions (exchange balance movement)
-        account_trades = transactions.filter(type='TRADE').exclude(
-            exchange_balance_before__isnull=True
-        ).exclude(
-            exchange_balance_after__isnull=True
-        )
-        total_turnover = sum(
-            abs(tx.exchange_balance_after - tx.exchange_balance_before)
-            for tx in account_trades
-        ) or 0
+        total_turnover = turnover_by_account.get(client_exchange.pk, 0)
         
         # Profit/loss calculated from account balances
         client_pnl = client_exchange.compute_client_pnl()